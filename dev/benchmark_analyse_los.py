@@ -0,0 +1,117 @@
+"""Wall time of Analyse LoS for different numbers of workers on generated layer of no target LoS.
+
+Run by Python of QGIS installation from the root of the repository, QGIS Processing plugin has to be importable (its
+directory in `PYTHONPATH`):
+
+    python dev/benchmark_analyse_los.py [number of LoS] [vertices of LoS] [workers ...]
+
+Every run reads the layer as new layer, so LoS parsed by previous runs are not taken from the shared parse cache.
+"""
+
+import math
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from qgis.core import (
+    QgsApplication,
+    QgsCoordinateReferenceSystem,
+    QgsFeature,
+    QgsField,
+    QgsFields,
+    QgsGeometry,
+    QgsLineString,
+    QgsProcessingContext,
+    QgsProcessingFeedback,
+    QgsVectorFileWriter,
+    QgsVectorLayer,
+    QgsWkbTypes,
+)
+from qgis.PyQt.QtCore import QMetaType
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from los_tools.constants.field_names import FieldNames  # noqa: E402
+from los_tools.constants.names_constants import NamesConstants  # noqa: E402
+from los_tools.processing.analyse_los.tool_analyse_los import AnalyseLosAlgorithm  # noqa: E402
+
+
+def create_los_layer(path: str, los_count: int, vertices: int) -> None:
+    fields = QgsFields()
+    fields.append(QgsField(FieldNames.LOS_TYPE, QMetaType.Type.QString))
+    fields.append(QgsField(FieldNames.ID_OBSERVER, QMetaType.Type.Int))
+    fields.append(QgsField(FieldNames.ID_TARGET, QMetaType.Type.Int))
+    fields.append(QgsField(FieldNames.OBSERVER_OFFSET, QMetaType.Type.Double))
+    fields.append(QgsField(FieldNames.AZIMUTH, QMetaType.Type.Double))
+    fields.append(QgsField(FieldNames.OBSERVER_X, QMetaType.Type.Double))
+    fields.append(QgsField(FieldNames.OBSERVER_Y, QMetaType.Type.Double))
+
+    options = QgsVectorFileWriter.SaveVectorOptions()
+    options.driverName = "GPKG"
+
+    writer = QgsVectorFileWriter.create(
+        path,
+        fields,
+        QgsWkbTypes.LineStringZ,
+        QgsCoordinateReferenceSystem("EPSG:5514"),
+        QgsProcessingContext().transformContext(),
+        options,
+    )
+
+    rng = np.random.default_rng(1)
+    distances = np.arange(vertices, dtype=float)
+
+    for i in range(los_count):
+        azimuth = 360 * i / los_count
+        xs = distances * math.sin(math.radians(azimuth))
+        ys = distances * math.cos(math.radians(azimuth))
+        zs = 300 + np.cumsum(rng.normal(0, 1, vertices))
+
+        feature = QgsFeature(fields)
+        feature.setAttributes([NamesConstants.LOS_NO_TARGET, 1, i, 1.6, azimuth, 0.0, 0.0])
+        feature.setGeometry(QgsGeometry(QgsLineString(xs.tolist(), ys.tolist(), zs.tolist())))
+        writer.addFeature(feature)
+
+    del writer
+
+
+def main() -> None:
+    los_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    vertices = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    workers_counts = [int(value) for value in sys.argv[3:]] or [1, 2, 4, 8]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = str(Path(directory) / "los.gpkg")
+
+        create_los_layer(path, los_count, vertices)
+
+        print(f"{los_count} LoS with {vertices} vertices")
+
+        for workers in workers_counts:
+            algorithm = AnalyseLosAlgorithm()
+            algorithm.initAlgorithm()
+
+            parameters = {
+                "LoSLayer": QgsVectorLayer(path, "los"),
+                "Workers": workers,
+                "OutputLayer": str(Path(directory) / f"analysed_{workers}.gpkg"),
+            }
+
+            start = time.perf_counter()
+            algorithm.run(parameters, QgsProcessingContext(), QgsProcessingFeedback())
+            print(f"workers: {workers:2d}  time: {time.perf_counter() - start:8.2f} s")
+
+
+if __name__ == "__main__":
+    application = QgsApplication([], False)
+    application.initQgis()
+
+    from processing.core.Processing import Processing
+
+    Processing.initialize()
+
+    main()
+
+    application.exitQgis()
@@ -1,16 +1,26 @@
 from __future__ import annotations
 
-import copy
 import math
-from typing import List, Optional, Union
+from collections.abc import Sequence
+from typing import Iterator, List, Optional, Tuple, Union
 
+import numpy as np
 from qgis.core import QgsFeature, QgsGeometry, QgsPoint
 
+from los_tools.classes.los_arrays import (
+    LOS_POINT_DTYPE,
+    compute_los_arrays,
+    los_arrays_to_structured,
+    running_last_index,
+)
+from los_tools.classes.los_profiles import LoSProfile
 from los_tools.constants.field_names import FieldNames
-from los_tools.processing.tools.util_functions import calculate_distance, line_geometry_to_coords
+from los_tools.processing.tools.util_functions import line_geometry_to_array
 
 
 class PointOnLoS:
+    __slots__ = ("x", "y", "distance", "z", "vertical_angle")
+
     def __init__(self, x: float, y: float, distance: float, z: float, vertical_angle: float):
         self.x = x
         self.y = y
@@ -19,11 +29,55 @@ class PointOnLoS:
         self.vertical_angle = vertical_angle
 
 
+class LoSFieldView(Sequence):
+    """Read-only view of single field of LoS data, items are returned as Python scalars, slices as views."""
+
+    __slots__ = ("_values",)
+
+    def __init__(self, values: np.ndarray):
+        self._values = values
+
+    def __len__(self) -> int:
+        return self._values.shape[0]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return LoSFieldView(self._values[index])
+        return self._values[index].item()
+
+    def __iter__(self) -> Iterator:
+        return iter(self._values.tolist())
+
+    def __repr__(self) -> str:
+        return repr(self._values.tolist())
+
+
+class LoSPointsView(Sequence):
+    """Read-only view of LoS data that returns `PointOnLoS` for every sample, slices are views."""
+
+    __slots__ = ("_data",)
+
+    def __init__(self, data: np.ndarray):
+        self._data = data
+
+    def __len__(self) -> int:
+        return self._data.shape[0]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return LoSPointsView(self._data[index])
+        return PointOnLoS(*self._data[index].item()[:5])
+
+    def __iter__(self) -> Iterator[PointOnLoS]:
+        for row in self._data.tolist():
+            yield PointOnLoS(*row[:5])
+
+
 class LoS:
 
     def __init__(
         self,
-        line: QgsGeometry,
+        line: Union[QgsGeometry, np.ndarray],
         is_global: bool = False,
         is_without_target: bool = False,
         observer_offset: float = 0,
@@ -33,7 +87,6 @@ class LoS:
         use_curvature_corrections: bool = True,
         refraction_coefficient: float = 0.13,
     ):
-        points = line_geometry_to_coords(line)
         self.is_global: bool = is_global
         self.is_without_target: bool = is_without_target
         self.use_curvature_corrections: bool = use_curvature_corrections
@@ -45,103 +98,48 @@ class LoS:
         self.target_index: int = None
         self.global_horizon_index = None
 
-        self.points: List[PointOnLoS] = [None for x in range(len(points))]
-        self.previous_max_angle: List = []
-        self.visible: List = []
-        self.horizon: List = []
-
-        self.__parse_points(points)
+        self.data: np.ndarray = np.empty(0, dtype=LOS_POINT_DTYPE)
 
-        self.__identify_horizons()
+        # line is either geometry or array of its x, y, z coordinates (e.g. from `LoSProfile`)
+        self.__parse_points(line if isinstance(line, np.ndarray) else line_geometry_to_array(line))
 
         if self.is_global:
             self.limit_angle = self.points[self.target_index].vertical_angle
             self.is_visible = True
 
-    def __identify_horizons(self) -> None:
-        for i in range(0, len(self.points)):
-            if i == len(self.points) - 1:
-                self.horizon.append(False)
-            else:
-                self.horizon.append((self.visible[i] is True) and (self.visible[i + 1] is False))
-
-    def __parse_points(self, points: List[List[float]]) -> None:
-        max_angle_temp = -180.0
-
-        first_point_x = points[0][0]
-        first_point_y = points[0][1]
-        first_point_z = points[0][2] + self.observer_offset
-
-        target_distance = 0.0
-        sampling_distance = 1.0
-        target_offset = 0.0
-
-        if self.is_global:
-            target_distance = calculate_distance(first_point_x, first_point_y, self.target_x, self.target_y)
-            sampling_distance = calculate_distance(points[0][0], points[0][1], points[1][0], points[1][1])
-
-        for i, point in enumerate(points):
-            point_x = point[0]
-            point_y = point[1]
-            point_z = point[2]
-
-            distance = calculate_distance(first_point_x, first_point_y, point_x, point_y)
-
-            if self.use_curvature_corrections:
-                point_z = self._curvature_corrections(point_z, distance, self.refraction_coefficient)
-                target_offset = self._curvature_corrections(self.target_offset, distance, self.refraction_coefficient)
-
-            # first point
-            if i == 0:
-                self.points[i] = PointOnLoS(point_x, point_y, 0, first_point_z, -90)
-
-            # target point global los
-            elif self.is_global and math.fabs(target_distance - distance) < sampling_distance / 2:
-                self.points[i] = PointOnLoS(
-                    point_x,
-                    point_y,
-                    distance,
-                    point_z + target_offset,
-                    self._angle_vertical(distance, point_z + target_offset - first_point_z),
-                )
-
-                self.target_index = i
-
-            # target point local los
-            elif not self.is_global and not self.is_without_target and i == len(points) - 1:
-                self.points[i] = PointOnLoS(
-                    point_x,
-                    point_y,
-                    distance,
-                    point_z + target_offset,
-                    self._angle_vertical(distance, point_z + target_offset - first_point_z),
-                )
-
-            # points
-            else:
-                self.points[i] = PointOnLoS(
-                    point_x,
-                    point_y,
-                    distance,
-                    point_z,
-                    self._angle_vertical(distance, point_z - first_point_z),
-                )
+    def __parse_points(self, points: np.ndarray) -> None:
+        arrays = compute_los_arrays(
+            points,
+            observer_offset=self.observer_offset,
+            target_offset=self.target_offset,
+            target_x=self.target_x,
+            target_y=self.target_y,
+            is_global=self.is_global,
+            is_without_target=self.is_without_target,
+            use_curvature_corrections=self.use_curvature_corrections,
+            refraction_coefficient=self.refraction_coefficient,
+        )
 
-            # first store max angle before this point and then add new max angle
-            self.previous_max_angle.append(max_angle_temp)
+        self._set_data(los_arrays_to_structured(arrays))
+        self.target_index = arrays.target_index
+
+    def _set_data(self, data: np.ndarray) -> None:
+        """Stores LoS data (structured array of `LOS_POINT_DTYPE`) and creates views on it for existing callers."""
+        self.data = data
+        self.points: Sequence[PointOnLoS] = LoSPointsView(data)
+        self.previous_max_angle: Sequence[float] = LoSFieldView(data["previous_max_angle"])
+        self.visible: Sequence[bool] = LoSFieldView(data["visible"])
+        self.horizon: Sequence[bool] = LoSFieldView(data["horizon"])
+        self._last_horizon_indices: np.ndarray = running_last_index(data["horizon"])
+
+    def _get_last_horizon_index(self, index_point: int) -> Optional[int]:
+        """Index of last horizon at or before the point (constant time), None if there is none."""
+        if index_point < 0:
+            return None
 
-            if i != 0:
-                if max_angle_temp < self._angle_vertical(distance, point_z - first_point_z):
-                    if self.is_global and i == self.target_index:
-                        pass
-                    else:
-                        max_angle_temp = self._angle_vertical(distance, point_z - first_point_z)
+        index = self._last_horizon_indices[index_point].item()
 
-            # is visible is only valid if previous_max_angle is smaller then current angle
-            if i == 0:
-                self.visible.append(True)
-            else:
-                self.visible.append(self.previous_max_angle[i] < self.points[i].vertical_angle)
+        return index if index != -1 else None
 
     def __str__(self):
         string = ""
@@ -152,14 +150,6 @@ class LoS:
             )
         return string
 
-    @staticmethod
-    def _angle_vertical(distance: float, elev_diff: float) -> float:
-        return 90 if distance == 0 else math.degrees(math.atan(elev_diff / distance))
-
-    @staticmethod
-    def _curvature_corrections(elev: float, dist: float, ref_coeff: float, earth_diameter: float = 12740000) -> float:
-        return elev - (math.pow(dist, 2) / earth_diameter) + ref_coeff * (math.pow(dist, 2) / earth_diameter)
-
     def is_visible_at_index(self, index: int, return_integer: bool = False) -> Union[bool, int]:
         return int(self.visible[index]) if return_integer else self.visible[index]
 
@@ -184,10 +174,7 @@ class LoS:
 
     def _get_global_horizon_index(self) -> Optional[int]:
         if self.global_horizon_index is None:
-            for i in range(len(self.points) - 1, -1, -1):
-                if self.horizon[i]:
-                    self.global_horizon_index = i  # type: ignore
-                    break
+            self.global_horizon_index = self._get_last_horizon_index(len(self.points) - 1)  # type: ignore
 
         return self.global_horizon_index
 
@@ -236,14 +223,7 @@ class LoS:
         return self.points[index_point].z
 
     def __get_previous_horizon_index(self, index_point: int) -> Optional[int]:
-        index = None
-
-        for i in range(index_point - 1, -1, -1):
-            if self.horizon[i]:
-                index = i
-                break
-
-        return index
+        return self._get_last_horizon_index(index_point - 1)
 
     def get_angle_difference_horizon_at_point(self, index_point: int) -> float:
         if 1 < index_point:
@@ -279,7 +259,7 @@ class LoS:
 class LoSLocal(LoS):
     def __init__(
         self,
-        line: QgsGeometry,
+        line: Union[QgsGeometry, np.ndarray],
         observer_offset: float = 0,
         target_offset: float = 0,
         use_curvature_corrections: bool = True,
@@ -311,6 +291,21 @@ class LoSLocal(LoS):
             refraction_coefficient=refraction_coefficient,
         )
 
+    @classmethod
+    def from_profile(
+        cls,
+        profile: LoSProfile,
+        curvature_corrections: bool = True,
+        refraction_coefficient: float = 0.13,
+    ) -> LoSLocal:
+        return cls(
+            profile.points,
+            observer_offset=profile.observer_offset,
+            target_offset=profile.target_offset,
+            use_curvature_corrections=curvature_corrections,
+            refraction_coefficient=refraction_coefficient,
+        )
+
     def is_target_visible(self, return_integer: bool = False):
         return self.is_visible_at_index(index=-1, return_integer=return_integer)
 
@@ -370,14 +365,7 @@ class LoSLocal(LoS):
             return 1 / (1 + math.pow((self.points[-1].distance - b1) / b2, 2))
 
     def _get_max_local_horizon_index(self) -> Optional[int]:
-        index = None
-
-        for i in range(len(self.points) - 1, -1, -1):
-            if self.horizon[i]:
-                index = i
-                break
-
-        return index
+        return self._get_last_horizon_index(len(self.points) - 1)
 
     def get_max_local_horizon(self) -> QgsPoint:
         index = self._get_max_local_horizon_index()
@@ -391,7 +379,7 @@ class LoSLocal(LoS):
 class LoSGlobal(LoS):
     def __init__(
         self,
-        line: QgsGeometry,
+        line: Union[QgsGeometry, np.ndarray],
         observer_offset: float = 0,
         target_offset: float = 0,
         target_x: float = 0,
@@ -429,6 +417,23 @@ class LoSGlobal(LoS):
             refraction_coefficient=refraction_coefficient,
         )
 
+    @classmethod
+    def from_profile(
+        cls,
+        profile: LoSProfile,
+        curvature_corrections: bool = True,
+        refraction_coefficient: float = 0.13,
+    ) -> LoSGlobal:
+        return cls(
+            profile.points,
+            observer_offset=profile.observer_offset,
+            target_offset=profile.target_offset,
+            target_x=profile.target_x,
+            target_y=profile.target_y,
+            use_curvature_corrections=curvature_corrections,
+            refraction_coefficient=refraction_coefficient,
+        )
+
     def is_target_visible(self, return_integer: bool = False) -> Union[bool, int]:
         return self.is_visible_at_index(index=self.target_index, return_integer=return_integer)
 
@@ -436,11 +441,10 @@ class LoSGlobal(LoS):
         if self.global_horizon_index is not None:
             return self.global_horizon_index
         else:
-            horizon_index = 0
-            for i in range(1, len(self.points) - 1):
-                if self.horizon[i] and i != self.target_index:
-                    horizon_index = i
-            self.global_horizon_index = horizon_index  # type: ignore
+            horizons = self.data["horizon"].copy()
+            horizons[[0, -1, self.target_index]] = False
+            horizon_indices = np.flatnonzero(horizons)
+            self.global_horizon_index = horizon_indices[-1].item() if horizon_indices.shape[0] else 0  # type: ignore
             return self.global_horizon_index
 
     def get_angle_difference_global_horizon(self) -> float:
@@ -470,14 +474,7 @@ class LoSGlobal(LoS):
         return int(math.fsum(self.horizon[self.target_index + 1 :]))
 
     def _get_max_local_horizon_index(self) -> Optional[int]:
-        index = None
-
-        for i in range(self.target_index - 1, -1, -1):
-            if self.horizon[i] and i != self.target_index:
-                index = i
-                break
-
-        return index
+        return self._get_last_horizon_index(self.target_index - 1)
 
     def get_max_local_horizon(self) -> QgsPoint:
         index = self._get_max_local_horizon_index()
@@ -491,7 +488,7 @@ class LoSGlobal(LoS):
 class LoSWithoutTarget(LoS):
     def __init__(
         self,
-        line: QgsGeometry,
+        line: Union[QgsGeometry, np.ndarray],
         observer_offset: float = 0,
         use_curvature_corrections: bool = True,
         refraction_coefficient: float = 0.13,
@@ -518,6 +515,20 @@ class LoSWithoutTarget(LoS):
             refraction_coefficient=refraction_coefficient,
         )
 
+    @classmethod
+    def from_profile(
+        cls,
+        profile: LoSProfile,
+        curvature_corrections: bool = True,
+        refraction_coefficient: float = 0.13,
+    ) -> LoSWithoutTarget:
+        return cls(
+            profile.points,
+            observer_offset=profile.observer_offset,
+            use_curvature_corrections=curvature_corrections,
+            refraction_coefficient=refraction_coefficient,
+        )
+
     @classmethod
     def from_another(
         cls,
@@ -536,17 +547,11 @@ class LoSWithoutTarget(LoS):
         obj.target_index = None
         obj.global_horizon_index = None
 
+        # data are never modified after parsing, so the new LoS can share them with the other one
         if distance_limit is None:
-            obj.points = copy.deepcopy(other.points)
-            obj.previous_max_angle = copy.deepcopy(other.previous_max_angle)
-            obj.visible = copy.deepcopy(other.visible)
-            obj.horizon = copy.deepcopy(other.horizon)
+            obj._set_data(other.data)
         else:
-            index_limit = other._get_distance_limit_index(distance_limit)
-            obj.points = copy.deepcopy(other.points[:index_limit])
-            obj.previous_max_angle = copy.deepcopy(other.previous_max_angle[:index_limit])
-            obj.visible = copy.deepcopy(other.visible[:index_limit])
-            obj.horizon = copy.deepcopy(other.horizon[:index_limit])
+            obj._set_data(other.data[: other._get_distance_limit_index(distance_limit)])
 
         return obj
 
@@ -560,15 +565,11 @@ class LoSWithoutTarget(LoS):
         return max(angles)
 
     def __get_max_local_horizon_index(self) -> Optional[int]:
-        index_horizon = None
         global_horizon_index = self._get_global_horizon_index()
         if global_horizon_index:
-            for i in range(global_horizon_index - 1, -1, -1):
-                if self.horizon[i]:
-                    index_horizon = i
-                    break
+            return self._get_last_horizon_index(global_horizon_index - 1)
 
-        return index_horizon
+        return None
 
     def get_max_local_horizon_angle(self) -> float:
         index_horizon = self.__get_max_local_horizon_index()
@@ -622,11 +623,23 @@ class LoSWithoutTarget(LoS):
             return None
 
     def _get_distance_limit_index(self, distance: float) -> int:
-        index = len(self.points) - 1
+        return int(self._get_distance_limit_indices(np.array([distance]))[0])
+
+    def _get_distance_limit_indices(self, distances: np.ndarray) -> np.ndarray:
+        """Index of first point (excluding observer) further than distance, last index if there is none."""
+        # running maximum makes the distances sorted without changing the first index where they exceed the limit
+        max_distances = np.maximum.accumulate(self.data["distance"][1:])
+        indices = np.searchsorted(max_distances, distances, side="right") + 1
+        return np.where(indices < len(self.points), indices, len(self.points) - 1)
+
+    def get_global_horizons_at_distances(self, distances: List[float]) -> List[Tuple[QgsPoint, float]]:
+        """Global horizon point and angle for every distance limit, same as `from_another` with `distance_limit`."""
+        indices = self._get_distance_limit_indices(np.asarray(distances, dtype=float))
+
+        horizon_indices = self._last_horizon_indices[indices - 1]
 
-        for i in range(1, len(self.points)):
-            if self.points[i].distance > distance:
-                index = i
-                break
+        angles = np.where(horizon_indices != -1, self.data["vertical_angle"][horizon_indices], 90)
 
-        return index
+        return [
+            (self.get_geom_at_index(index), angle) for index, angle in zip(horizon_indices.tolist(), angles.tolist())
+        ]
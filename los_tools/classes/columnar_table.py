@@ -0,0 +1,79 @@
+import os
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+PARQUET = "parquet"
+ARROW = "arrow"
+
+COLUMNAR_FORMATS = {".parquet": PARQUET, ".arrow": ARROW, ".feather": ARROW}
+COLUMNAR_FILE_FILTER = "Parquet files (*.parquet);;Arrow IPC files (*.arrow *.feather)"
+
+
+def pyarrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+
+    return True
+
+
+def columnar_format(path: str) -> Optional[str]:
+    """Format of columnar file by its extension, None if the extension is not supported."""
+    return COLUMNAR_FORMATS.get(os.path.splitext(path)[1].lower())
+
+
+class ColumnarTableWriter:
+    """Writes table by chunks of NumPy columns into Parquet (row group per chunk) or Arrow IPC file (record batch per
+    chunk). Requires optional `pyarrow` package.
+
+    `columns` are pairs of column name and NumPy dtype. Masked values of `np.ma.MaskedArray` columns are written as
+    nulls.
+    """
+
+    def __init__(self, path: str, columns: Sequence[Tuple[str, np.dtype]]):
+        import pyarrow as pa
+
+        self._pa = pa
+
+        self.path = path
+        self.format = columnar_format(path)
+        self.schema = pa.schema([(name, pa.from_numpy_dtype(np.dtype(dtype))) for name, dtype in columns])
+        self.rows = 0
+
+        if self.format == PARQUET:
+            import pyarrow.parquet as pq
+
+            self._writer = pq.ParquetWriter(path, self.schema)
+
+        elif self.format == ARROW:
+            self._writer = pa.ipc.new_file(path, self.schema)
+
+        else:
+            raise ValueError(f"Unsupported columnar file `{path}`, use one of: {', '.join(COLUMNAR_FORMATS)}.")
+
+    def write(self, columns: Dict[str, np.ndarray]) -> None:
+        """Writes chunk, `columns` must contain all columns of the table with the same length."""
+        arrays = []
+
+        for field in self.schema:
+            values = columns[field.name]
+            mask = np.ma.getmaskarray(values) if np.ma.isMaskedArray(values) else None
+
+            arrays.append(self._pa.array(np.ma.getdata(values), type=field.type, mask=mask))
+
+        batch = self._pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+        if batch.num_rows == 0:
+            return
+
+        if self.format == PARQUET:
+            self._writer.write_table(self._pa.Table.from_batches([batch]), row_group_size=batch.num_rows)
+        else:
+            self._writer.write_batch(batch)
+
+        self.rows += batch.num_rows
+
+    def close(self) -> None:
+        self._writer.close()
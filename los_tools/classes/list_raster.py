@@ -1,7 +1,9 @@
 import math
+import os
 import pathlib
-from typing import Dict, List, Sequence, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
 
+import numpy as np
 from qgis.core import (
     QgsCoordinateReferenceSystem,
     QgsCoordinateTransform,
@@ -11,6 +13,7 @@ from qgis.core import (
     QgsMapLayer,
     QgsPoint,
     QgsPointXY,
+    QgsProviderRegistry,
     QgsRasterDataProvider,
     QgsRasterLayer,
     QgsRectangle,
@@ -19,17 +22,112 @@ from qgis.core import (
 from qgis.PyQt.QtCore import QFile, QIODevice
 from qgis.PyQt.QtXml import QDomDocument
 
+from los_tools.classes.profile_cache import ProfileCache
+from los_tools.classes.raster_memmap import BlockLayout, MemoryMappedRaster, fits_file, gdal_layout
+from los_tools.classes.raster_tiles import (
+    DEFAULT_MEMORY_BUDGET,
+    DEFAULT_TILE_SIZE,
+    CachedRaster,
+    RasterGrid,
+    RasterSampler,
+    TileCache,
+)
 from los_tools.constants.plugin import PluginConstants
-from los_tools.processing.tools.util_functions import bilinear_interpolated_value
+
+
+def raster_grid(raster_dp: QgsRasterDataProvider) -> RasterGrid:
+    """Georeferencing and no data value of the first band of raster data provider."""
+    extent = raster_dp.extent()
+
+    return RasterGrid(
+        x_min=extent.xMinimum(),
+        y_max=extent.yMaximum(),
+        x_res=extent.width() / raster_dp.xSize(),
+        y_res=extent.height() / raster_dp.ySize(),
+        width=raster_dp.xSize(),
+        height=raster_dp.ySize(),
+        no_data=raster_dp.sourceNoDataValue(1) if raster_dp.sourceHasNoDataValue(1) else None,
+    )
+
+
+def read_raster_tile(
+    raster_dp: QgsRasterDataProvider, grid: RasterGrid, row: int, col: int, rows: int, cols: int
+) -> np.ndarray:
+    """Reads block of cells from the first band of raster as float array, no data cells are NaN."""
+    extent = QgsRectangle(
+        grid.x_min + col * grid.x_res,
+        grid.y_max - (row + rows) * grid.y_res,
+        grid.x_min + (col + cols) * grid.x_res,
+        grid.y_max - row * grid.y_res,
+    )
+
+    block = raster_dp.block(1, extent, cols, rows)
+
+    return np.ma.filled(np.ma.asarray(block.as_numpy(use_masking=True), dtype=np.float64), np.nan)
+
+
+def raster_memory_layout(raster: QgsRasterLayer, grid: RasterGrid) -> Optional[BlockLayout]:
+    """Layout of local raster file that can be memory mapped, None if the raster has to be read by its provider."""
+    if raster.providerType() != "gdal":
+        return None
+
+    path = QgsProviderRegistry.instance().decodeUri("gdal", raster.source()).get("path", "")
+
+    if not path or not pathlib.Path(path).is_file():
+        return None
+
+    layout = gdal_layout(path)
+
+    if layout is None or layout.width != grid.width or layout.height != grid.height or not fits_file(layout):
+        return None
+
+    return layout
+
+
+def raster_fingerprint(raster: QgsRasterLayer) -> str:
+    """Identification of raster data: source, size, extent and (for local files) file size and modification time."""
+    raster_dp = raster.dataProvider()
+    extent = raster_dp.extent()
+
+    parts = [
+        raster.providerType(),
+        raster.source(),
+        str(raster_dp.xSize()),
+        str(raster_dp.ySize()),
+        repr((extent.xMinimum(), extent.yMinimum(), extent.xMaximum(), extent.yMaximum())),
+    ]
+
+    path = QgsProviderRegistry.instance().decodeUri(raster.providerType(), raster.source()).get("path", "")
+
+    if path and os.path.isfile(path):
+        stat = os.stat(path)
+        parts += [str(stat.st_size), str(stat.st_mtime_ns)]
+
+    return "|".join(parts)
 
 
 class ListOfRasters:
     """Class to manage a list of raster layers with validation and utility methods."""
 
-    def __init__(self, rasters: List[QgsMapLayer]):
+    def __init__(
+        self,
+        rasters: List[QgsMapLayer],
+        tile_cache_memory: int = DEFAULT_MEMORY_BUDGET,
+        tile_size: int = DEFAULT_TILE_SIZE,
+        use_memory_map: bool = True,
+        profile_cache: Optional[ProfileCache] = None,
+    ):
 
         self._dict_rasters: Dict[str, QgsRasterLayer] = {}
 
+        self.profile_cache = profile_cache
+        self._fingerprint: Optional[str] = None
+
+        self._tile_size = tile_size
+        self._use_memory_map = use_memory_map
+        self._tile_cache = TileCache(tile_cache_memory)
+        self._raster_samplers: Dict[str, RasterSampler] = {}
+
         if rasters:
             first_crs = rasters[0].crs()
 
@@ -64,6 +162,47 @@ class ListOfRasters:
     def remove_raster(self, raster_id: str) -> None:
         if raster_id in self._dict_rasters:
             self._dict_rasters.pop(raster_id)
+            self.clear_tile_cache()
+            self._fingerprint = None
+
+    @property
+    def raster_samplers(self) -> List[RasterSampler]:
+        """Samplers of rasters (in the same order as `rasters`).
+
+        Local uncompressed rasters are memory mapped if allowed, other rasters are read through in memory tile cache.
+        """
+        raster_samplers = []
+
+        for raster_id, raster in self._dict_rasters.items():
+            if raster_id not in self._raster_samplers:
+                self._raster_samplers[raster_id] = self._create_raster_sampler(raster_id, raster)
+
+            raster_samplers.append(self._raster_samplers[raster_id])
+
+        return raster_samplers
+
+    def _create_raster_sampler(self, raster_id: str, raster: QgsRasterLayer) -> RasterSampler:
+        raster_dp = raster.dataProvider()
+        grid = raster_grid(raster_dp)
+
+        if self._use_memory_map:
+            layout = raster_memory_layout(raster, grid)
+
+            if layout is not None:
+                return MemoryMappedRaster(raster_id, grid, layout)
+
+        return CachedRaster(
+            raster_id,
+            grid,
+            lambda row, col, rows, cols: read_raster_tile(raster_dp, grid, row, col, rows, cols),
+            self._tile_cache,
+            self._tile_size,
+        )
+
+    def clear_tile_cache(self) -> None:
+        """Drops all cached raster tiles and memory maps."""
+        self._raster_samplers = {}
+        self._tile_cache.clear()
 
     @staticmethod
     def validate_bands(rasters: Sequence[QgsRasterLayer | QgsMapLayer]) -> Tuple[bool, str]:
@@ -208,14 +347,45 @@ class ListOfRasters:
 
     def extract_interpolated_value(self, point: QgsPoint) -> float | None:
         """Extracts interpolated value at the given point from the rasters."""
-        for raster_dp in self.rasters_dp:
-            value = bilinear_interpolated_value(raster_dp, point)
+        x = point.x()
+        y = point.y()
+
+        for raster in self.raster_samplers:
+            value = raster.bilinear_value(x, y)
 
             if value is not None:
                 return value
 
         return None
 
+    def sample_many(self, xs: np.ndarray, ys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Bilinear interpolated values at many points at once.
+
+        Every point is sampled from the first raster (ordered by cell size) that has value there. Returns array of
+        values (NaN where no raster has value) and array of indices of rasters used (-1 where no raster has value).
+        """
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+
+        values = np.full(xs.shape[0], np.nan)
+        sources = np.full(xs.shape[0], -1, dtype=np.int64)
+
+        remaining = np.arange(xs.shape[0])
+
+        for i, raster in enumerate(self.raster_samplers):
+            if remaining.shape[0] == 0:
+                break
+
+            raster_values = raster.bilinear_values(xs[remaining], ys[remaining])
+            found = ~np.isnan(raster_values)
+
+            values[remaining[found]] = raster_values[found]
+            sources[remaining[found]] = i
+
+            remaining = remaining[~found]
+
+        return values, sources
+
     def _convert_point_to_crs_of_raster(self, point: QgsPointXY, crs: QgsCoordinateReferenceSystem) -> QgsPoint:
         """Converts point to the CRS of the first raster in the list"""
         if crs.toWkt() == self.rasters[0].crs().toWkt():
@@ -234,23 +404,44 @@ class ListOfRasters:
     def sampling_from_raster_at_point(self, input_point: QgsPointXY, crs: QgsCoordinateReferenceSystem) -> str | None:
         """Returns the name of the raster layer that contains value at the given point."""
         point = self._convert_point_to_crs_of_raster(input_point, crs)
-        for i, raster_dp in enumerate(self.rasters_dp):
-            value = bilinear_interpolated_value(raster_dp, point)
+        for i, raster in enumerate(self.raster_samplers):
+            value = raster.bilinear_value(point.x(), point.y())
             if value is not None:
                 return self.rasters[i].name()
         return None
 
     def add_z_values(self, points: List[QgsPoint]) -> QgsLineString:
         """Adds z values to points based on the raster data. Returns a QgsLineString with 3D points."""
-        points3d = []
+        xs = np.array([point.x() for point in points], dtype=np.float64)
+        ys = np.array([point.y() for point in points], dtype=np.float64)
 
-        for point in points:
-            z = self.extract_interpolated_value(point)
+        return self.add_z_values_to_arrays(xs, ys)
 
-            if z is not None:
-                points3d.append(QgsPoint(point.x(), point.y(), z))
+    def add_z_values_to_arrays(self, xs: np.ndarray, ys: np.ndarray) -> QgsLineString:
+        """Same as `add_z_values`, but for points given as arrays of coordinates."""
+        return self.line_from_arrays(xs, ys, self.sample_profiles(xs, ys))
+
+    def fingerprint(self) -> str:
+        """Identification of rasters (in order of use) and their data, changes if any raster file is modified."""
+        if self._fingerprint is None:
+            self._fingerprint = "\n".join(raster_fingerprint(raster) for raster in self.rasters)
+
+        return self._fingerprint
+
+    def sample_profiles(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """Values at points (NaN where no raster has value), taken from profile cache first if there is one."""
+        if self.profile_cache is None:
+            zs, _ = self.sample_many(xs, ys)
+            return zs
+
+        return self.profile_cache.get(ProfileCache.key(self.fingerprint(), xs, ys), lambda: self.sample_many(xs, ys)[0])
+
+    @staticmethod
+    def line_from_arrays(xs: np.ndarray, ys: np.ndarray, zs: np.ndarray) -> QgsLineString:
+        """Line with Z values from arrays of coordinates, points without value (NaN) are skipped."""
+        has_value = ~np.isnan(zs)
 
-        return QgsLineString(points3d)
+        return QgsLineString(xs[has_value].tolist(), ys[has_value].tolist(), zs[has_value].tolist())
 
     def save_to_file(self, file_path: str) -> Tuple[bool, str]:
         """Saves configuration to XML file. Result is a tuple with success status and message."""
@@ -301,6 +492,7 @@ class ListOfRasters:
         """Read configuration from XML file. Result is a tuple with success status and message."""
 
         self._dict_rasters = {}
+        self.clear_tile_cache()
 
         file = QFile(file_path)
         if not file.open(QIODevice.OpenModeFlag.ReadOnly | QIODevice.OpenModeFlag.Text):
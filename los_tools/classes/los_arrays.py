@@ -0,0 +1,382 @@
+import functools
+import math
+import struct
+from typing import NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+EARTH_DIAMETER = 12740000
+
+WKB_LINESTRING_Z = 1002
+WKB_LINESTRING_25D = 0x80000002
+
+LOS_POINT_DTYPE = np.dtype(
+    [
+        ("x", np.float64),
+        ("y", np.float64),
+        ("distance", np.float64),
+        ("z", np.float64),
+        ("vertical_angle", np.float64),
+        ("previous_max_angle", np.float64),
+        ("visible", np.bool_),
+        ("horizon", np.bool_),
+    ]
+)
+
+
+class LoSArrays(NamedTuple):
+    """Per sample values of single LoS computed by `compute_los_arrays`."""
+
+    x: np.ndarray
+    y: np.ndarray
+    distance: np.ndarray
+    z: np.ndarray
+    vertical_angle: np.ndarray
+    previous_max_angle: np.ndarray
+    visible: np.ndarray
+    horizon: np.ndarray
+    target_index: Optional[int]
+
+
+class CurvatureCorrections(NamedTuple):
+    """Drop of earth surface due to curvature and its part compensated by refraction, per distance."""
+
+    curvature: np.ndarray
+    refraction: np.ndarray
+
+    def apply(self, elevations: np.ndarray) -> np.ndarray:
+        """Elevations corrected for earth curvature and refraction."""
+        return elevations - self.curvature + self.refraction
+
+
+def curvature_corrections(
+    distances: np.ndarray,
+    refraction_coefficient: float,
+    earth_diameter: float = EARTH_DIAMETER,
+) -> CurvatureCorrections:
+    """Curvature and refraction corrections at given distances."""
+    curvature = np.power(distances, 2) / earth_diameter
+    return CurvatureCorrections(curvature, refraction_coefficient * curvature)
+
+
+@functools.lru_cache(maxsize=32)
+def _template_curvature_corrections(template: bytes, refraction_coefficient: float) -> CurvatureCorrections:
+    corrections = curvature_corrections(np.frombuffer(template, dtype=np.float64), refraction_coefficient)
+
+    for values in corrections:
+        values.flags.writeable = False
+
+    return corrections
+
+
+def template_curvature_corrections(distances: np.ndarray, refraction_coefficient: float) -> CurvatureCorrections:
+    """Curvature and refraction corrections for distance template shared by many LoS (e.g. all azimuths of observer).
+
+    Corrections are cached by template and refraction coefficient, returned arrays are read-only.
+    """
+    template = np.ascontiguousarray(distances, dtype=np.float64).tobytes()
+    return _template_curvature_corrections(template, float(refraction_coefficient))
+
+
+def apply_curvature_corrections(
+    elevations: np.ndarray,
+    distances: np.ndarray,
+    refraction_coefficient: float,
+    earth_diameter: float = EARTH_DIAMETER,
+) -> np.ndarray:
+    """Elevations corrected for earth curvature and refraction at given distances."""
+    return curvature_corrections(distances, refraction_coefficient, earth_diameter).apply(elevations)
+
+
+def vertical_angles(distances: np.ndarray, elevation_differences: np.ndarray) -> np.ndarray:
+    """Vertical angles (in degrees) for given distances and elevation differences, 90 for zero distance."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        angles = np.degrees(np.arctan(elevation_differences / distances))
+    return np.where(distances == 0, 90.0, angles)
+
+
+def corrected_target_offsets(
+    target_offsets: np.ndarray,
+    distances: np.ndarray,
+    use_curvature_corrections: bool,
+    refraction_coefficient: float,
+) -> np.ndarray:
+    """Target offsets as used by LoS model. Offsets are only applied together with curvature corrections."""
+    if use_curvature_corrections:
+        return apply_curvature_corrections(target_offsets, distances, refraction_coefficient)
+
+    return np.zeros(np.shape(distances))
+
+
+def polar_coordinates(x: float, y: float, azimuths: np.ndarray, distances: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """X and Y coordinates of points at given distances from origin in given azimuths (degrees, clockwise from north).
+
+    Results have shape (azimuths, distances).
+    """
+    # same order of operations as `QgsPoint.project`
+    azimuths = np.asarray(azimuths, dtype=float) * math.pi / 180.0
+    distances = np.asarray(distances, dtype=float)
+
+    xs = x + distances[np.newaxis, :] * np.sin(azimuths)[:, np.newaxis]
+    ys = y + distances[np.newaxis, :] * np.cos(azimuths)[:, np.newaxis]
+
+    return xs, ys
+
+
+def horizons_from_visibility(visible: np.ndarray) -> np.ndarray:
+    """Horizon is a visible point followed by invisible point. Last point is never horizon."""
+    horizon = np.zeros(visible.shape[0], dtype=bool)
+    horizon[:-1] = visible[:-1] & ~visible[1:]
+    return horizon
+
+
+def los_arrays_to_structured(arrays: LoSArrays) -> np.ndarray:
+    """Packs per sample values of single LoS into one structured array of `LOS_POINT_DTYPE` (50 bytes per sample)."""
+    data = np.empty(arrays.x.shape[0], dtype=LOS_POINT_DTYPE)
+
+    for name in LOS_POINT_DTYPE.names:
+        data[name] = getattr(arrays, name)
+
+    return data
+
+
+def running_last_index(flags: np.ndarray) -> np.ndarray:
+    """Index of last `True` value at or before every element, -1 if there is none."""
+    return np.maximum.accumulate(np.where(flags, np.arange(flags.shape[0]), -1))
+
+
+class LoSBatchArrays(NamedTuple):
+    """Per sample values of many LoS stored one after another, LoS `i` spans `offsets[i]:offsets[i + 1]`."""
+
+    offsets: np.ndarray
+    x: np.ndarray
+    y: np.ndarray
+    distance: np.ndarray
+    z: np.ndarray
+    vertical_angle: np.ndarray
+    previous_max_angle: np.ndarray
+    visible: np.ndarray
+    horizon: np.ndarray
+    target_indices: np.ndarray
+
+
+def segment_ids(offsets: np.ndarray) -> np.ndarray:
+    """Index of segment for every element of concatenated array described by `offsets`."""
+    return np.repeat(np.arange(offsets.shape[0] - 1), np.diff(offsets))
+
+
+def segmented_running_max(values: np.ndarray, segments: np.ndarray, number_of_segments: int) -> np.ndarray:
+    """Running maximum (ignoring NaN) that restarts at the beginning of every segment.
+
+    Values are replaced by their ranks, ranks are shifted by segment so that every segment is larger than all previous
+    ones and then accumulated at once. Unlike shifting the values themselves, this does not lose precision.
+    """
+    if number_of_segments <= 1:
+        return np.fmax.accumulate(values)
+
+    unique_values, ranks = np.unique(values, return_inverse=True)
+
+    shift = segments.astype(np.int64) * unique_values.shape[0]
+
+    return unique_values[np.maximum.accumulate(ranks.reshape(-1) + shift) - shift]
+
+
+def segmented_last_index(flags: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """Index (into concatenated array) of last `True` value in each segment, -1 if there is none."""
+    indices = np.where(flags, np.arange(flags.shape[0]), -1)
+    return np.maximum.reduceat(indices, offsets[:-1])
+
+
+def segmented_previous_index(flags: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """For every element index of last `True` value before it in the same segment, -1 if there is none."""
+    segments = segment_ids(offsets)
+    indices = np.where(flags, np.arange(flags.shape[0]), -1)
+
+    previous = np.empty(flags.shape[0], dtype=np.int64)
+    previous[0] = -1
+    previous[1:] = np.maximum.accumulate(indices)[:-1]
+
+    return np.where(previous < offsets[:-1][segments], -1, previous)
+
+
+def compute_los_batch_arrays(
+    coords: np.ndarray,
+    offsets: np.ndarray,
+    observer_offsets: Union[float, np.ndarray] = 0,
+    target_offsets: Union[float, np.ndarray] = 0,
+    targets_x: Optional[Union[float, np.ndarray]] = None,
+    targets_y: Optional[Union[float, np.ndarray]] = None,
+    is_global: bool = False,
+    is_without_target: bool = False,
+    use_curvature_corrections: bool = True,
+    refraction_coefficient: float = 0.13,
+    distances: Optional[np.ndarray] = None,
+    corrections: Optional[CurvatureCorrections] = None,
+) -> LoSBatchArrays:
+    """Computes distances, elevations, vertical angles, visibility and horizons for many LoS at once.
+
+    `coords` are XYZ coordinates of all LoS concatenated, LoS `i` spans `offsets[i]:offsets[i + 1]`. The first point
+    of every LoS is the observer. For local LoS the last point is the target, for global LoS the target is the point
+    closest to target XY (within half of sampling distance). Per LoS values can be given as scalars or arrays.
+
+    Distances of points from observers and their curvature corrections are computed from coordinates, unless they are
+    given per point (e.g. taken from distance template shared by LoS).
+    """
+    coords = np.asarray(coords, dtype=float).reshape(-1, 3)
+    offsets = np.asarray(offsets, dtype=np.int64)
+
+    number_of_los = offsets.shape[0] - 1
+
+    if np.any(np.diff(offsets) < 2):
+        raise ValueError("Each LoS must consist of at least two points.")
+
+    starts = offsets[:-1]
+    ends = offsets[1:] - 1
+    segments = segment_ids(offsets)
+
+    x = coords[:, 0]
+    y = coords[:, 1]
+
+    first_point_z = coords[starts, 2] + np.broadcast_to(np.asarray(observer_offsets, dtype=float), (number_of_los,))
+
+    if distances is not None:
+        distance = np.asarray(distances, dtype=float)
+    else:
+        distance = np.sqrt(np.power(x[starts][segments] - x, 2) + np.power(y[starts][segments] - y, 2))
+
+    if use_curvature_corrections:
+        if corrections is None:
+            corrections = curvature_corrections(distance, refraction_coefficient)
+
+        # offsets are only applied together with curvature corrections, same as in `corrected_target_offsets`
+        points_z = corrections.apply(coords[:, 2])
+        target_offset = corrections.apply(
+            np.broadcast_to(np.asarray(target_offsets, dtype=float), (number_of_los,))[segments]
+        )
+    else:
+        points_z = coords[:, 2].copy()
+        target_offset = np.zeros(distance.shape[0])
+
+    target_mask = np.zeros(distance.shape[0], dtype=bool)
+
+    if is_global:
+        target_x = np.broadcast_to(np.asarray(targets_x, dtype=float), (number_of_los,))
+        target_y = np.broadcast_to(np.asarray(targets_y, dtype=float), (number_of_los,))
+        target_distance = np.sqrt(np.power(x[starts] - target_x, 2) + np.power(y[starts] - target_y, 2))
+        sampling_distance = distance[starts + 1]
+        target_mask = np.fabs(target_distance[segments] - distance) < sampling_distance[segments] / 2
+    elif not is_without_target:
+        target_mask[ends] = True
+
+    target_mask[starts] = False
+
+    observer_z = first_point_z[segments]
+
+    terrain_angle = vertical_angles(distance, points_z - observer_z)
+
+    z = np.where(target_mask, points_z + target_offset, points_z)
+    z[starts] = first_point_z
+
+    vertical_angle = np.where(target_mask, vertical_angles(distance, z - observer_z), terrain_angle)
+    vertical_angle[starts] = -90
+
+    # max angle is not influenced by the observer and (for global LoS) by the target, -180 is the initial value
+    candidates = np.where(np.isnan(terrain_angle), -180.0, terrain_angle)
+    candidates[starts] = -180.0
+    if is_global:
+        candidates[target_mask] = -180.0
+
+    running_max = segmented_running_max(candidates, segments, number_of_los)
+
+    previous_max_angle = np.empty(distance.shape[0])
+    previous_max_angle[1:] = running_max[:-1]
+    previous_max_angle[starts] = -180.0
+
+    visible = previous_max_angle < vertical_angle
+    visible[starts] = True
+
+    horizon = horizons_from_visibility(visible)
+    horizon[ends] = False
+
+    if is_global:
+        target_indices = segmented_last_index(target_mask, offsets)
+    else:
+        target_indices = np.full(number_of_los, -1, dtype=np.int64)
+
+    return LoSBatchArrays(
+        offsets=offsets,
+        x=x,
+        y=y,
+        distance=distance,
+        z=z,
+        vertical_angle=vertical_angle,
+        previous_max_angle=previous_max_angle,
+        visible=visible,
+        horizon=horizon,
+        target_indices=target_indices,
+    )
+
+
+def compute_los_arrays(
+    coords: np.ndarray,
+    observer_offset: float = 0,
+    target_offset: float = 0,
+    target_x: Optional[float] = None,
+    target_y: Optional[float] = None,
+    is_global: bool = False,
+    is_without_target: bool = False,
+    use_curvature_corrections: bool = True,
+    refraction_coefficient: float = 0.13,
+) -> LoSArrays:
+    """Computes distances, elevations, vertical angles, visibility and horizons for LoS given as array of XYZ coords.
+
+    Single LoS variant of `compute_los_batch_arrays`.
+    """
+    coords = np.asarray(coords, dtype=float).reshape(-1, 3)
+
+    arrays = compute_los_batch_arrays(
+        coords,
+        np.array([0, coords.shape[0]]),
+        observer_offsets=observer_offset,
+        target_offsets=target_offset,
+        targets_x=target_x,
+        targets_y=target_y,
+        is_global=is_global,
+        is_without_target=is_without_target,
+        use_curvature_corrections=use_curvature_corrections,
+        refraction_coefficient=refraction_coefficient,
+    )
+
+    target_index = int(arrays.target_indices[0]) if arrays.target_indices[0] != -1 else None
+
+    return LoSArrays(
+        x=arrays.x,
+        y=arrays.y,
+        distance=arrays.distance,
+        z=arrays.z,
+        vertical_angle=arrays.vertical_angle,
+        previous_max_angle=arrays.previous_max_angle,
+        visible=arrays.visible,
+        horizon=arrays.horizon,
+        target_index=target_index,
+    )
+
+
+def linestring_z_wkb_to_array(wkb: bytes) -> Optional[np.ndarray]:
+    """Reads XYZ coordinates from WKB of LineString Z (or 25D). Returns None for any other geometry type."""
+    if len(wkb) < 9:
+        return None
+
+    byte_order = "<" if wkb[0] == 1 else ">"
+
+    wkb_type, number_of_points = struct.unpack_from(f"{byte_order}II", wkb, 1)
+
+    if wkb_type not in (WKB_LINESTRING_Z, WKB_LINESTRING_25D):
+        return None
+
+    if len(wkb) < 9 + number_of_points * 24:
+        return None
+
+    coords = np.frombuffer(wkb, dtype=np.dtype(f"{byte_order}f8"), count=number_of_points * 3, offset=9)
+
+    return coords.reshape(-1, 3).astype(float)
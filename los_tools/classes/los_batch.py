@@ -0,0 +1,580 @@
+from __future__ import annotations
+
+from typing import Callable, Hashable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from qgis.core import QgsFeature, QgsPoint, QgsProcessingException
+
+from los_tools.classes.los_arrays import (
+    LOS_POINT_DTYPE,
+    CurvatureCorrections,
+    LoSBatchArrays,
+    compute_los_batch_arrays,
+    segmented_last_index,
+    segmented_previous_index,
+    template_curvature_corrections,
+)
+from los_tools.classes.los_parse_cache import LoSParseCache
+from los_tools.constants.field_names import FieldNames
+from los_tools.constants.names_constants import NamesConstants
+from los_tools.processing.tools.util_functions import chunked, line_geometry_to_array
+
+FeaturesFetcher = Callable[[List[int]], Iterable[QgsFeature]]
+
+
+class LoSBatch:
+    """All LoS of one type (from layer or its chunk) stored as concatenated arrays with offsets (CSR-like).
+
+    LoS `i` occupies `offsets[i]:offsets[i + 1]` of all per point arrays. Getters mirror those of `LoSLocal`,
+    `LoSGlobal` and `LoSWithoutTarget` but return one value per LoS as array. Indices returned by this class are
+    indices into concatenated arrays, -1 is used for missing values.
+    """
+
+    DEFAULT_CHUNK_SIZE = 10000
+
+    def __init__(
+        self,
+        coords: np.ndarray,
+        offsets: np.ndarray,
+        los_type: str,
+        observer_offsets: np.ndarray,
+        target_offsets: Optional[np.ndarray] = None,
+        targets_x: Optional[np.ndarray] = None,
+        targets_y: Optional[np.ndarray] = None,
+        use_curvature_corrections: bool = True,
+        refraction_coefficient: float = 0.13,
+        distances: Optional[np.ndarray] = None,
+        corrections: Optional[CurvatureCorrections] = None,
+    ):
+        if los_type not in (NamesConstants.LOS_LOCAL, NamesConstants.LOS_GLOBAL, NamesConstants.LOS_NO_TARGET):
+            raise ValueError(f"Unknown LoS type `{los_type}`.")
+
+        self.los_type = los_type
+        self.use_curvature_corrections = use_curvature_corrections
+        self.refraction_coefficient = refraction_coefficient
+
+        arrays = compute_los_batch_arrays(
+            coords,
+            offsets,
+            observer_offsets=observer_offsets,
+            target_offsets=target_offsets if target_offsets is not None else 0,
+            targets_x=targets_x,
+            targets_y=targets_y,
+            is_global=los_type == NamesConstants.LOS_GLOBAL,
+            is_without_target=los_type == NamesConstants.LOS_NO_TARGET,
+            use_curvature_corrections=use_curvature_corrections,
+            refraction_coefficient=refraction_coefficient,
+            distances=distances,
+            corrections=corrections,
+        )
+
+        self._set_arrays(arrays)
+
+    def _set_arrays(self, arrays: LoSBatchArrays) -> None:
+        self.offsets = arrays.offsets
+        self.x = arrays.x
+        self.y = arrays.y
+        self.distance = arrays.distance
+        self.z = arrays.z
+        self.vertical_angle = arrays.vertical_angle
+        self.previous_max_angle = arrays.previous_max_angle
+        self.visible = arrays.visible
+        self.horizon = arrays.horizon
+        self.target_indices = arrays.target_indices
+
+        self.starts = self.offsets[:-1]
+        self.ends = self.offsets[1:] - 1
+
+        self._global_horizon_indices: Optional[np.ndarray] = None
+        self._max_local_horizon_indices: Optional[np.ndarray] = None
+        self._previous_horizon_indices: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return self.offsets.shape[0] - 1
+
+    @staticmethod
+    def feature_attributes(los_type: str) -> List[str]:
+        """Names of attributes that `from_features` reads from features of LoS of given type."""
+        attributes = [FieldNames.OBSERVER_OFFSET]
+
+        if los_type != NamesConstants.LOS_NO_TARGET:
+            attributes.append(FieldNames.TARGET_OFFSET)
+
+        if los_type == NamesConstants.LOS_GLOBAL:
+            attributes += [FieldNames.TARGET_X, FieldNames.TARGET_Y]
+
+        return attributes
+
+    @staticmethod
+    def parse_cache_group(layer_key: Hashable, curvature_corrections: bool, refraction_coefficient: float) -> Tuple:
+        """Group of parse cache entries with LoS of layer parsed with given settings."""
+        return (layer_key, curvature_corrections, refraction_coefficient)
+
+    @staticmethod
+    def _fetch_features(features: List[QgsFeature], fetch_features: FeaturesFetcher) -> List[QgsFeature]:
+        """Features with the same ids fetched again (e.g. with geometry), in the same order."""
+        fids = [feature.id() for feature in features]
+        fetched = {feature.id(): feature for feature in fetch_features(fids)}
+
+        return [fetched[fid] for fid in fids]
+
+    @classmethod
+    def from_features(
+        cls,
+        features: Iterable[QgsFeature],
+        los_type: str,
+        curvature_corrections: bool = True,
+        refraction_coefficient: float = 0.13,
+        parse_cache: Optional[LoSParseCache] = None,
+        layer_key: Optional[Hashable] = None,
+        fetch_features: Optional[FeaturesFetcher] = None,
+    ) -> LoSBatch:
+        """LoS parsed from features. If `parse_cache` and `layer_key` (identification of layer and its state) are
+        given, LoS parsed before with the same settings are taken from cache and newly parsed LoS are stored into it.
+
+        If `features` were read without geometry, `fetch_features` must return features with geometry for list of
+        feature ids, it is called only for LoS that have to be parsed.
+        """
+        if parse_cache is not None and layer_key is not None:
+            return cls._from_features_cached(
+                list(features),
+                los_type,
+                curvature_corrections,
+                refraction_coefficient,
+                parse_cache,
+                layer_key,
+                fetch_features,
+            )
+
+        if fetch_features is not None:
+            features = cls._fetch_features(list(features), fetch_features)
+
+        coords: List[np.ndarray] = []
+        observer_offsets: List[float] = []
+        target_offsets: List[float] = []
+        targets_x: List[float] = []
+        targets_y: List[float] = []
+
+        for feature in features:
+            feature_coords = line_geometry_to_array(feature.geometry())
+
+            # lines are created without points with no raster value, so they can end up with less than two points
+            if feature_coords.shape[0] < 2:
+                raise QgsProcessingException(
+                    f"LoS with feature id `{feature.id()}` has less than two vertices and cannot be analysed."
+                )
+
+            coords.append(feature_coords)
+            observer_offsets.append(feature.attribute(FieldNames.OBSERVER_OFFSET))
+
+            if los_type != NamesConstants.LOS_NO_TARGET:
+                target_offsets.append(feature.attribute(FieldNames.TARGET_OFFSET))
+
+            if los_type == NamesConstants.LOS_GLOBAL:
+                targets_x.append(feature.attribute(FieldNames.TARGET_X))
+                targets_y.append(feature.attribute(FieldNames.TARGET_Y))
+
+        offsets = np.zeros(len(coords) + 1, dtype=np.int64)
+        np.cumsum([len(x) for x in coords], out=offsets[1:])
+
+        return cls(
+            np.concatenate(coords) if coords else np.empty((0, 3)),
+            offsets,
+            los_type,
+            observer_offsets=np.array(observer_offsets, dtype=float),
+            target_offsets=np.array(target_offsets, dtype=float) if target_offsets else None,
+            targets_x=np.array(targets_x, dtype=float) if targets_x else None,
+            targets_y=np.array(targets_y, dtype=float) if targets_y else None,
+            use_curvature_corrections=curvature_corrections,
+            refraction_coefficient=refraction_coefficient,
+        )
+
+    @classmethod
+    def _from_features_cached(
+        cls,
+        features: List[QgsFeature],
+        los_type: str,
+        curvature_corrections: bool,
+        refraction_coefficient: float,
+        parse_cache: LoSParseCache,
+        layer_key: Hashable,
+        fetch_features: Optional[FeaturesFetcher] = None,
+    ) -> LoSBatch:
+        group = cls.parse_cache_group(layer_key, curvature_corrections, refraction_coefficient)
+        keys = [(group, feature.id()) for feature in features]
+
+        parsed = [parse_cache.get(key) for key in keys]
+
+        missing = [i for i, item in enumerate(parsed) if item is None]
+
+        if missing:
+            los_batch = cls.from_features(
+                [features[i] for i in missing],
+                los_type,
+                curvature_corrections,
+                refraction_coefficient,
+                fetch_features=fetch_features,
+            )
+
+            for i, item in zip(missing, los_batch.parsed_los()):
+                parse_cache.put(keys[i], *item, group=group)
+                parsed[i] = item
+
+            if len(missing) == len(features):
+                return los_batch
+
+        return cls.from_parsed_los(parsed, los_type, curvature_corrections, refraction_coefficient)
+
+    def parsed_los(self) -> List[Tuple[np.ndarray, int]]:
+        """Every LoS as structured array of `LOS_POINT_DTYPE` and index of target relative to LoS start (-1 if none)."""
+        data = np.empty(self.distance.shape[0], dtype=LOS_POINT_DTYPE)
+
+        for name in LOS_POINT_DTYPE.names:
+            data[name] = getattr(self, name)
+
+        target_indices = np.where(self.target_indices != -1, self.target_indices - self.starts, -1).tolist()
+        offsets = self.offsets.tolist()
+
+        return [(data[offsets[i] : offsets[i + 1]].copy(), target_indices[i]) for i in range(len(self))]
+
+    @classmethod
+    def from_parsed_los(
+        cls,
+        parsed: Sequence[Tuple[np.ndarray, int]],
+        los_type: str,
+        curvature_corrections: bool = True,
+        refraction_coefficient: float = 0.13,
+    ) -> LoSBatch:
+        """Batch assembled from LoS returned by `parsed_los` without computing them again."""
+        offsets = np.zeros(len(parsed) + 1, dtype=np.int64)
+        np.cumsum([data.shape[0] for data, _ in parsed], out=offsets[1:])
+
+        data = np.concatenate([data for data, _ in parsed]) if parsed else np.empty(0, dtype=LOS_POINT_DTYPE)
+        target_indices = np.array([target_index for _, target_index in parsed], dtype=np.int64)
+
+        los_batch = cls.__new__(cls)
+        los_batch.los_type = los_type
+        los_batch.use_curvature_corrections = curvature_corrections
+        los_batch.refraction_coefficient = refraction_coefficient
+
+        los_batch._set_arrays(
+            LoSBatchArrays(
+                offsets=offsets,
+                target_indices=np.where(target_indices != -1, target_indices + offsets[:-1], -1),
+                **{name: np.ascontiguousarray(data[name]) for name in LOS_POINT_DTYPE.names},
+            )
+        )
+
+        return los_batch
+
+    @classmethod
+    def from_lines_arrays(
+        cls,
+        xs: np.ndarray,
+        ys: np.ndarray,
+        zs: np.ndarray,
+        observer_offset: float,
+        curvature_corrections: bool = True,
+        refraction_coefficient: float = 0.13,
+        distances: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, Optional[LoSBatch]]:
+        """No target LoS from lines sampled into arrays of shape (lines, samples), the first sample is the observer.
+
+        Samples without elevation (NaN) are left out, same as `ListOfRasters.add_z_values` does. Returns indices of
+        lines with at least two samples with elevation and their `LoSBatch` (None if there is no such line).
+
+        If all lines are sampled at the same `distances` from observer (distance template), distances and curvature
+        corrections are taken from the template instead of being computed for every sample. The template is not used
+        if observer of any line has no elevation, as the first sample with elevation becomes observer then.
+        """
+        has_value = ~np.isnan(zs)
+
+        counts = has_value.sum(axis=1)
+
+        los_indices = np.flatnonzero(counts > 1)
+
+        if los_indices.shape[0] == 0:
+            return los_indices, None
+
+        has_value[counts <= 1] = False
+
+        coords = np.column_stack([xs[has_value], ys[has_value], zs[has_value]])
+
+        offsets = np.zeros(los_indices.shape[0] + 1, dtype=np.int64)
+        np.cumsum(counts[los_indices], out=offsets[1:])
+
+        sample_distances = None
+        sample_corrections = None
+
+        if distances is not None and has_value[los_indices, 0].all():
+            sample_distances = np.broadcast_to(distances, zs.shape)[has_value]
+
+            if curvature_corrections:
+                sample_corrections = CurvatureCorrections(
+                    *(
+                        np.broadcast_to(values, zs.shape)[has_value]
+                        for values in template_curvature_corrections(distances, refraction_coefficient)
+                    )
+                )
+
+        los_batch = cls(
+            coords,
+            offsets,
+            NamesConstants.LOS_NO_TARGET,
+            observer_offsets=np.full(los_indices.shape[0], observer_offset),
+            use_curvature_corrections=curvature_corrections,
+            refraction_coefficient=refraction_coefficient,
+            distances=sample_distances,
+            corrections=sample_corrections,
+        )
+
+        return los_indices, los_batch
+
+    @classmethod
+    def batches_from_features(
+        cls,
+        features: Iterable[QgsFeature],
+        los_type: str,
+        curvature_corrections: bool = True,
+        refraction_coefficient: float = 0.13,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        parse_cache: Optional[LoSParseCache] = None,
+        layer_key: Optional[Hashable] = None,
+        fetch_features: Optional[FeaturesFetcher] = None,
+    ) -> Iterator[Tuple[List[QgsFeature], LoSBatch]]:
+        """Splits features into chunks and yields every chunk together with its `LoSBatch`."""
+        for chunk in chunked(features, chunk_size):
+            yield chunk, cls.from_features(
+                chunk, los_type, curvature_corrections, refraction_coefficient, parse_cache, layer_key, fetch_features
+            )
+
+    def los_slice(self, los_index: int) -> slice:
+        return slice(int(self.offsets[los_index]), int(self.offsets[los_index + 1]))
+
+    def get_geom_at_index(self, index: int) -> QgsPoint:
+        return QgsPoint(float(self.x[index]), float(self.y[index]), float(self.z[index]))
+
+    def _last_horizon_index(self, condition: Optional[np.ndarray] = None) -> np.ndarray:
+        flags = self.horizon if condition is None else self.horizon & condition
+        return segmented_last_index(flags, self.offsets)
+
+    def _horizon_angles(self, indices: np.ndarray, default: float) -> np.ndarray:
+        return np.where(indices > self.starts, self.vertical_angle[indices], default)
+
+    def _elevation_difference_to_horizon(self, horizon_indices: np.ndarray, point_indices: np.ndarray) -> np.ndarray:
+        return self.z[point_indices] - (
+            self.z[self.starts]
+            + np.tan(np.radians(self.vertical_angle[horizon_indices])) * self.distance[point_indices]
+        )
+
+    def _global_horizon_indices_or_missing(self) -> np.ndarray:
+        if self._global_horizon_indices is None:
+            if self.los_type == NamesConstants.LOS_GLOBAL:
+                indices = self._last_horizon_index(np.arange(self.horizon.shape[0]) != self._target_per_point())
+                indices = np.where(indices == -1, self.starts, indices)
+            else:
+                indices = self._last_horizon_index()
+
+            self._global_horizon_indices = indices
+
+        return self._global_horizon_indices
+
+    def global_horizon_indices(self) -> np.ndarray:
+        """Global horizon of each LoS, observer if there is no global horizon."""
+        indices = self._global_horizon_indices_or_missing()
+        return np.where(indices == -1, self.starts, indices)
+
+    def global_horizon_or_end_indices(self) -> np.ndarray:
+        """Global horizon of each LoS, last point if there is no global horizon (as `LoS.get_global_horizon`)."""
+        indices = self._global_horizon_indices_or_missing()
+        return np.where(indices == -1, self.ends, indices)
+
+    def max_local_horizon_indices(self) -> np.ndarray:
+        """Maximal local horizon of each LoS, -1 if there is no such horizon."""
+        if self._max_local_horizon_indices is None:
+            points = np.arange(self.horizon.shape[0])
+
+            if self.los_type == NamesConstants.LOS_LOCAL:
+                indices = self._last_horizon_index()
+
+            elif self.los_type == NamesConstants.LOS_GLOBAL:
+                indices = self._last_horizon_index(points < self._target_per_point())
+
+            else:
+                global_horizon = self.global_horizon_indices()
+                global_horizon_per_point = np.repeat(global_horizon, np.diff(self.offsets))
+                indices = self._last_horizon_index(points < global_horizon_per_point)
+                indices = np.where(global_horizon > self.starts, indices, -1)
+
+            self._max_local_horizon_indices = indices
+
+        return self._max_local_horizon_indices
+
+    def max_local_horizon_direction_indices(self) -> np.ndarray:
+        """Maximal local horizon of each LoS, point after observer if there is no such horizon.
+
+        Same as `LoSWithoutTarget.get_max_local_horizon(direction_point=True)`.
+        """
+        indices = self.max_local_horizon_indices()
+        return np.where(indices == -1, self.starts + 1, indices)
+
+    def horizon_line_vertices(self, horizon_type: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """X, Y, Z and vertical angle (as M) of horizon line vertices, one per LoS.
+
+        Same vertices as `ExtractHorizonLinesAlgorithm` takes from `LoSWithoutTarget`.
+        """
+        if horizon_type == NamesConstants.HORIZON_GLOBAL:
+            indices = self.global_horizon_or_end_indices()
+            values = self.get_global_horizon_angle()
+
+        else:
+            indices = self.max_local_horizon_direction_indices()
+            values = self.get_max_local_horizon_angle()
+
+        return self.x[indices], self.y[indices], self.z[indices], values
+
+    def previous_horizon_indices(self) -> np.ndarray:
+        """For every point index of the last horizon before it on the same LoS, -1 if there is none."""
+        if self._previous_horizon_indices is None:
+            self._previous_horizon_indices = segmented_previous_index(self.horizon, self.offsets)
+
+        return self._previous_horizon_indices
+
+    def _target_per_point(self) -> np.ndarray:
+        return np.repeat(self.target_indices, np.diff(self.offsets))
+
+    def target_point_indices(self) -> np.ndarray:
+        if self.los_type == NamesConstants.LOS_GLOBAL:
+            return self.target_indices
+        return self.ends
+
+    def is_target_visible(self) -> np.ndarray:
+        return self.visible[self.target_point_indices()]
+
+    def get_view_angle(self) -> np.ndarray:
+        return self.vertical_angle[self.ends]
+
+    def get_elevation_difference(self) -> np.ndarray:
+        return self.z[self.starts] - self.z[self.ends]
+
+    def get_angle_difference_local_horizon(self) -> np.ndarray:
+        horizons = self.max_local_horizon_indices()
+        horizon_angles = self._horizon_angles(horizons, -90)
+        return self.get_view_angle() - horizon_angles
+
+    def get_elevation_difference_local_horizon(self) -> np.ndarray:
+        horizons = self.max_local_horizon_indices()
+        return np.where(
+            horizons > self.starts,
+            self.z[self.ends]
+            - self.z[self.starts]
+            - np.tan(np.radians(self.vertical_angle[horizons])) * self.distance[self.ends],
+            self.z[self.ends] - self.z[self.starts],
+        )
+
+    def get_los_slope_difference(self) -> np.ndarray:
+        los_slope = np.degrees(
+            np.arctan(
+                (self.z[self.ends] - self.z[self.ends - 1]) / (self.distance[self.ends] - self.distance[self.ends - 1])
+            )
+        )
+        return los_slope - self.get_view_angle()
+
+    def get_local_horizon_distance(self) -> np.ndarray:
+        horizons = self.max_local_horizon_indices()
+        return np.where(horizons > self.starts, self.distance[horizons], self.distance[self.ends])
+
+    def get_local_horizon_count(self) -> np.ndarray:
+        return np.add.reduceat(self.horizon.astype(np.int64), self.starts)
+
+    def get_angle_difference_global_horizon(self) -> np.ndarray:
+        horizons = self.global_horizon_indices()
+        targets = self.target_point_indices()
+        return self.vertical_angle[targets] - self._horizon_angles(horizons, -90)
+
+    def get_elevation_difference_global_horizon(self) -> np.ndarray:
+        horizons = self.global_horizon_indices()
+        targets = self.target_point_indices()
+        return np.where(
+            horizons > self.starts,
+            self._elevation_difference_to_horizon(horizons, targets),
+            self.z[targets] - self.z[self.starts],
+        )
+
+    def get_horizon_count(self) -> np.ndarray:
+        behind_target = np.arange(self.horizon.shape[0]) > self._target_per_point()
+        return np.add.reduceat((self.horizon & behind_target).astype(np.int64), self.starts)
+
+    def get_horizon_distance(self) -> np.ndarray:
+        return self.distance[self.global_horizon_indices()]
+
+    def get_maximal_vertical_angle(self) -> np.ndarray:
+        return np.maximum.reduceat(self.vertical_angle, self.starts)
+
+    def get_global_horizon_distance(self) -> np.ndarray:
+        horizons = self._global_horizon_indices_or_missing()
+        return np.where(horizons != -1, self.distance[horizons], 0)
+
+    def get_global_horizon_angle(self) -> np.ndarray:
+        horizons = self._global_horizon_indices_or_missing()
+        return np.where(horizons != -1, self.vertical_angle[horizons], 90)
+
+    def get_max_local_horizon_distance(self) -> np.ndarray:
+        horizons = self.max_local_horizon_indices()
+        return np.where(horizons != -1, self.distance[horizons], 0)
+
+    def get_max_local_horizon_angle(self) -> np.ndarray:
+        horizons = self.max_local_horizon_indices()
+        return np.where(horizons != -1, self.vertical_angle[horizons], -90)
+
+    def get_elevation_difference_horizon_at_points(self) -> np.ndarray:
+        """Elevation difference of every point to the previous horizon.
+
+        See `LoS.get_elevation_difference_horizon_at_point`.
+        """
+        points = np.arange(self.horizon.shape[0])
+        starts = np.repeat(self.starts, np.diff(self.offsets))
+        horizons = self.previous_horizon_indices()
+
+        observer_z = self.z[starts]
+        difference = np.where(
+            horizons != -1,
+            self.z - (observer_z + np.tan(np.radians(self.vertical_angle[np.maximum(horizons, 0)])) * self.distance),
+            self.z - observer_z,
+        )
+
+        return np.where(points - starts > 1, difference, 0)
+
+    def get_angle_difference_horizon_at_points(self) -> np.ndarray:
+        """Angle difference of every point to the previous horizon, see `LoS.get_angle_difference_horizon_at_point`."""
+        points = np.arange(self.horizon.shape[0])
+        starts = np.repeat(self.starts, np.diff(self.offsets))
+        horizons = self.previous_horizon_indices()
+
+        difference = np.where(
+            horizons > starts,
+            self.vertical_angle - self.vertical_angle[np.maximum(horizons, 0)],
+            self.vertical_angle,
+        )
+
+        return np.where(points - starts > 1, difference, -90)
+
+    def get_elevation_difference_global_horizon_at_points(self) -> np.ndarray:
+        """Elevation difference of every point to the global horizon of its LoS."""
+        lengths = np.diff(self.offsets)
+        starts = np.repeat(self.starts, lengths)
+        horizons = np.repeat(self.global_horizon_indices(), lengths)
+
+        return np.where(
+            horizons > starts,
+            self.z - (self.z[starts] + np.tan(np.radians(self.vertical_angle[horizons])) * self.distance),
+            self.z,
+        )
+
+    def get_angle_difference_global_horizon_at_points(self) -> np.ndarray:
+        """Angle difference of every point to the global horizon of its LoS."""
+        lengths = np.diff(self.offsets)
+        starts = np.repeat(self.starts, lengths)
+        horizons = np.repeat(self.global_horizon_indices(), lengths)
+
+        return self.vertical_angle - np.where(horizons > starts, self.vertical_angle[horizons], -90)
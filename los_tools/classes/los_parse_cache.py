@@ -0,0 +1,108 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_PARSE_CACHE_MEMORY = 512 * 1024 * 1024
+
+
+class LoSParseCache:
+    """LRU cache of parsed LoS limited by total size of stored arrays in bytes.
+
+    Every entry is a structured array of `LOS_POINT_DTYPE` with samples of one LoS and index of its target (relative
+    to the start of LoS, -1 if there is none). Entries can belong to a group (e.g. LoS of one layer parsed with the same
+    settings), number of cached entries of group is available by `count`.
+    """
+
+    def __init__(self, memory_budget: int = DEFAULT_PARSE_CACHE_MEMORY):
+        self.memory_budget = memory_budget
+        self.memory_used = 0
+        self._items: "OrderedDict[Hashable, Tuple[np.ndarray, int]]" = OrderedDict()
+        self._groups: Dict[Hashable, Hashable] = {}
+        self._groups_counts: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: Hashable) -> Optional[Tuple[np.ndarray, int]]:
+        with self._lock:
+            item = self._items.get(key)
+
+            if item is not None:
+                self._items.move_to_end(key)
+
+            return item
+
+    def count(self, group: Hashable) -> int:
+        """Number of cached entries of group."""
+        with self._lock:
+            return self._groups_counts.get(group, 0)
+
+    def fits(self, nbytes: int) -> bool:
+        """Whether entries of given total size can be cached together."""
+        return nbytes <= self.memory_budget
+
+    def put(self, key: Hashable, data: np.ndarray, target_index: int, group: Optional[Hashable] = None) -> None:
+        with self._lock:
+            if key in self._items:
+                self._remove(key)
+
+            if self.memory_budget < data.nbytes:
+                return
+
+            self._items[key] = (data, target_index)
+            self.memory_used += data.nbytes
+
+            if group is not None:
+                self._groups[key] = group
+                self._groups_counts[group] = self._groups_counts.get(group, 0) + 1
+
+            self._evict()
+
+    def resize(self, memory_budget: int) -> None:
+        with self._lock:
+            self.memory_budget = memory_budget
+            self._evict()
+
+    def _remove(self, key: Hashable) -> None:
+        data, _ = self._items.pop(key)
+        self.memory_used -= data.nbytes
+
+        group = self._groups.pop(key, None)
+
+        if group is not None:
+            self._groups_counts[group] -= 1
+
+            if self._groups_counts[group] == 0:
+                del self._groups_counts[group]
+
+    def _evict(self) -> None:
+        while self.memory_used > self.memory_budget:
+            self._remove(next(iter(self._items)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._groups.clear()
+            self._groups_counts.clear()
+            self.memory_used = 0
+
+
+_shared_parse_cache: Optional[LoSParseCache] = None
+_shared_parse_cache_lock = threading.Lock()
+
+
+def shared_parse_cache(memory_budget: int = DEFAULT_PARSE_CACHE_MEMORY) -> LoSParseCache:
+    """Parse cache shared by all algorithms in the session, its budget is updated to the given one."""
+    global _shared_parse_cache
+
+    with _shared_parse_cache_lock:
+        if _shared_parse_cache is None:
+            _shared_parse_cache = LoSParseCache(memory_budget)
+
+        elif _shared_parse_cache.memory_budget != memory_budget:
+            _shared_parse_cache.resize(memory_budget)
+
+        return _shared_parse_cache
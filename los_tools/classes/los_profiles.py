@@ -0,0 +1,314 @@
+import hashlib
+import math
+import zipfile
+from typing import Dict, Iterator, List, NamedTuple
+
+import numpy as np
+
+from los_tools.classes.los_arrays import polar_coordinates
+from los_tools.processing.tools.util_functions import extend_line_end, segmentize_lines_coordinates
+
+LOS_PROFILES_EXTENSION = ".npz"
+LOS_PROFILES_FILE_FILTER = "LoS profiles (*.npz)"
+LOS_PROFILES_VERSION = 2
+
+PROFILES_CHUNK_SAMPLES = 2**20
+
+# template of profiles whose vertices are rebuilt by segmentizing the line from observer to target
+SEGMENTED_LINE = -1
+
+
+class LoSProfile(NamedTuple):
+    """Single LoS loaded from profiles file, `points` are x, y, z coordinates of LoS vertices with elevation."""
+
+    los_type: str
+    id_observer: int
+    id_target: int
+    observer_offset: float
+    target_offset: float
+    target_x: float
+    target_y: float
+    azimuth: float
+    points: np.ndarray
+
+
+class LoSProfilesWriter:
+    """Writes LoS as profiles (observer, azimuth, distance template and elevations) into `.npz` file.
+
+    LoS are straight lines, so their vertices are stored as distances from observer that are shared by all LoS with
+    the same distances (e.g. no target LoS created from one distance table). Vertices of LoS created by segmentizing
+    line from observer to target (optionally extended behind the target) are not stored at all, they are rebuilt from
+    the observer, the target, the extension and `segment_length` when the profile is loaded. Elevations are NaN where
+    no raster has value, such vertices are skipped when the profile is loaded.
+
+    Profiles are written to the file in chunks of about `PROFILES_CHUNK_SAMPLES` elevations, `close` finishes the file.
+    """
+
+    ATTRIBUTES = {
+        "id_observer": np.int64,
+        "id_target": np.int64,
+        "observer_offset": np.float64,
+        "target_offset": np.float64,
+        "target_x": np.float64,
+        "target_y": np.float64,
+        "observer_x": np.float64,
+        "observer_y": np.float64,
+        "azimuth": np.float64,
+        "template": np.int64,
+        "extension": np.float64,
+    }
+
+    def __init__(self, path: str, los_type: str, segment_length: float = math.nan):
+        self.los_type = los_type
+        self.segment_length = segment_length
+
+        self._file = zipfile.ZipFile(path, mode="w", compression=zipfile.ZIP_DEFLATED, allowZip64=True)
+        self._chunks = 0
+        self._written = 0
+
+        self._attributes: Dict[str, List] = {name: [] for name in self.ATTRIBUTES}
+        self._z: List[np.ndarray] = []
+        self._z_size = 0
+
+        self._templates: List[np.ndarray] = []
+        self._templates_ids: Dict[bytes, List[int]] = {}
+
+    def __len__(self) -> int:
+        return self._written + len(self._z)
+
+    def _template_id(self, distances: np.ndarray) -> int:
+        """Id of template with the same distances, the distances are added as new template if there is none."""
+        key = hashlib.blake2b(distances.data, digest_size=16).digest()
+        templates_ids = self._templates_ids.setdefault(key, [])
+
+        for template_id in templates_ids:
+            if np.array_equal(self._templates[template_id], distances):
+                return template_id
+
+        templates_ids.append(len(self._templates))
+        self._templates.append(distances)
+
+        return len(self._templates) - 1
+
+    def _add(self, zs: np.ndarray, values: List) -> None:
+        for name, value in zip(self._attributes, values):
+            self._attributes[name].append(value)
+
+        self._z.append(zs)
+        self._z_size += zs.shape[0]
+
+        if PROFILES_CHUNK_SAMPLES <= self._z_size:
+            self.flush()
+
+    def add_profile(
+        self,
+        observer_x: float,
+        observer_y: float,
+        azimuth: float,
+        distances: np.ndarray,
+        zs: np.ndarray,
+        id_observer: int,
+        id_target: int,
+        observer_offset: float,
+        target_offset: float = 0.0,
+        target_x: float = math.nan,
+        target_y: float = math.nan,
+    ) -> None:
+        """Adds LoS given by its observer, azimuth (degrees) and elevations at distances from observer."""
+        distances = np.ascontiguousarray(distances, dtype=np.float64)
+        zs = np.asarray(zs, dtype=np.float64)
+
+        if distances.shape != zs.shape:
+            raise ValueError("Distances and elevations of LoS profile must have the same size.")
+
+        values = [
+            id_observer,
+            id_target,
+            observer_offset,
+            target_offset,
+            target_x,
+            target_y,
+            observer_x,
+            observer_y,
+            azimuth,
+            self._template_id(distances),
+            math.nan,
+        ]
+
+        self._add(zs, values)
+
+    def add_segmented_line(
+        self,
+        observer_x: float,
+        observer_y: float,
+        target_x: float,
+        target_y: float,
+        zs: np.ndarray,
+        id_observer: int,
+        id_target: int,
+        observer_offset: float,
+        target_offset: float = 0.0,
+        extension: float = 0.0,
+    ) -> None:
+        """Adds LoS from observer to target (extended by `extension` behind it if positive) segmentized by
+        `segment_length` of the writer (`segmentize_lines_coordinates`), `zs` are elevations of its vertices."""
+        if math.isnan(self.segment_length):
+            raise ValueError("Segment length of LoS profiles writer must be set to add segmented lines.")
+
+        values = [
+            id_observer,
+            id_target,
+            observer_offset,
+            target_offset,
+            target_x,
+            target_y,
+            observer_x,
+            observer_y,
+            math.degrees(math.atan2(target_x - observer_x, target_y - observer_y)),
+            SEGMENTED_LINE,
+            extension,
+        ]
+
+        self._add(np.asarray(zs, dtype=np.float64), values)
+
+    def add_line(self, xs: np.ndarray, ys: np.ndarray, zs: np.ndarray, **attributes) -> None:
+        """Adds straight LoS given by coordinates of its vertices, the first vertex is observer."""
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+
+        azimuth = math.degrees(math.atan2(xs[-1] - xs[0], ys[-1] - ys[0]))
+
+        self.add_profile(xs[0], ys[0], azimuth, np.hypot(xs - xs[0], ys - ys[0]), zs, **attributes)
+
+    def _write_array(self, name: str, values: np.ndarray) -> None:
+        with self._file.open(f"{name}.npy", mode="w", force_zip64=True) as file:
+            np.lib.format.write_array(file, np.asanyarray(values), allow_pickle=False)
+
+    def flush(self) -> None:
+        """Writes profiles added since the last flush as new chunk of the file."""
+        if not self._z:
+            return
+
+        chunk = f"{self._chunks:06d}"
+
+        for name, dtype in self.ATTRIBUTES.items():
+            self._write_array(f"{name}_{chunk}", np.array(self._attributes[name], dtype=dtype))
+            self._attributes[name].clear()
+
+        self._write_array(f"sizes_{chunk}", np.array([z.shape[0] for z in self._z], dtype=np.int64))
+        self._write_array(f"z_{chunk}", np.concatenate(self._z))
+
+        self._chunks += 1
+        self._written += len(self._z)
+        self._z.clear()
+        self._z_size = 0
+
+    def close(self) -> None:
+        """Writes remaining profiles, distance templates and description of the file and closes it."""
+        self.flush()
+
+        templates_sizes = [template.shape[0] for template in self._templates]
+
+        self._write_array("version", np.array(LOS_PROFILES_VERSION))
+        self._write_array("los_type", np.array(self.los_type))
+        self._write_array("segment_length", np.array(self.segment_length, dtype=np.float64))
+        self._write_array("chunks", np.array(self._chunks, dtype=np.int64))
+        self._write_array(
+            "templates_offsets", np.concatenate([[0], np.cumsum(templates_sizes, dtype=np.int64)]).astype(np.int64)
+        )
+        self._write_array("templates_distances", np.concatenate(self._templates) if self._templates else np.empty(0))
+
+        self._file.close()
+
+
+class LoSProfiles:
+    """LoS profiles loaded from `.npz` file written by `LoSProfilesWriter`, indexed in order of writing."""
+
+    def __init__(self, path: str):
+        with np.load(path, allow_pickle=False) as data:
+            version = int(data["version"])
+
+            if version != LOS_PROFILES_VERSION:
+                raise ValueError(f"Unsupported version `{version}` of LoS profiles file `{path}`.")
+
+            self.los_type = str(data["los_type"])
+            self.segment_length = float(data["segment_length"])
+
+            chunks = [f"{chunk:06d}" for chunk in range(int(data["chunks"]))]
+
+            self.arrays: Dict[str, np.ndarray] = {
+                name: data[name] for name in ["templates_offsets", "templates_distances"]
+            }
+
+            for name, dtype in LoSProfilesWriter.ATTRIBUTES.items():
+                self.arrays[name] = np.concatenate([np.empty(0, dtype=dtype)] + [data[f"{name}_{c}"] for c in chunks])
+
+            self.arrays["z"] = np.concatenate([np.empty(0)] + [data[f"z_{chunk}"] for chunk in chunks])
+
+            sizes = np.concatenate([np.empty(0, dtype=np.int64)] + [data[f"sizes_{chunk}"] for chunk in chunks])
+            self.arrays["offsets"] = np.concatenate([[0], np.cumsum(sizes, dtype=np.int64)]).astype(np.int64)
+
+    def __len__(self) -> int:
+        return self.arrays["offsets"].shape[0] - 1
+
+    def _xy(self, index: int) -> np.ndarray:
+        """X and Y of vertices of profile, rebuilt from its template or by segmentizing its line."""
+        arrays = self.arrays
+
+        observer = np.array([[arrays["observer_x"][index], arrays["observer_y"][index]]])
+        template = int(arrays["template"][index])
+
+        if template == SEGMENTED_LINE:
+            target = np.array([[arrays["target_x"][index], arrays["target_y"][index]]])
+            extension = float(arrays["extension"][index])
+
+            vertices = [observer, target]
+
+            if 0 < extension:
+                vertices.append(extend_line_end(observer, target, np.array([extension])))
+
+            coords, _ = segmentize_lines_coordinates(np.stack(vertices, axis=1), self.segment_length)
+            return coords
+
+        distances = arrays["templates_distances"][
+            arrays["templates_offsets"][template] : arrays["templates_offsets"][template + 1]
+        ]
+
+        xs, ys = polar_coordinates(
+            float(observer[0, 0]), float(observer[0, 1]), np.array([float(arrays["azimuth"][index])]), distances
+        )
+
+        return np.column_stack((xs[0], ys[0]))
+
+    def __getitem__(self, index: int) -> LoSProfile:
+        if index < 0:
+            index += len(self)
+
+        if not 0 <= index < len(self):
+            raise IndexError("LoS profile index out of range.")
+
+        arrays = self.arrays
+
+        xy = self._xy(index)
+        zs = arrays["z"][arrays["offsets"][index] : arrays["offsets"][index + 1]]
+
+        if xy.shape[0] != zs.shape[0]:
+            raise ValueError(f"LoS profile `{index}` has {zs.shape[0]} elevations for {xy.shape[0]} vertices.")
+
+        has_value = ~np.isnan(zs)
+
+        return LoSProfile(
+            self.los_type,
+            int(arrays["id_observer"][index]),
+            int(arrays["id_target"][index]),
+            float(arrays["observer_offset"][index]),
+            float(arrays["target_offset"][index]),
+            float(arrays["target_x"][index]),
+            float(arrays["target_y"][index]),
+            float(arrays["azimuth"][index]),
+            np.column_stack((xy[has_value], zs[has_value])),
+        )
+
+    def __iter__(self) -> Iterator[LoSProfile]:
+        for i in range(len(self)):
+            yield self[i]
@@ -0,0 +1,119 @@
+import hashlib
+import os
+import threading
+import uuid
+from typing import Callable, List, Optional
+
+import numpy as np
+
+DEFAULT_PROFILE_CACHE_SIZE = 1024 * 1024 * 1024
+PROFILE_CACHE_EXTENSION = ".npy"
+
+
+class ProfileCache:
+    """Cache of sampled elevation profiles stored as `.npy` files in a directory, limited by total size in bytes.
+
+    Entries are keyed by fingerprint of rasters and coordinates of sampled points. The least recently used files
+    (by modification time, updated on every hit) are removed once the size of the cache exceeds `max_size`.
+    """
+
+    def __init__(self, directory: str, max_size: int = DEFAULT_PROFILE_CACHE_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(fingerprint: str, xs: np.ndarray, ys: np.ndarray) -> str:
+        """Key of profile sampled from rasters with given fingerprint at points with given coordinates."""
+        key = hashlib.sha1(fingerprint.encode("utf-8"))
+        key.update(np.ascontiguousarray(xs, dtype=np.float64).tobytes())
+        key.update(np.ascontiguousarray(ys, dtype=np.float64).tobytes())
+
+        return key.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}{PROFILE_CACHE_EXTENSION}")
+
+    def get(self, key: str, sample: Callable[[], np.ndarray]) -> np.ndarray:
+        """Returns cached profile for the key, the profile is sampled and stored if it is not cached."""
+        path = self._path(key)
+
+        try:
+            values = np.load(path, allow_pickle=False)
+            os.utime(path)
+            return values
+        except (OSError, ValueError, EOFError):
+            pass
+
+        values = sample()
+
+        self._store(path, values)
+
+        return values
+
+    def _store(self, path: str, values: np.ndarray) -> None:
+        # written under unique name and renamed, so readers never see partially written file
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+
+        try:
+            with open(tmp_path, "wb") as file:
+                np.save(file, values, allow_pickle=False)
+
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._files_size()
+            else:
+                self._size += os.path.getsize(path)
+
+            if self.max_size < self._size:
+                self._evict()
+
+    def _files(self) -> List[os.DirEntry]:
+        with os.scandir(self.directory) as entries:
+            return [entry for entry in entries if entry.is_file() and entry.name.endswith(PROFILE_CACHE_EXTENSION)]
+
+    def _files_size(self) -> int:
+        return sum(entry.stat().st_size for entry in self._files())
+
+    def _evict(self) -> None:
+        files = sorted((entry.stat().st_mtime_ns, entry.stat().st_size, entry.path) for entry in self._files())
+        size = sum(file_size for _, file_size, _ in files)
+
+        for _, file_size, path in files:
+            if size <= self.max_size:
+                break
+
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+
+            size -= file_size
+
+        self._size = size
+
+    @property
+    def size(self) -> int:
+        """Total size of cached profiles in bytes."""
+        with self._lock:
+            self._size = self._files_size()
+            return self._size
+
+    def clear(self) -> None:
+        with self._lock:
+            for entry in self._files():
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+            self._size = 0
@@ -0,0 +1,277 @@
+import math
+import os
+import re
+from typing import Dict, Hashable, List, NamedTuple, Optional
+
+import numpy as np
+
+from los_tools.classes.raster_tiles import RasterGrid, RasterSampler
+
+ENVI_DATA_TYPES = {
+    1: np.uint8,
+    2: np.int16,
+    3: np.int32,
+    4: np.float32,
+    5: np.float64,
+    12: np.uint16,
+    13: np.uint32,
+    14: np.int64,
+    15: np.uint64,
+}
+
+GDAL_DATA_TYPES = {
+    "Byte": np.uint8,
+    "Int8": np.int8,
+    "UInt16": np.uint16,
+    "Int16": np.int16,
+    "UInt32": np.uint32,
+    "Int32": np.int32,
+    "UInt64": np.uint64,
+    "Int64": np.int64,
+    "Float32": np.float32,
+    "Float64": np.float64,
+}
+
+
+class BlockLayout(NamedTuple):
+    """Layout of uncompressed single band raster stored in file as blocks of equal size one after another.
+
+    Row organized rasters (ENVI, striped GeoTIFF) are a single block of the whole raster size.
+    """
+
+    path: str
+    dtype: np.dtype
+    offset: int
+    width: int
+    height: int
+    block_width: int
+    block_height: int
+
+    @property
+    def blocks_x(self) -> int:
+        return math.ceil(self.width / self.block_width)
+
+    @property
+    def blocks_y(self) -> int:
+        return math.ceil(self.height / self.block_height)
+
+    @property
+    def size(self) -> int:
+        """Number of bytes the layout occupies in the file."""
+        return self.blocks_x * self.blocks_y * self.block_width * self.block_height * self.dtype.itemsize
+
+
+def memory_map(layout: BlockLayout) -> np.memmap:
+    """Read only memory map of raster blocks with shape `(blocks_y, blocks_x, block_height, block_width)`."""
+    return np.memmap(
+        layout.path,
+        dtype=layout.dtype,
+        mode="r",
+        offset=layout.offset,
+        shape=(layout.blocks_y, layout.blocks_x, layout.block_height, layout.block_width),
+    )
+
+
+def fits_file(layout: BlockLayout) -> bool:
+    return os.path.isfile(layout.path) and layout.offset + layout.size <= os.path.getsize(layout.path)
+
+
+def parse_envi_header(text: str) -> Dict[str, str]:
+    """Parses `key = value` pairs from ENVI header, keys are lower case, values in `{}` can span multiple lines."""
+    values = {}
+
+    for match in re.finditer(r"^\s*([^=\n]+?)\s*=\s*(\{[^}]*\}|[^\n]*)", text, re.MULTILINE):
+        values[match.group(1).lower()] = match.group(2).strip()
+
+    return values
+
+
+def parse_envi_list(value: str) -> List[float]:
+    """Numbers from ENVI header list value like `{0.1, 0.2}`."""
+    return [float(item) for item in value.strip("{}").split(",") if item.strip()]
+
+
+def envi_layout(path: str, header_text: str) -> Optional[BlockLayout]:
+    """Layout of single band ENVI raster from its header, None if it cannot be memory mapped.
+
+    Scaled rasters (gain or offset) are not mapped, as stored values are not the elevations.
+    """
+    header = parse_envi_header(header_text)
+
+    try:
+        if int(header.get("bands", 1)) != 1 or int(header.get("file compression", 0)) != 0:
+            return None
+
+        gains = parse_envi_list(header.get("data gain values", ""))
+        offsets = parse_envi_list(header.get("data offset values", ""))
+
+        if any(gain != 1 for gain in gains) or any(offset != 0 for offset in offsets):
+            return None
+
+        data_type = ENVI_DATA_TYPES.get(int(header["data type"]))
+
+        if data_type is None:
+            return None
+
+        byte_order = ">" if int(header.get("byte order", 0)) == 1 else "<"
+        width = int(header["samples"])
+        height = int(header["lines"])
+        offset = int(header.get("header offset", 0))
+
+    except (KeyError, ValueError):
+        return None
+
+    return BlockLayout(path, np.dtype(data_type).newbyteorder(byte_order), offset, width, height, width, height)
+
+
+def contiguous_blocks_layout(
+    path: str,
+    dtype: np.dtype,
+    width: int,
+    height: int,
+    block_width: int,
+    block_height: int,
+    block_offsets: List[Optional[int]],
+) -> Optional[BlockLayout]:
+    """Layout of raster whose blocks (in row major order) follow each other in the file, None otherwise."""
+    if not block_offsets or any(offset is None or offset <= 0 for offset in block_offsets):
+        return None
+
+    block_size = block_width * block_height * dtype.itemsize
+
+    for i, offset in enumerate(block_offsets):
+        if offset != block_offsets[0] + i * block_size:
+            return None
+
+    if block_width == width:
+        # strips covering whole rows, the last strip can be shorter
+        return BlockLayout(path, dtype, block_offsets[0], width, height, width, height)
+
+    return BlockLayout(path, dtype, block_offsets[0], width, height, block_width, block_height)
+
+
+def gdal_layout(path: str) -> Optional[BlockLayout]:
+    """Layout of local ENVI or uncompressed GeoTIFF raster read by GDAL, None if it cannot be memory mapped.
+
+    Rasters with scale or offset are not mapped, the values are read through provider that applies them.
+    """
+    try:
+        from osgeo import gdal
+    except ImportError:
+        return None
+
+    dataset = gdal.OpenEx(path, gdal.OF_RASTER | gdal.OF_READONLY)
+
+    if dataset is None or dataset.RasterCount != 1:
+        return None
+
+    geo_transform = dataset.GetGeoTransform()
+
+    if geo_transform[2] != 0 or geo_transform[4] != 0:
+        return None
+
+    band = dataset.GetRasterBand(1)
+
+    if (band.GetScale() or 1) != 1 or (band.GetOffset() or 0) != 0:
+        return None
+
+    driver = dataset.GetDriver().ShortName
+
+    if driver == "ENVI":
+        for file in dataset.GetFileList() or []:
+            if file.lower().endswith(".hdr"):
+                with open(file, encoding="utf-8", errors="ignore") as header_file:
+                    return envi_layout(path, header_file.read())
+
+        return None
+
+    if driver != "GTiff":
+        return None
+
+    image_structure = band.GetMetadata("IMAGE_STRUCTURE") or {}
+    image_structure.update(dataset.GetMetadata("IMAGE_STRUCTURE") or {})
+
+    if image_structure.get("COMPRESSION", "NONE") != "NONE" or "NBITS" in image_structure:
+        return None
+
+    data_type = GDAL_DATA_TYPES.get(gdal.GetDataTypeName(band.DataType))
+
+    if data_type is None:
+        return None
+
+    with open(path, "rb") as file:
+        byte_order = ">" if file.read(2) == b"MM" else "<"
+
+    block_width, block_height = band.GetBlockSize()
+    width = dataset.RasterXSize
+    height = dataset.RasterYSize
+
+    block_offsets = []
+
+    for block_y in range(math.ceil(height / block_height)):
+        for block_x in range(math.ceil(width / block_width)):
+            offset = band.GetMetadataItem(f"BLOCK_OFFSET_{block_x}_{block_y}", "TIFF")
+            block_offsets.append(int(offset) if offset else None)
+
+    return contiguous_blocks_layout(
+        path,
+        np.dtype(data_type).newbyteorder(byte_order),
+        width,
+        height,
+        block_width,
+        block_height,
+        block_offsets,
+    )
+
+
+class MemoryMappedRaster(RasterSampler):
+    """Raster sampled directly from memory mapped file, caching of data is left to the OS page cache."""
+
+    def __init__(self, key: Hashable, grid: RasterGrid, layout: BlockLayout):
+        super().__init__(key, grid)
+        self.layout = layout
+        self._blocks = memory_map(layout)
+
+    def _values(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        layout = self.layout
+
+        values = self._blocks[
+            rows // layout.block_height,
+            cols // layout.block_width,
+            rows % layout.block_height,
+            cols % layout.block_width,
+        ].astype(np.float64)
+
+        if self.grid.no_data is not None:
+            values[values == self.grid.no_data] = np.nan
+
+        return values
+
+    def cell_value(self, row: int, col: int) -> float:
+        if row < 0 or col < 0 or self.grid.height <= row or self.grid.width <= col:
+            return math.nan
+
+        layout = self.layout
+
+        value = float(
+            self._blocks[
+                row // layout.block_height,
+                col // layout.block_width,
+                row % layout.block_height,
+                col % layout.block_width,
+            ]
+        )
+
+        if value == self.grid.no_data:
+            return math.nan
+
+        return value
+
+    def cell_values(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        values = np.full(rows.shape[0], np.nan)
+
+        inside = self._inside(rows, cols)
+
+        values[inside] = self._values(rows[inside], cols[inside])
+
+        return values
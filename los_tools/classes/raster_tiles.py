@@ -0,0 +1,231 @@
+import math
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Hashable, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_TILE_SIZE = 256
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024
+
+
+class RasterGrid(NamedTuple):
+    """Georeferencing of north-up raster: top left corner, cell sizes, size in cells and no data value."""
+
+    x_min: float
+    y_max: float
+    x_res: float
+    y_res: float
+    width: int
+    height: int
+    no_data: Optional[float] = None
+
+
+class TileCache:
+    """LRU cache of raster tiles (NumPy arrays) limited by total size of stored arrays in bytes."""
+
+    def __init__(self, memory_budget: int = DEFAULT_MEMORY_BUDGET):
+        self.memory_budget = memory_budget
+        self.memory_used = 0
+        self._tiles: "OrderedDict[Hashable, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._tiles)
+
+    def get(self, key: Hashable, read_tile: Callable[[], np.ndarray]) -> np.ndarray:
+        """Returns cached tile for the key, the tile is read (and older tiles are evicted) if it is not cached."""
+        with self._lock:
+            tile = self._tiles.get(key)
+
+            if tile is not None:
+                self._tiles.move_to_end(key)
+                return tile
+
+        tile = read_tile()
+
+        with self._lock:
+            if key not in self._tiles:
+                self._tiles[key] = tile
+                self.memory_used += tile.nbytes
+
+            # always keep at least the newest tile, even if it does not fit into the budget
+            while self.memory_used > self.memory_budget and len(self._tiles) > 1:
+                _, evicted = self._tiles.popitem(last=False)
+                self.memory_used -= evicted.nbytes
+
+        return tile
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tiles.clear()
+            self.memory_used = 0
+
+
+class RasterSampler(ABC):
+    """Bilinear interpolation on north-up single band raster. Subclasses provide access to cell values."""
+
+    def __init__(self, key: Hashable, grid: RasterGrid):
+        self.key = key
+        self.grid = grid
+
+    @abstractmethod
+    def cell_value(self, row: int, col: int) -> float:
+        """Value of raster cell, NaN for no data or cell outside of the raster."""
+
+    @abstractmethod
+    def cell_values(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        """Values of raster cells, NaN for no data or cells outside of the raster."""
+
+    def _inside(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        return (0 <= rows) & (0 <= cols) & (rows < self.grid.height) & (cols < self.grid.width)
+
+    def bilinear_window(self, x: float, y: float) -> Tuple[int, int, float, float, float, float]:
+        """Row and column of bottom right cell of 2x2 window around point and the window cell centers extent."""
+        grid = self.grid
+
+        col = round((x - grid.x_min) / grid.x_res)
+        row = round((grid.y_max - y) / grid.y_res)
+
+        x_min = grid.x_min + (col - 1) * grid.x_res
+        x_max = x_min + 2 * grid.x_res
+        y_max = grid.y_max - (row - 1) * grid.y_res
+        y_min = y_max - 2 * grid.y_res
+
+        return (
+            row,
+            col,
+            x_min + grid.x_res / 2,
+            x_max - grid.x_res / 2,
+            y_min + grid.y_res / 2,
+            y_max - grid.y_res / 2,
+        )
+
+    def bilinear_value(self, x: float, y: float) -> Optional[float]:
+        """Bilinear interpolated value at point, same as `bilinear_interpolated_value` but without provider calls."""
+        row, col, x1, x2, y1, y2 = self.bilinear_window(x, y)
+
+        v12 = self.cell_value(row - 1, col - 1)
+        v22 = self.cell_value(row - 1, col)
+        v11 = self.cell_value(row, col - 1)
+        v21 = self.cell_value(row, col)
+
+        if math.isnan(v12) or math.isnan(v22) or math.isnan(v11) or math.isnan(v21):
+            return None
+
+        value = (
+            v11 * (x2 - x) * (y2 - y)
+            + v21 * (x - x1) * (y2 - y)
+            + v12 * (x2 - x) * (y - y1)
+            + v22 * (x - x1) * (y - y1)
+        ) / ((x2 - x1) * (y2 - y1))
+
+        if value == self.grid.no_data:
+            return None
+
+        return value
+
+    def bilinear_values(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """Vectorized `bilinear_value`, NaN where value cannot be interpolated."""
+        grid = self.grid
+
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+
+        # np.rint rounds half to even same as built-in round used by `bilinear_window`
+        cols = np.rint((xs - grid.x_min) / grid.x_res).astype(np.int64)
+        rows = np.rint((grid.y_max - ys) / grid.y_res).astype(np.int64)
+
+        x_min = grid.x_min + (cols - 1) * grid.x_res
+        x_max = x_min + 2 * grid.x_res
+        y_max = grid.y_max - (rows - 1) * grid.y_res
+        y_min = y_max - 2 * grid.y_res
+
+        x1 = x_min + grid.x_res / 2
+        x2 = x_max - grid.x_res / 2
+        y1 = y_min + grid.y_res / 2
+        y2 = y_max - grid.y_res / 2
+
+        v12 = self.cell_values(rows - 1, cols - 1)
+        v22 = self.cell_values(rows - 1, cols)
+        v11 = self.cell_values(rows, cols - 1)
+        v21 = self.cell_values(rows, cols)
+
+        values = (
+            v11 * (x2 - xs) * (y2 - ys)
+            + v21 * (xs - x1) * (y2 - ys)
+            + v12 * (x2 - xs) * (ys - y1)
+            + v22 * (xs - x1) * (ys - y1)
+        ) / ((x2 - x1) * (y2 - y1))
+
+        if grid.no_data is not None:
+            values[values == grid.no_data] = np.nan
+
+        return values
+
+
+class CachedRaster(RasterSampler):
+    """Single band raster read in square tiles through `TileCache`. No data and cells outside raster are NaN.
+
+    `read_tile(row, col, rows, cols)` must return float array of shape `(rows, cols)` with NaN for no data cells.
+    """
+
+    def __init__(
+        self,
+        key: Hashable,
+        grid: RasterGrid,
+        read_tile: Callable[[int, int, int, int], np.ndarray],
+        cache: TileCache,
+        tile_size: int = DEFAULT_TILE_SIZE,
+    ):
+        super().__init__(key, grid)
+        self.tile_size = tile_size
+        self._read_tile = read_tile
+        self._cache = cache
+
+    def tile(self, tile_row: int, tile_col: int) -> np.ndarray:
+        row = tile_row * self.tile_size
+        col = tile_col * self.tile_size
+        rows = min(self.tile_size, self.grid.height - row)
+        cols = min(self.tile_size, self.grid.width - col)
+
+        return self._cache.get(
+            (self.key, tile_row, tile_col),
+            lambda: self._read_tile(row, col, rows, cols),
+        )
+
+    def cell_value(self, row: int, col: int) -> float:
+        if row < 0 or col < 0 or self.grid.height <= row or self.grid.width <= col:
+            return math.nan
+
+        tile = self.tile(row // self.tile_size, col // self.tile_size)
+
+        return float(tile[row % self.tile_size, col % self.tile_size])
+
+    def cell_values(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        values = np.full(rows.shape[0], np.nan)
+
+        indices = np.flatnonzero(self._inside(rows, cols))
+
+        if indices.shape[0] == 0:
+            return values
+
+        rows = rows[indices]
+        cols = cols[indices]
+
+        tile_rows = rows // self.tile_size
+        tile_cols = cols // self.tile_size
+
+        tile_keys = tile_rows * (self.grid.width // self.tile_size + 1) + tile_cols
+
+        # group cells by tile, so that every tile is requested from cache only once
+        order = np.argsort(tile_keys, kind="stable")
+        sorted_keys = tile_keys[order]
+        group_starts = np.flatnonzero(sorted_keys[1:] != sorted_keys[:-1]) + 1
+
+        for group in np.split(order, group_starts):
+            tile = self.tile(int(tile_rows[group[0]]), int(tile_cols[group[0]]))
+            values[indices[group]] = tile[rows[group] % self.tile_size, cols[group] % self.tile_size]
+
+        return values
@@ -1,8 +1,10 @@
-from typing import List, Optional
+import math
+from typing import List, Optional, Tuple
 
 import numpy as np
 from qgis.core import QgsFeature, QgsGeometry, QgsLineString, QgsPoint, QgsVectorLayer
 
+from los_tools.classes.los_arrays import polar_coordinates
 from los_tools.constants.field_names import FieldNames
 from los_tools.constants.plugin import PluginConstants
 
@@ -18,6 +20,9 @@ class SamplingDistanceMatrix:
     def __init__(self, layer: Optional[QgsVectorLayer] = None):
         self.data: List[List[float]] = []
 
+        self._distance_template: Optional[np.ndarray] = None
+        self._distance_template_key: Optional[Tuple] = None
+
         if layer is not None:
             unit_name = layer.customProperty(PluginConstants.sampling_distance_layer_units_property)
 
@@ -132,38 +137,56 @@ class SamplingDistanceMatrix:
 
         return current_distance + value_to_add
 
-    def build_line(self, origin_point: QgsPoint, direction_point: QgsPoint) -> QgsLineString:
-        """Build a line based on the sampling distance matrix in given direction. Sampling and length is based on data."""
-        lines = []
-
-        for i in range(len(self)):
-            if i == 0:
-                line_res = self.densified_line(
-                    origin_point,
-                    origin_point.project(
-                        self.get_row_distance(i + 1),
-                        origin_point.azimuth(direction_point),
-                    ),
-                    i,
-                )
+    def distance_template(self) -> np.ndarray:
+        """Distances of line vertices from origin, same for every direction. Cached until the data changes."""
+        key = tuple(tuple(row) for row in self.data)
 
-                lines.append(line_res)
+        if self._distance_template is not None and self._distance_template_key == key:
+            return self._distance_template
 
-            else:
-                if i + 1 < len(self):
-                    this_line: QgsLineString = lines[-1].clone()
-                    this_line.extend(0, self.get_row_distance(i + 1) - self.get_row_distance(i))
+        parts = [np.zeros(1)]
+        start_distance = 0.0
+
+        for i in range(len(self) - 1):
+            end_distance = self.get_row_distance(i + 1)
+            length = end_distance - start_distance
+
+            if 0 < length:
+                # same number of segments as `densified_line` would produce for this part
+                segments = math.floor(length / np.nextafter(self.get_row_sampling_distance(i), np.inf)) + 1
+                steps = np.arange(1, segments + 1) * (1.0 / segments)
+                steps[-1] = 1
+
+                parts.append(start_distance + steps * length)
 
-                    line_res = self.densified_line(lines[-1].endPoint(), this_line.endPoint(), i)
+            start_distance = end_distance
 
-                    lines.append(line_res)
+        template = np.concatenate(parts)
+        template.flags.writeable = False
 
-        result_line = QgsLineString()
+        self._distance_template = template
+        self._distance_template_key = key
 
-        for line_part in lines:
-            result_line.append(line_part)
+        return template
+
+    def build_line_arrays(self, origin_point: QgsPoint, direction_point: QgsPoint) -> Tuple[np.ndarray, np.ndarray]:
+        """X and Y coordinates of line built by `build_line`, obtained by projecting the distance template."""
+        xs, ys = self.build_lines_arrays(origin_point, np.array([origin_point.azimuth(direction_point)]))
+
+        return xs[0], ys[0]
+
+    def build_lines_arrays(self, origin_point: QgsPoint, azimuths: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """X and Y coordinates of lines in given azimuths (degrees), arrays of shape (azimuths, template size)."""
+        if len(self) < 2:
+            raise IndexError("Sampling distance matrix needs at least two rows to build a line.")
+
+        return polar_coordinates(origin_point.x(), origin_point.y(), azimuths, self.distance_template())
+
+    def build_line(self, origin_point: QgsPoint, direction_point: QgsPoint) -> QgsLineString:
+        """Build a line based on the sampling distance matrix in given direction. Sampling and length is based on data."""
+        xs, ys = self.build_line_arrays(origin_point, direction_point)
 
-        return result_line
+        return QgsLineString(xs.tolist(), ys.tolist())
 
     def densified_line(self, start_point: QgsPoint, end_point: QgsPoint, sampling_row_index: int) -> QgsLineString:
         """Densifies the line between two points based on the sampling distance."""
@@ -0,0 +1,290 @@
+import math
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+from los_tools.classes.los_arrays import curvature_corrections, vertical_angles
+from los_tools.classes.raster_tiles import RasterGrid
+
+SAMPLES_CHUNK_SIZE = 2**20
+ACCUMULATOR_TILE_SIZE = 512
+
+Sampler = Callable[[np.ndarray, np.ndarray], np.ndarray]
+
+
+def perimeter_offsets(half_size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Row and column offsets (from center) of perimeter cells of square grid with `2 * half_size + 1` cells side."""
+    side = np.arange(-half_size, half_size)
+
+    rows = np.concatenate([np.full_like(side, -half_size), side, np.full_like(side, half_size), -side])
+    cols = np.concatenate([side, np.full_like(side, half_size), -side, np.full_like(side, -half_size)])
+
+    return rows, cols
+
+
+class RadialViewshed:
+    """Viewshed of single observer computed by R2 radial sweep on square grid centered on the observer.
+
+    Rays lead from the observer to centers of all perimeter cells and are sampled once per crossed row or column, every
+    sample is attributed to the cell it lies in. Visibility of sample is evaluated by the same model as target of local
+    LoS (`compute_los_batch_arrays`) - elevations are corrected for curvature and refraction, target offset is added
+    and the vertical angle is compared to the highest vertical angle of terrain between observer and the sample. Cells
+    crossed by several rays keep the highest angle difference.
+
+    `sample(xs, ys)` must return elevations at points, NaN where there is no value (e.g. `ListOfRasters.sample_many`).
+
+    If `clip_extent` (`x_min, y_min, x_max, y_max`) is given, only cells intersecting it are stored and sampled, rays
+    are still cast in the whole square, but their samples outside of the extent are skipped.
+    """
+
+    def __init__(
+        self,
+        observer_x: float,
+        observer_y: float,
+        observer_z: float,
+        radius: float,
+        cell_size: float,
+        target_offset: float = 0,
+        use_curvature_corrections: bool = True,
+        refraction_coefficient: float = 0.13,
+        clip_extent: Optional[Tuple[float, float, float, float]] = None,
+    ):
+        if cell_size <= 0:
+            raise ValueError("Cell size must be positive.")
+
+        self.observer_x = observer_x
+        self.observer_y = observer_y
+        self.observer_z = observer_z
+        self.radius = radius
+        self.cell_size = cell_size
+        self.target_offset = target_offset
+        self.use_curvature_corrections = use_curvature_corrections
+        self.refraction_coefficient = refraction_coefficient
+
+        self.half_size = max(1, math.ceil(radius / cell_size))
+
+        h = self.half_size
+        size = 2 * h + 1
+
+        # window of the square grid (row and column range) that is stored
+        self.row_start, self.row_end, self.col_start, self.col_end = 0, size, 0, size
+
+        if clip_extent is not None:
+            x_min, y_min, x_max, y_max = clip_extent
+            square_x_min = observer_x - (h + 0.5) * cell_size
+            square_y_max = observer_y + (h + 0.5) * cell_size
+
+            # the observer's cell is always kept
+            self.row_start = min(h, max(0, math.floor((square_y_max - y_max) / cell_size)))
+            self.row_end = max(h + 1, min(size, math.ceil((square_y_max - y_min) / cell_size)))
+            self.col_start = min(h, max(0, math.floor((x_min - square_x_min) / cell_size)))
+            self.col_end = max(h + 1, min(size, math.ceil((x_max - square_x_min) / cell_size)))
+
+        self.grid = RasterGrid(
+            x_min=observer_x - (h + 0.5 - self.col_start) * cell_size,
+            y_max=observer_y + (h + 0.5 - self.row_start) * cell_size,
+            x_res=cell_size,
+            y_res=cell_size,
+            width=self.col_end - self.col_start,
+            height=self.row_end - self.row_start,
+        )
+
+        self.rays_rows, self.rays_cols = perimeter_offsets(h)
+
+        self._angle_differences = np.full(self.grid.width * self.grid.height, -np.inf)
+        # zero distance has vertical angle 90, which is 180 above the observer's nadir
+        self._angle_differences[(h - self.row_start) * self.grid.width + h - self.col_start] = 180.0
+
+    @property
+    def number_of_rays(self) -> int:
+        return self.rays_rows.shape[0]
+
+    def rays_chunk_size(self) -> int:
+        """Number of rays processed together so that `SAMPLES_CHUNK_SIZE` samples are not exceeded."""
+        return max(1, SAMPLES_CHUNK_SIZE // self.half_size)
+
+    def process_rays(self, sample: Sampler, start: int, stop: int) -> None:
+        """Samples rays `start:stop` and updates angle differences of cells they cross."""
+        h = self.half_size
+
+        fractions = np.arange(1, h + 1) / h
+
+        rows_offsets = self.rays_rows[start:stop, None] * fractions[None, :]
+        cols_offsets = self.rays_cols[start:stop, None] * fractions[None, :]
+
+        distances = np.hypot(rows_offsets, cols_offsets) * self.cell_size
+
+        # rows and columns of cells of samples within stored window
+        rows = np.rint(rows_offsets).astype(np.int64) + (h - self.row_start)
+        cols = np.rint(cols_offsets).astype(np.int64) + (h - self.col_start)
+
+        # sample can be up to half of cell farther than center of its cell
+        within = (
+            (distances <= self.radius + self.cell_size / 2)
+            & (0 <= rows)
+            & (rows < self.grid.height)
+            & (0 <= cols)
+            & (cols < self.grid.width)
+        )
+
+        z = np.full(distances.shape, np.nan)
+        z[within] = sample(
+            self.observer_x + cols_offsets[within] * self.cell_size,
+            self.observer_y - rows_offsets[within] * self.cell_size,
+        )
+
+        # target offset is only applied together with curvature corrections, same as in `corrected_target_offsets`
+        if self.use_curvature_corrections:
+            corrections = curvature_corrections(distances, self.refraction_coefficient)
+            z = corrections.apply(z)
+            target_z = z + corrections.apply(np.full(distances.shape, float(self.target_offset)))
+        else:
+            target_z = z
+
+        terrain_angle = vertical_angles(distances, z - self.observer_z)
+        target_angle = vertical_angles(distances, target_z - self.observer_z)
+
+        # highest angle of terrain before each sample, observer's nadir if there is no terrain before it
+        previous_max_angle = np.full(distances.shape, -90.0)
+        np.fmax.accumulate(terrain_angle[:, :-1], axis=1, out=previous_max_angle[:, 1:])
+        np.fmax(previous_max_angle, -90.0, out=previous_max_angle)
+
+        angle_difference = target_angle - previous_max_angle
+
+        valid = ~np.isnan(angle_difference)
+
+        cells = rows[valid] * self.grid.width + cols[valid]
+
+        np.maximum.at(self._angle_differences, cells, angle_difference[valid])
+
+    def compute(self, sample: Sampler) -> np.ndarray:
+        """Processes all rays and returns angle differences."""
+        chunk_size = self.rays_chunk_size()
+
+        for start in range(0, self.number_of_rays, chunk_size):
+            self.process_rays(sample, start, start + chunk_size)
+
+        return self.angle_differences()
+
+    def cell_distances(self, row_start: int = 0, row_end: Optional[int] = None) -> np.ndarray:
+        """Distances of cell centers from the observer, for rows `row_start:row_end` of the grid."""
+        if row_end is None:
+            row_end = self.grid.height
+
+        h = self.half_size
+        rows = np.arange(self.row_start + row_start, self.row_start + row_end) - h
+        cols = np.arange(self.col_start, self.col_end) - h
+
+        return np.hypot(rows[:, None], cols[None, :]) * self.cell_size
+
+    def angle_differences_block(self, row_start: int, row_end: int) -> np.ndarray:
+        """Angle differences (see `angle_differences`) of rows `row_start:row_end` of the grid."""
+        values = self._angle_differences[row_start * self.grid.width : row_end * self.grid.width].reshape(
+            -1, self.grid.width
+        )
+        values = np.where(np.isneginf(values), np.nan, values)
+        values[self.radius < self.cell_distances(row_start, row_end)] = np.nan
+        return values
+
+    def angle_differences_blocks(self, block_size: int = ACCUMULATOR_TILE_SIZE) -> Iterator[Tuple[int, np.ndarray]]:
+        """Angle differences by blocks of rows, yields row of the first row of block and its values."""
+        for row in range(0, self.grid.height, block_size):
+            yield row, self.angle_differences_block(row, min(row + block_size, self.grid.height))
+
+    def angle_differences(self) -> np.ndarray:
+        """Difference between vertical angle of target in cell and the highest vertical angle of terrain in front of it.
+
+        Positive values mark visible cells. NaN for cells without value or farther than the radius.
+        """
+        return self.angle_differences_block(0, self.grid.height)
+
+
+def visibility_from_angle_differences(angle_differences: np.ndarray, no_data: int) -> np.ndarray:
+    """Binary visibility (1 visible, 0 invisible) as `uint8` array, `no_data` where angle difference is NaN."""
+    visibility = (angle_differences > 0).astype(np.uint8)
+    visibility[np.isnan(angle_differences)] = no_data
+    return visibility
+
+
+def window_offset(grid: RasterGrid, target_grid: RasterGrid) -> Tuple[int, int]:
+    """Row and column of `target_grid` where top left cell of `grid` (with the same cell size) is placed.
+
+    Cells of `grid` are shifted by less than half of cell to align with cells of `target_grid`.
+    """
+    return (
+        round((target_grid.y_max - grid.y_max) / target_grid.y_res),
+        round((grid.x_min - target_grid.x_min) / target_grid.x_res),
+    )
+
+
+class TiledAccumulator:
+    """Sums of many small arrays placed into large grid. Grid is stored in square tiles, created when first touched."""
+
+    def __init__(self, width: int, height: int, dtype: np.dtype, tile_size: int = ACCUMULATOR_TILE_SIZE):
+        self.width = width
+        self.height = height
+        self.dtype = np.dtype(dtype)
+        self.tile_size = tile_size
+        self._tiles: Dict[Tuple[int, int], np.ndarray] = {}
+
+    @property
+    def tiles_x(self) -> int:
+        return math.ceil(self.width / self.tile_size)
+
+    @property
+    def tiles_y(self) -> int:
+        return math.ceil(self.height / self.tile_size)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by tiles created so far."""
+        return sum(tile.nbytes for tile in self._tiles.values())
+
+    def _tile_shape(self, tile_row: int, tile_col: int) -> Tuple[int, int]:
+        return (
+            min(self.tile_size, self.height - tile_row * self.tile_size),
+            min(self.tile_size, self.width - tile_col * self.tile_size),
+        )
+
+    def tile(self, tile_row: int, tile_col: int) -> np.ndarray:
+        """Values of tile, zeros if nothing was added to it."""
+        tile = self._tiles.get((tile_row, tile_col))
+
+        if tile is None:
+            return np.zeros(self._tile_shape(tile_row, tile_col), dtype=self.dtype)
+
+        return tile
+
+    def tiles(self) -> Iterator[Tuple[int, int, np.ndarray]]:
+        """All tiles of the grid (row and column of top left cell and values) in row major order."""
+        for tile_row in range(self.tiles_y):
+            for tile_col in range(self.tiles_x):
+                yield tile_row * self.tile_size, tile_col * self.tile_size, self.tile(tile_row, tile_col)
+
+    def add(self, values: np.ndarray, row: int, col: int) -> None:
+        """Adds 2D array with top left cell at given row and column, parts outside of grid are ignored."""
+        row_start = max(row, 0)
+        col_start = max(col, 0)
+        row_end = min(row + values.shape[0], self.height)
+        col_end = min(col + values.shape[1], self.width)
+
+        if row_end <= row_start or col_end <= col_start:
+            return
+
+        ts = self.tile_size
+
+        for tile_row in range(row_start // ts, (row_end - 1) // ts + 1):
+            for tile_col in range(col_start // ts, (col_end - 1) // ts + 1):
+                key = (tile_row, tile_col)
+
+                if key not in self._tiles:
+                    self._tiles[key] = np.zeros(self._tile_shape(tile_row, tile_col), dtype=self.dtype)
+
+                r0 = max(row_start, tile_row * ts)
+                r1 = min(row_end, (tile_row + 1) * ts)
+                c0 = max(col_start, tile_col * ts)
+                c1 = min(col_end, (tile_col + 1) * ts)
+
+                self._tiles[key][
+                    r0 - tile_row * ts : r1 - tile_row * ts, c0 - tile_col * ts : c1 - tile_col * ts
+                ] += values[r0 - row : r1 - row, c0 - col : c1 - col]
@@ -1,2 +1,5 @@
 class Settings:
     name_sample_z = "LoSSampleZ"
+    name_profile_cache_directory = "LoSProfileCacheDirectory"
+    name_profile_cache_size = "LoSProfileCacheSize"
+    name_parse_cache_size = "LoSParseCacheSize"
@@ -1,8 +1,10 @@
-from typing import Union
+import queue
+from typing import List, Tuple
 
+import numpy as np
 from qgis.core import (
     QgsFeature,
-    QgsFeatureIterator,
+    QgsFeatureRequest,
     QgsField,
     QgsFields,
     QgsProcessing,
@@ -16,13 +18,15 @@ from qgis.core import (
     QgsProcessingParameterNumber,
     QgsProcessingUtils,
     QgsVectorLayer,
+    QgsVectorLayerFeatureSource,
 )
 from qgis.PyQt.QtCore import QMetaType
 
-from los_tools.classes.classes_los import LoSGlobal, LoSLocal, LoSWithoutTarget
+from los_tools.classes.los_batch import LoSBatch
 from los_tools.constants.field_names import FieldNames
 from los_tools.constants.names_constants import NamesConstants
-from los_tools.processing.tools.util_functions import get_los_type
+from los_tools.processing.tools.util_functions import chunked, ordered_parallel_map
+from los_tools.processing.utils import BatchedFeatureSink, FeatureTemplate, LayerReader, LoSToolsSettings, los_layer_key
 from los_tools.utils import get_doc_file
 
 
@@ -30,6 +34,7 @@ class AnalyseLosAlgorithm(QgsProcessingAlgorithm):
     LOS_LAYER = "LoSLayer"
     CURVATURE_CORRECTIONS = "CurvatureCorrections"
     REFRACTION_COEFFICIENT = "RefractionCoefficient"
+    WORKERS = "Workers"
     OUTPUT_LAYER = "OutputLayer"
 
     def initAlgorithm(self, configuration=None):
@@ -54,6 +59,16 @@ class AnalyseLosAlgorithm(QgsProcessingAlgorithm):
             )
         )
 
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.WORKERS,
+                "Number of workers",
+                QgsProcessingParameterNumber.Integer,
+                defaultValue=1,
+                minValue=1,
+            )
+        )
+
         self.addParameter(QgsProcessingParameterFeatureSink(self.OUTPUT_LAYER, "Output layer"))
 
     def checkParameterValues(self, parameters, context):
@@ -84,10 +99,11 @@ class AnalyseLosAlgorithm(QgsProcessingAlgorithm):
 
         curvature_corrections = self.parameterAsBool(parameters, self.CURVATURE_CORRECTIONS, context)
         ref_coeff = self.parameterAsDouble(parameters, self.REFRACTION_COEFFICIENT, context)
+        workers = self.parameterAsInt(parameters, self.WORKERS, context)
 
-        field_names = los_layer.fields().names()
-
-        los_type = get_los_type(los_layer, field_names)
+        # type of LoS is checked while features are read, all attributes are copied to output
+        los_reader = LayerReader.los(los_layer)
+        los_type = los_reader.type
 
         fields = QgsFields()
 
@@ -136,110 +152,107 @@ class AnalyseLosAlgorithm(QgsProcessingAlgorithm):
 
         feedback.pushInfo(f"Analysing {feature_count} features.")
 
-        los_layer_iterator: QgsFeatureIterator = los_layer.getFeatures()
+        template = FeatureTemplate(fields)
+        writer = BatchedFeatureSink(sink)
+
+        parse_cache = LoSToolsSettings.los_parse_cache(los_reader.estimated_los_size())
+        layer_key = los_layer_key(los_layer)
+
+        if workers == 1:
+            # features are read in this thread
+            los_chunks = chunked(los_reader.features(), LoSBatch.DEFAULT_CHUNK_SIZE)
+        else:
+            # only ids are read in this thread (types of LoS are checked by the reader), every worker reads features
+            # of its chunk of ids through its own feature source, so reading runs in parallel as well
+            fids = [feature.id() for feature in los_reader.features(los_reader.request([], geometry=False))]
+            los_chunks = chunked(fids, LoSBatch.DEFAULT_CHUNK_SIZE)
+
+            feature_sources: "queue.Queue[QgsVectorLayerFeatureSource]" = queue.Queue()
+
+            for _ in range(workers):
+                feature_sources.put(QgsVectorLayerFeatureSource(los_layer))
+
+        def read_chunk(chunk_fids: List[int]) -> List[QgsFeature]:
+            request = QgsFeatureRequest()
+            request.setFilterFids(chunk_fids)
+
+            feature_source = feature_sources.get()
+
+            try:
+                features = {feature.id(): feature for feature in feature_source.getFeatures(request)}
+            finally:
+                feature_sources.put(feature_source)
 
-        for los_layer_count, los_feature in enumerate(los_layer_iterator):
+            return [features[fid] for fid in chunk_fids]
+
+        def analyse_chunk(los_chunk: List) -> Tuple[List[QgsFeature], List[np.ndarray]]:
+            if feedback.isCanceled():
+                return [], []
+
+            los_features = read_chunk(los_chunk) if workers > 1 else los_chunk
+
+            los_batch = LoSBatch.from_features(
+                los_features,
+                los_type,
+                curvature_corrections=curvature_corrections,
+                refraction_coefficient=ref_coeff,
+                parse_cache=parse_cache,
+                layer_key=layer_key,
+            )
+
+            return los_features, self.los_values(los_batch, los_type)
+
+        los_layer_count = 0
+
+        for los_features, values in ordered_parallel_map(analyse_chunk, los_chunks, workers):
             if feedback.isCanceled():
                 break
 
-            f = QgsFeature(fields)
-            f.setGeometry(los_feature.geometry())
-
-            # copy attributes
-            attributes = los_feature.attributes()
-            i = 0
-            for att in attributes:
-                f.setAttribute(i, att)
-                i += 1
-
-            los: Union[LoSLocal, LoSGlobal, LoSWithoutTarget]
-
-            if los_type == NamesConstants.LOS_LOCAL:
-                los = LoSLocal.from_feature(
-                    feature=los_feature,
-                    curvature_corrections=curvature_corrections,
-                    refraction_coefficient=ref_coeff,
-                )
-
-                f.setAttribute(f.fieldNameIndex(FieldNames.VISIBLE), los.is_target_visible())
-                f.setAttribute(f.fieldNameIndex(FieldNames.VIEWING_ANGLE), los.get_view_angle())
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.ELEVATION_DIFF),
-                    los.get_elevation_difference(),
-                )
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.ANGLE_DIFF_LH),
-                    los.get_angle_difference_local_horizon(),
-                )
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.ELEVATION_DIFF_LH),
-                    los.get_elevation_difference_local_horizon(),
-                )
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.SLOPE_DIFFERENCE_LH),
-                    los.get_los_slope_difference(),
-                )
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.HORIZON_COUNT),
-                    los.get_local_horizon_count(),
-                )
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.DISTANCE_LH),
-                    los.get_local_horizon_distance(),
-                )
-
-            elif los_type == NamesConstants.LOS_GLOBAL:
-                los = LoSGlobal.from_feature(
-                    feature=los_feature,
-                    curvature_corrections=curvature_corrections,
-                    refraction_coefficient=ref_coeff,
-                )
-
-                f.setAttribute(f.fieldNameIndex(FieldNames.VISIBLE), los.is_target_visible())
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.ANGLE_DIFF_GH),
-                    los.get_angle_difference_global_horizon(),
-                )
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.ELEVATION_DIFF_GH),
-                    los.get_elevation_difference_global_horizon(),
-                )
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.HORIZON_COUNT_BEHIND),
-                    los.get_horizon_count(),
-                )
-                f.setAttribute(f.fieldNameIndex(FieldNames.DISTANCE_GH), los.get_horizon_distance())
-
-            elif los_type == NamesConstants.LOS_NO_TARGET:
-                los = LoSWithoutTarget.from_feature(
-                    feature=los_feature,
-                    curvature_corrections=curvature_corrections,
-                    refraction_coefficient=ref_coeff,
-                )
-
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.MAXIMAL_VERTICAL_ANGLE),
-                    los.get_maximal_vertical_angle(),
-                )
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.DISTANCE_LH),
-                    los.get_max_local_horizon_distance(),
-                )
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.DISTANCE_GH),
-                    los.get_global_horizon_distance(),
-                )
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.VERTICAL_ANGLE_LH),
-                    los.get_max_local_horizon_angle(),
-                )
-
-            sink.addFeature(f)
+            # values are added in the same order as the fields were appended
+            rows = zip(*[value.tolist() for value in values])
+
+            for los_feature, row in zip(los_features, rows):
+                writer.add_feature(template.feature(los_feature.attributes() + list(row), los_feature.geometry()))
+
+                los_layer_count += 1
 
             feedback.setProgress((los_layer_count / feature_count) * 100)
 
+        writer.flush()
+
         return {self.OUTPUT_LAYER: dest_id}
 
+    @staticmethod
+    def los_values(los_batch: LoSBatch, los_type: str) -> List[np.ndarray]:
+        """Values of analysis fields for every LoS of the batch, in the order of fields of given LoS type."""
+        if los_type == NamesConstants.LOS_LOCAL:
+            return [
+                los_batch.is_target_visible(),
+                los_batch.get_view_angle(),
+                los_batch.get_elevation_difference(),
+                los_batch.get_angle_difference_local_horizon(),
+                los_batch.get_elevation_difference_local_horizon(),
+                los_batch.get_los_slope_difference(),
+                los_batch.get_local_horizon_count(),
+                los_batch.get_local_horizon_distance(),
+            ]
+
+        if los_type == NamesConstants.LOS_GLOBAL:
+            return [
+                los_batch.is_target_visible(),
+                los_batch.get_angle_difference_global_horizon(),
+                los_batch.get_elevation_difference_global_horizon(),
+                los_batch.get_horizon_count(),
+                los_batch.get_horizon_distance(),
+            ]
+
+        return [
+            los_batch.get_maximal_vertical_angle(),
+            los_batch.get_global_horizon_distance(),
+            los_batch.get_max_local_horizon_distance(),
+            los_batch.get_max_local_horizon_angle(),
+        ]
+
     def name(self):
         return "analyselos"
 
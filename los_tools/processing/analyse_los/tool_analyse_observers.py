@@ -0,0 +1,505 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from qgis.core import (
+    Qgis,
+    QgsField,
+    QgsFields,
+    QgsLineString,
+    QgsPoint,
+    QgsProcessing,
+    QgsProcessingAlgorithm,
+    QgsProcessingException,
+    QgsProcessingFeedback,
+    QgsProcessingParameterBoolean,
+    QgsProcessingParameterEnum,
+    QgsProcessingParameterFeatureSink,
+    QgsProcessingParameterFeatureSource,
+    QgsProcessingParameterField,
+    QgsProcessingParameterMultipleLayers,
+    QgsProcessingParameterNumber,
+    QgsProcessingParameterVectorLayer,
+    QgsProcessingUtils,
+)
+from qgis.PyQt.QtCore import QMetaType
+
+from los_tools.classes.list_raster import ListOfRasters
+from los_tools.classes.los_batch import LoSBatch
+from los_tools.classes.sampling_distance_matrix import SamplingDistanceMatrix
+from los_tools.constants.field_names import FieldNames
+from los_tools.constants.fields import Fields
+from los_tools.constants.names_constants import NamesConstants
+from los_tools.processing.tools.util_functions import get_max_decimal_numbers, round_all_values
+from los_tools.processing.utils import BatchedFeatureSink, FeatureTemplate
+from los_tools.utils import get_doc_file
+
+
+class AnalyseObserversAlgorithm(QgsProcessingAlgorithm):
+    DEM_RASTERS = "DemRasters"
+    LINE_SETTINGS_TABLE = "LineSettingsTable"
+    OBSERVER_POINTS_LAYER = "ObserverPoints"
+    OBSERVER_ID_FIELD = "ObserverIdField"
+    OBSERVER_OFFSET_FIELD = "ObserverOffset"
+    ANGLE_START = "AngleStart"
+    ANGLE_END = "AngleEnd"
+    ANGLE_STEP = "AngleStep"
+    CURVATURE_CORRECTIONS = "CurvatureCorrections"
+    REFRACTION_COEFFICIENT = "RefractionCoefficient"
+    HORIZON_LINE_TYPE = "HorizonLineType"
+    OUTPUT_TABLE = "OutputTable"
+    OUTPUT_HORIZONS = "OutputHorizons"
+    OUTPUT_HORIZON_LINES = "OutputHorizonLines"
+
+    horizon_line_types = [NamesConstants.HORIZON_MAX_LOCAL, NamesConstants.HORIZON_GLOBAL]
+
+    def initAlgorithm(self, configuration=None):
+        self.addParameter(
+            QgsProcessingParameterMultipleLayers(self.DEM_RASTERS, "Raster DEM Layers", QgsProcessing.TypeRaster)
+        )
+
+        self.addParameter(
+            QgsProcessingParameterVectorLayer(
+                self.LINE_SETTINGS_TABLE,
+                "Sampling distance - distance table",
+                [Qgis.WkbType.NoGeometry],
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterFeatureSource(
+                self.OBSERVER_POINTS_LAYER,
+                "Observers point layer",
+                [QgsProcessing.TypeVectorPoint],
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterField(
+                self.OBSERVER_ID_FIELD,
+                "Observer ID field",
+                parentLayerParameterName=self.OBSERVER_POINTS_LAYER,
+                type=QgsProcessingParameterField.Numeric,
+                optional=False,
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterField(
+                self.OBSERVER_OFFSET_FIELD,
+                "Observer offset field",
+                parentLayerParameterName=self.OBSERVER_POINTS_LAYER,
+                type=QgsProcessingParameterField.Numeric,
+                optional=False,
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.ANGLE_START,
+                "Minimal angle",
+                QgsProcessingParameterNumber.Double,
+                defaultValue=0.0,
+                minValue=0.0,
+                maxValue=360.0,
+                optional=False,
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.ANGLE_END,
+                "Maximal angle",
+                QgsProcessingParameterNumber.Double,
+                defaultValue=359.999,
+                minValue=0.0,
+                maxValue=360.0,
+                optional=False,
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.ANGLE_STEP,
+                "Angle step",
+                QgsProcessingParameterNumber.Double,
+                defaultValue=1.0,
+                minValue=0.001,
+                maxValue=360.0,
+                optional=False,
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterBoolean(
+                self.CURVATURE_CORRECTIONS,
+                "Use curvature corrections?",
+                defaultValue=True,
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.REFRACTION_COEFFICIENT,
+                "Refraction coefficient value",
+                type=QgsProcessingParameterNumber.Double,
+                defaultValue=0.13,
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterEnum(
+                self.HORIZON_LINE_TYPE,
+                "Horizon line type",
+                options=self.horizon_line_types,
+                defaultValue=1,
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterFeatureSink(
+                self.OUTPUT_TABLE,
+                "Output LoS analysis table",
+                QgsProcessing.TypeVector,
+                optional=True,
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterFeatureSink(
+                self.OUTPUT_HORIZONS,
+                "Output horizons",
+                QgsProcessing.TypeVectorPoint,
+                optional=True,
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterFeatureSink(
+                self.OUTPUT_HORIZON_LINES,
+                "Output horizon lines",
+                QgsProcessing.TypeVectorLine,
+                optional=True,
+            )
+        )
+
+    def checkParameterValues(self, parameters, context):
+        observers_layer = self.parameterAsSource(parameters, self.OBSERVER_POINTS_LAYER, context)
+
+        if observers_layer.sourceCrs().isGeographic():
+            msg = "`Observers point layer` crs must be projected. " "Right now it is `geographic`."
+
+            return False, msg
+
+        rasters = self.parameterAsLayerList(parameters, self.DEM_RASTERS, context)
+
+        correct, msg = ListOfRasters.validate_bands(rasters)
+
+        if not correct:
+            return correct, msg
+
+        correct, msg = ListOfRasters.validate_crs(rasters, crs=observers_layer.sourceCrs())
+
+        if not correct:
+            return correct, msg
+
+        correct, msg = ListOfRasters.validate_ordering(rasters)
+
+        if not correct:
+            return correct, msg
+
+        correct, msg = ListOfRasters.validate_square_cell_size(rasters)
+
+        if not correct:
+            return correct, msg
+
+        line_settings_table = self.parameterAsVectorLayer(parameters, self.LINE_SETTINGS_TABLE, context)
+
+        validation, msg = SamplingDistanceMatrix.validate_table(line_settings_table)
+
+        if not validation:
+            return validation, msg
+
+        return super().checkParameterValues(parameters, context)
+
+    def processAlgorithm(self, parameters, context, feedback: QgsProcessingFeedback):
+        observers_layer = self.parameterAsSource(parameters, self.OBSERVER_POINTS_LAYER, context)
+
+        if observers_layer is None:
+            raise QgsProcessingException(self.invalidSourceError(parameters, self.OBSERVER_POINTS_LAYER))
+
+        observers_id = self.parameterAsString(parameters, self.OBSERVER_ID_FIELD, context)
+        observers_offset = self.parameterAsString(parameters, self.OBSERVER_OFFSET_FIELD, context)
+
+        list_rasters = ListOfRasters(self.parameterAsLayerList(parameters, self.DEM_RASTERS, context))
+
+        line_settings_table = self.parameterAsVectorLayer(parameters, self.LINE_SETTINGS_TABLE, context)
+
+        distance_matrix = SamplingDistanceMatrix(line_settings_table)
+        distance_matrix.replace_minus_one_with_value(list_rasters.maximal_diagonal_size())
+
+        angle_min = self.parameterAsDouble(parameters, self.ANGLE_START, context)
+        angle_max = self.parameterAsDouble(parameters, self.ANGLE_END, context)
+        angle_step = self.parameterAsDouble(parameters, self.ANGLE_STEP, context)
+
+        # same azimuths as `CreatePointsAroundAlgorithm` produces
+        angles = np.arange(angle_min, angle_max + 0.000000001 * angle_step, step=angle_step).tolist()
+        angles = round_all_values(angles, get_max_decimal_numbers([angle_min, angle_max, angle_step]))
+        azimuths = np.array(angles, dtype=float)
+
+        curvature_corrections = self.parameterAsBool(parameters, self.CURVATURE_CORRECTIONS, context)
+        ref_coeff = self.parameterAsDouble(parameters, self.REFRACTION_COEFFICIENT, context)
+
+        horizon_line_type = self.horizon_line_types[self.parameterAsEnum(parameters, self.HORIZON_LINE_TYPE, context)]
+
+        table_fields = QgsFields(Fields.los_notarget_fields)
+        table_fields.append(QgsField(FieldNames.MAXIMAL_VERTICAL_ANGLE, QMetaType.Type.Double))
+        table_fields.append(QgsField(FieldNames.DISTANCE_GH, QMetaType.Type.Double))
+        table_fields.append(QgsField(FieldNames.DISTANCE_LH, QMetaType.Type.Double))
+        table_fields.append(QgsField(FieldNames.VERTICAL_ANGLE_LH, QMetaType.Type.Double))
+
+        table_sink, table_dest_id = self.parameterAsSink(
+            parameters,
+            self.OUTPUT_TABLE,
+            context,
+            table_fields,
+            Qgis.WkbType.NoGeometry,
+            observers_layer.sourceCrs(),
+        )
+
+        horizons_fields = QgsFields()
+        horizons_fields.append(QgsField(FieldNames.HORIZON_TYPE, QMetaType.Type.QString))
+        horizons_fields.append(QgsField(FieldNames.ID_OBSERVER, QMetaType.Type.Int))
+        horizons_fields.append(QgsField(FieldNames.ID_TARGET, QMetaType.Type.Int))
+        horizons_fields.append(QgsField(FieldNames.AZIMUTH, QMetaType.Type.Double))
+
+        horizons_sink, horizons_dest_id = self.parameterAsSink(
+            parameters,
+            self.OUTPUT_HORIZONS,
+            context,
+            horizons_fields,
+            Qgis.WkbType.Point25D,
+            observers_layer.sourceCrs(),
+        )
+
+        horizon_lines_fields = QgsFields()
+        horizon_lines_fields.append(QgsField(FieldNames.HORIZON_TYPE, QMetaType.Type.QString))
+        horizon_lines_fields.append(QgsField(FieldNames.ID_OBSERVER, QMetaType.Type.Int))
+        horizon_lines_fields.append(QgsField(FieldNames.OBSERVER_X, QMetaType.Type.Double))
+        horizon_lines_fields.append(QgsField(FieldNames.OBSERVER_Y, QMetaType.Type.Double))
+
+        horizon_lines_sink, horizon_lines_dest_id = self.parameterAsSink(
+            parameters,
+            self.OUTPUT_HORIZON_LINES,
+            context,
+            horizon_lines_fields,
+            Qgis.WkbType.LineStringZM,
+            observers_layer.sourceCrs(),
+        )
+
+        if table_sink is None and horizons_sink is None and horizon_lines_sink is None:
+            raise QgsProcessingException("At least one of the outputs has to be set.")
+
+        outputs = {
+            self.OUTPUT_TABLE: (table_sink, table_fields),
+            self.OUTPUT_HORIZONS: (horizons_sink, horizons_fields),
+            self.OUTPUT_HORIZON_LINES: (horizon_lines_sink, horizon_lines_fields),
+        }
+        writers: Dict[str, Tuple[BatchedFeatureSink, FeatureTemplate]] = {
+            output: (BatchedFeatureSink(sink), FeatureTemplate(fields))
+            for output, (sink, fields) in outputs.items()
+            if sink is not None
+        }
+
+        feature_count = observers_layer.featureCount()
+
+        for observer_count, observer_feature in enumerate(observers_layer.getFeatures()):
+            if feedback.isCanceled():
+                break
+
+            observer_point = QgsPoint(observer_feature.geometry().asPoint())
+            observer_id = int(observer_feature.attribute(observers_id))
+            observer_offset = float(observer_feature.attribute(observers_offset))
+
+            los_indices, los_batch = self.observer_los_batch(
+                observer_point,
+                observer_offset,
+                azimuths,
+                distance_matrix,
+                list_rasters,
+                curvature_corrections,
+                ref_coeff,
+            )
+
+            if los_batch is None:
+                continue
+
+            if self.OUTPUT_TABLE in writers:
+                self.save_analysis(
+                    *writers[self.OUTPUT_TABLE],
+                    los_batch,
+                    los_indices,
+                    azimuths,
+                    observer_point,
+                    observer_id,
+                    observer_offset,
+                    angle_step,
+                )
+
+            if self.OUTPUT_HORIZONS in writers:
+                self.save_horizons(*writers[self.OUTPUT_HORIZONS], los_batch, los_indices, azimuths, observer_id)
+
+            if self.OUTPUT_HORIZON_LINES in writers:
+                self.save_horizon_line(
+                    *writers[self.OUTPUT_HORIZON_LINES],
+                    los_batch,
+                    horizon_line_type,
+                    observer_point,
+                    observer_id,
+                )
+
+            feedback.setProgress(((observer_count + 1) / feature_count) * 100)
+
+        for writer, _ in writers.values():
+            writer.flush()
+
+        return {
+            self.OUTPUT_TABLE: table_dest_id,
+            self.OUTPUT_HORIZONS: horizons_dest_id,
+            self.OUTPUT_HORIZON_LINES: horizon_lines_dest_id,
+        }
+
+    @staticmethod
+    def observer_los_batch(
+        observer_point: QgsPoint,
+        observer_offset: float,
+        azimuths: np.ndarray,
+        distance_matrix: SamplingDistanceMatrix,
+        list_rasters: ListOfRasters,
+        curvature_corrections: bool,
+        refraction_coefficient: float,
+    ) -> Tuple[np.ndarray, Optional[LoSBatch]]:
+        """No target LoS from observer in all azimuths, sampled in memory. Returns azimuth index of every LoS.
+
+        Points without raster value are left out, same as `ListOfRasters.add_z_values` does. LoS with less than two
+        points are skipped.
+        """
+        xs, ys = distance_matrix.build_lines_arrays(observer_point, azimuths)
+
+        zs, _ = list_rasters.sample_many(xs.ravel(), ys.ravel())
+
+        los_indices, los_batch = LoSBatch.from_lines_arrays(
+            xs,
+            ys,
+            zs.reshape(xs.shape),
+            observer_offset,
+            curvature_corrections=curvature_corrections,
+            refraction_coefficient=refraction_coefficient,
+            distances=distance_matrix.distance_template(),
+        )
+
+        return los_indices, los_batch
+
+    @staticmethod
+    def save_analysis(
+        writer: BatchedFeatureSink,
+        template: FeatureTemplate,
+        los_batch: LoSBatch,
+        los_indices: np.ndarray,
+        azimuths: np.ndarray,
+        observer_point: QgsPoint,
+        observer_id: int,
+        observer_offset: float,
+        angle_step: float,
+    ) -> None:
+        values = [
+            los_batch.get_maximal_vertical_angle(),
+            los_batch.get_global_horizon_distance(),
+            los_batch.get_max_local_horizon_distance(),
+            los_batch.get_max_local_horizon_angle(),
+        ]
+
+        rows = zip(los_indices.tolist(), *[value.tolist() for value in values])
+
+        for target_id, *row in rows:
+            # attributes in the same order as fields of `Fields.los_notarget_fields` and the analysis fields
+            writer.add_feature(
+                template.feature(
+                    [
+                        NamesConstants.LOS_NO_TARGET,
+                        observer_id,
+                        target_id,
+                        observer_offset,
+                        float(azimuths[target_id]),
+                        observer_point.x(),
+                        observer_point.y(),
+                        angle_step,
+                    ]
+                    + row
+                )
+            )
+
+    @staticmethod
+    def save_horizons(
+        writer: BatchedFeatureSink,
+        template: FeatureTemplate,
+        los_batch: LoSBatch,
+        los_indices: np.ndarray,
+        azimuths: np.ndarray,
+        observer_id: int,
+    ) -> None:
+        global_horizons = los_batch.global_horizon_indices()
+
+        for los_index, target_id in enumerate(los_indices.tolist()):
+            los_slice = los_batch.los_slice(los_index)
+
+            horizons: List[Tuple[str, int]] = [
+                (NamesConstants.HORIZON_LOCAL, los_slice.start + i)
+                for i in np.flatnonzero(los_batch.horizon[los_slice]).tolist()
+            ]
+            horizons.append((NamesConstants.HORIZON_GLOBAL, int(global_horizons[los_index])))
+
+            for horizon_type, index in horizons:
+                writer.add_feature(
+                    template.feature(
+                        [horizon_type, observer_id, target_id, float(azimuths[target_id])],
+                        los_batch.get_geom_at_index(index),
+                    )
+                )
+
+    @staticmethod
+    def save_horizon_line(
+        writer: BatchedFeatureSink,
+        template: FeatureTemplate,
+        los_batch: LoSBatch,
+        horizon_type: str,
+        observer_point: QgsPoint,
+        observer_id: int,
+    ) -> None:
+        """Horizon line through horizons of all LoS of observer, same as `ExtractHorizonLinesAlgorithm` creates."""
+        if len(los_batch) < 2:
+            return
+
+        line = QgsLineString(*[values.tolist() for values in los_batch.horizon_line_vertices(horizon_type)])
+
+        writer.add_feature(template.feature([horizon_type, observer_id, observer_point.x(), observer_point.y()], line))
+
+    def name(self):
+        return "analyseobservers"
+
+    def displayName(self):
+        return "Analyse Observers Horizons and Visibility"
+
+    def group(self):
+        return "LoS Analysis"
+
+    def groupId(self):
+        return "losanalysis"
+
+    def createInstance(self):
+        return AnalyseObserversAlgorithm()
+
+    def helpUrl(self):
+        return "https://jancaha.github.io/qgis_los_tools/tools/LoS%20Analysis/tool_analyse_observers/"
+
+    def shortHelpString(self):
+        return QgsProcessingUtils.formatHelpMapAsHtml(get_doc_file(__file__), self)
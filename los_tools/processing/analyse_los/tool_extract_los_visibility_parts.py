@@ -1,8 +1,6 @@
 from qgis.core import (
     Qgis,
     QgsCategorizedSymbolRenderer,
-    QgsFeature,
-    QgsFeatureIterator,
     QgsField,
     QgsFields,
     QgsLineString,
@@ -22,11 +20,9 @@ from qgis.core import (
 )
 from qgis.PyQt.QtCore import QMetaType, Qt
 
-from los_tools.classes.classes_los import LoSGlobal, LoSLocal, LoSWithoutTarget
 from los_tools.constants.field_names import FieldNames
-from los_tools.constants.names_constants import NamesConstants
 from los_tools.constants.textlabels import TextLabels
-from los_tools.processing.tools.util_functions import get_los_type
+from los_tools.processing.utils import BatchedFeatureSink, FeatureTemplate, LayerReader, LoSToolsSettings, los_layer_key
 from los_tools.utils import get_doc_file
 
 
@@ -103,9 +99,7 @@ class ExtractLoSVisibilityPartsAlgorithm(QgsProcessingAlgorithm):
         curvature_corrections: bool = self.parameterAsBool(parameters, self.CURVATURE_CORRECTIONS, context)
         ref_coeff: float = self.parameterAsDouble(parameters, self.REFRACTION_COEFFICIENT, context)
 
-        field_names = los_layer.fields().names()
-
-        los_type = get_los_type(los_layer, field_names)
+        los_reader = LayerReader.los(los_layer)
 
         fields = QgsFields()
         fields.append(QgsField(FieldNames.ID_OBSERVER, QMetaType.Type.Int))
@@ -126,76 +120,64 @@ class ExtractLoSVisibilityPartsAlgorithm(QgsProcessingAlgorithm):
 
         feature_count = los_layer.featureCount()
 
-        los_iterator: QgsFeatureIterator = los_layer.getFeatures()
+        template = FeatureTemplate(fields)
+        writer = BatchedFeatureSink(sink)
 
-        for feature_number, los_feature in enumerate(los_iterator):
+        feature_number = 0
+
+        for los_features, los_batch in los_reader.los_batches(
+            [FieldNames.ID_OBSERVER, FieldNames.ID_TARGET],
+            curvature_corrections=curvature_corrections,
+            refraction_coefficient=ref_coeff,
+            parse_cache=LoSToolsSettings.los_parse_cache(los_reader.estimated_los_size()),
+            layer_key=los_layer_key(los_layer),
+        ):
             if feedback.isCanceled():
                 break
 
-            if los_type == NamesConstants.LOS_LOCAL:
-                los = LoSLocal.from_feature(
-                    feature=los_feature,
-                    curvature_corrections=curvature_corrections,
-                    refraction_coefficient=ref_coeff,
-                )
-
-            elif los_type == NamesConstants.LOS_GLOBAL:
-                los = LoSGlobal.from_feature(
-                    feature=los_feature,
-                    curvature_corrections=curvature_corrections,
-                    refraction_coefficient=ref_coeff,
-                )
-
-            elif los_type == NamesConstants.LOS_NO_TARGET:
-                los = LoSWithoutTarget.from_feature(
-                    feature=los_feature,
-                    curvature_corrections=curvature_corrections,
-                    refraction_coefficient=ref_coeff,
-                )
-
-            previous_point_visibility = True
-
-            line_string_visible = QgsMultiLineString()
-            line_string_invisible = QgsMultiLineString()
-
-            line: QgsLineString = QgsLineString()
-
-            for i in range(0, len(los.points)):
-                line.addVertex(los.get_geom_at_index(i))
-
-                if los.visible[i] != previous_point_visibility:
-                    if previous_point_visibility:
-                        line_string_visible.addGeometry(line)
-                    else:
-                        line_string_invisible.addGeometry(line)
-
-                    line: QgsLineString = QgsLineString()
-                    line.addVertex(los.get_geom_at_index(i))
-                    previous_point_visibility = los.visible[i]
-
-                if i == len(los.points) - 1:
-                    if los.visible[i]:
-                        line_string_visible.addGeometry(line)
-                    else:
-                        line_string_invisible.addGeometry(line)
-
-            feature_visible = QgsFeature(fields)
-            feature_visible.setGeometry(line_string_visible)
-            feature_visible.setAttribute(FieldNames.VISIBLE, True)
-            feature_visible.setAttribute(FieldNames.ID_OBSERVER, los_feature.attribute(FieldNames.ID_OBSERVER))
-            feature_visible.setAttribute(FieldNames.ID_TARGET, los_feature.attribute(FieldNames.ID_TARGET))
-
-            feature_invisible = QgsFeature(fields)
-            feature_invisible.setGeometry(line_string_invisible)
-            feature_invisible.setAttribute(FieldNames.VISIBLE, False)
-            feature_invisible.setAttribute(FieldNames.ID_OBSERVER, los_feature.attribute(FieldNames.ID_OBSERVER))
-            feature_invisible.setAttribute(FieldNames.ID_TARGET, los_feature.attribute(FieldNames.ID_TARGET))
-
-            sink.addFeature(feature_visible)
-            sink.addFeature(feature_invisible)
+            visible = los_batch.visible.tolist()
+
+            for los_index, los_feature in enumerate(los_features):
+                los_slice = los_batch.los_slice(los_index)
+
+                previous_point_visibility = True
+
+                line_string_visible = QgsMultiLineString()
+                line_string_invisible = QgsMultiLineString()
+
+                line: QgsLineString = QgsLineString()
+
+                for i in range(los_slice.start, los_slice.stop):
+                    line.addVertex(los_batch.get_geom_at_index(i))
+
+                    if visible[i] != previous_point_visibility:
+                        if previous_point_visibility:
+                            line_string_visible.addGeometry(line)
+                        else:
+                            line_string_invisible.addGeometry(line)
+
+                        line: QgsLineString = QgsLineString()
+                        line.addVertex(los_batch.get_geom_at_index(i))
+                        previous_point_visibility = visible[i]
+
+                    if i == los_slice.stop - 1:
+                        if visible[i]:
+                            line_string_visible.addGeometry(line)
+                        else:
+                            line_string_invisible.addGeometry(line)
+
+                id_observer = los_feature.attribute(FieldNames.ID_OBSERVER)
+                id_target = los_feature.attribute(FieldNames.ID_TARGET)
+
+                writer.add_feature(template.feature([id_observer, id_target, True], line_string_visible))
+                writer.add_feature(template.feature([id_observer, id_target, False], line_string_invisible))
+
+            feature_number += len(los_features)
 
             feedback.setProgress((feature_number / feature_count) * 100)
 
+        writer.flush()
+
         return {self.OUTPUT_LAYER: self.dest_id}
 
     def name(self):
@@ -2,8 +2,6 @@ from qgis.analysis import QgsGeometrySnapper, QgsInternalGeometrySnapper
 from qgis.core import (
     Qgis,
     QgsCategorizedSymbolRenderer,
-    QgsFeature,
-    QgsFeatureIterator,
     QgsField,
     QgsFields,
     QgsLineString,
@@ -29,7 +27,8 @@ from los_tools.classes.classes_los import LoSWithoutTarget
 from los_tools.constants.field_names import FieldNames
 from los_tools.constants.names_constants import NamesConstants
 from los_tools.constants.textlabels import TextLabels
-from los_tools.processing.tools.util_functions import get_los_type, line_to_polygon
+from los_tools.processing.tools.util_functions import line_to_polygon
+from los_tools.processing.utils import BatchedFeatureSink, FeatureTemplate, LayerReader
 from los_tools.utils import get_doc_file
 
 
@@ -109,9 +108,8 @@ class ExtractLoSVisibilityPolygonsAlgorithm(QgsProcessingAlgorithm):
         curvature_corrections: bool = self.parameterAsBool(parameters, self.CURVATURE_CORRECTIONS, context)
         ref_coeff: float = self.parameterAsDouble(parameters, self.REFRACTION_COEFFICIENT, context)
 
-        field_names = los_layer.fields().names()
-
-        los_type = get_los_type(los_layer, field_names)
+        los_reader = LayerReader.los(los_layer)
+        los_type = los_reader.type
 
         fields = QgsFields()
         fields.append(QgsField(FieldNames.ID_OBSERVER, QMetaType.Type.Int))
@@ -132,10 +130,24 @@ class ExtractLoSVisibilityPolygonsAlgorithm(QgsProcessingAlgorithm):
 
         feature_count = los_layer.featureCount()
 
-        los_iterator: QgsFeatureIterator = los_layer.getFeatures()
+        los_iterator = los_reader.features(
+            los_reader.request(
+                [
+                    FieldNames.ID_OBSERVER,
+                    FieldNames.ID_TARGET,
+                    FieldNames.OBSERVER_OFFSET,
+                    FieldNames.OBSERVER_X,
+                    FieldNames.OBSERVER_Y,
+                    FieldNames.ANGLE_STEP,
+                ]
+            )
+        )
 
         geometry_snapper = QgsInternalGeometrySnapper(0.000001, QgsGeometrySnapper.EndPointToEndPoint)
 
+        template = FeatureTemplate(fields)
+        writer = BatchedFeatureSink(sink)
+
         for feature_number, los_feature in enumerate(los_iterator):
             if feedback.isCanceled():
                 break
@@ -187,17 +199,11 @@ class ExtractLoSVisibilityPolygonsAlgorithm(QgsProcessingAlgorithm):
                         else:
                             polygon_multi_invisible.addGeometry(line_to_polygon(line, observer_point, angle_width))
 
-            feature_visible = QgsFeature(fields)
-            feature_visible.setGeometry(polygon_multi_visible)
-            feature_visible.setAttribute(FieldNames.VISIBLE, True)
-            feature_visible.setAttribute(FieldNames.ID_OBSERVER, los_feature.attribute(FieldNames.ID_OBSERVER))
-            feature_visible.setAttribute(FieldNames.ID_TARGET, los_feature.attribute(FieldNames.ID_TARGET))
+            id_observer = los_feature.attribute(FieldNames.ID_OBSERVER)
+            id_target = los_feature.attribute(FieldNames.ID_TARGET)
 
-            feature_invisible = QgsFeature(fields)
-            feature_invisible.setGeometry(polygon_multi_invisible)
-            feature_invisible.setAttribute(FieldNames.VISIBLE, False)
-            feature_invisible.setAttribute(FieldNames.ID_OBSERVER, los_feature.attribute(FieldNames.ID_OBSERVER))
-            feature_invisible.setAttribute(FieldNames.ID_TARGET, los_feature.attribute(FieldNames.ID_TARGET))
+            feature_visible = template.feature([id_observer, id_target, True], polygon_multi_visible)
+            feature_invisible = template.feature([id_observer, id_target, False], polygon_multi_invisible)
 
             geom_visible = geometry_snapper.snapFeature(feature_visible)
             feature_visible.setGeometry(geom_visible)
@@ -205,11 +211,13 @@ class ExtractLoSVisibilityPolygonsAlgorithm(QgsProcessingAlgorithm):
             geom_invisible = geometry_snapper.snapFeature(feature_invisible)
             feature_invisible.setGeometry(geom_invisible)
 
-            sink.addFeature(feature_visible)
-            sink.addFeature(feature_invisible)
+            writer.add_feature(feature_visible)
+            writer.add_feature(feature_invisible)
 
             feedback.setProgress((feature_number / feature_count) * 100)
 
+        writer.flush()
+
         return {self.OUTPUT_LAYER: self.dest_id}
 
     def name(self):
@@ -1,8 +1,6 @@
 from qgis.core import (
     Qgis,
     QgsCategorizedSymbolRenderer,
-    QgsFeature,
-    QgsFeatureIterator,
     QgsField,
     QgsFields,
     QgsMapLayer,
@@ -19,11 +17,16 @@ from qgis.core import (
 )
 from qgis.PyQt.QtCore import QMetaType, Qt
 
-from los_tools.classes.classes_los import LoSGlobal, LoSLocal, LoSWithoutTarget
 from los_tools.constants.field_names import FieldNames
 from los_tools.constants.names_constants import NamesConstants
 from los_tools.constants.textlabels import TextLabels
-from los_tools.processing.tools.util_functions import get_los_type
+from los_tools.processing.utils import (
+    BatchedFeatureSink,
+    FeatureTemplate,
+    LayerReader,
+    LoSToolsSettings,
+    los_layer_key,
+)
 from los_tools.utils import get_doc_file
 
 
@@ -117,9 +120,8 @@ class ExtractPointsLoSAlgorithm(QgsProcessingAlgorithm):
         only_visible: bool = self.parameterAsBool(parameters, self.ONLY_VISIBLE, context)
         extended_attributes: bool = self.parameterAsBool(parameters, self.EXTENDED_ATTRIBUTES, context)
 
-        field_names = los_layer.fields().names()
-
-        los_type = get_los_type(los_layer, field_names)
+        los_reader = LayerReader.los(los_layer)
+        los_type = los_reader.type
 
         fields = QgsFields()
         fields.append(QgsField(FieldNames.ID_OBSERVER, QMetaType.Type.Int))
@@ -148,79 +150,55 @@ class ExtractPointsLoSAlgorithm(QgsProcessingAlgorithm):
 
         feature_count = los_layer.featureCount()
 
-        los_iterator: QgsFeatureIterator = los_layer.getFeatures()
+        export_global = los_type == NamesConstants.LOS_GLOBAL or los_type == NamesConstants.LOS_NO_TARGET
+
+        template = FeatureTemplate(fields)
+        writer = BatchedFeatureSink(sink)
 
-        for feature_number, los_feature in enumerate(los_iterator):
+        feature_number = 0
+
+        for los_features, los_batch in los_reader.los_batches(
+            [FieldNames.ID_OBSERVER, FieldNames.ID_TARGET],
+            curvature_corrections=curvature_corrections,
+            refraction_coefficient=ref_coeff,
+            parse_cache=LoSToolsSettings.los_parse_cache(los_reader.estimated_los_size()),
+            layer_key=los_layer_key(los_layer),
+        ):
             if feedback.isCanceled():
                 break
 
-            if los_type == NamesConstants.LOS_LOCAL:
-                los = LoSLocal.from_feature(
-                    feature=los_feature,
-                    curvature_corrections=curvature_corrections,
-                    refraction_coefficient=ref_coeff,
-                )
-
-            elif los_type == NamesConstants.LOS_GLOBAL:
-                los = LoSGlobal.from_feature(
-                    feature=los_feature,
-                    curvature_corrections=curvature_corrections,
-                    refraction_coefficient=ref_coeff,
-                )
-
-            elif los_type == NamesConstants.LOS_NO_TARGET:
-                los = LoSWithoutTarget.from_feature(
-                    feature=los_feature,
-                    curvature_corrections=curvature_corrections,
-                    refraction_coefficient=ref_coeff,
-                )
-
-            for i in range(0, len(los.points)):
-                export_point = False
-
-                if only_visible:
-                    if los.visible[i]:
-                        export_point = True
-                else:
-                    export_point = True
-
-                if export_point:
-                    f = QgsFeature(fields)
-                    f.setGeometry(los.get_geom_at_index(i))
-                    f.setAttribute(
-                        f.fieldNameIndex(FieldNames.ID_OBSERVER),
-                        los_feature.attribute(FieldNames.ID_OBSERVER),
-                    )
-                    f.setAttribute(
-                        f.fieldNameIndex(FieldNames.ID_TARGET),
-                        los_feature.attribute(FieldNames.ID_TARGET),
-                    )
-                    f.setAttribute(f.fieldNameIndex(FieldNames.VISIBLE), los.visible[i])
-
-                    if extended_attributes:
-                        f.setAttribute(
-                            f.fieldNameIndex(FieldNames.ELEVATION_DIFF_LH),
-                            los.get_elevation_difference_horizon_at_point(i),
-                        )
-                        f.setAttribute(
-                            f.fieldNameIndex(FieldNames.ANGLE_DIFF_LH),
-                            los.get_angle_difference_horizon_at_point(i),
-                        )
-
-                        if los_type == NamesConstants.LOS_GLOBAL or los_type == NamesConstants.LOS_NO_TARGET:
-                            f.setAttribute(
-                                f.fieldNameIndex(FieldNames.ELEVATION_DIFF_GH),
-                                los.get_elevation_difference_global_horizon_at_point(i),
-                            )
-                            f.setAttribute(
-                                f.fieldNameIndex(FieldNames.ANGLE_DIFF_GH),
-                                los.get_angle_difference_global_horizon_at_point(i),
-                            )
-
-                    sink.addFeature(f)
+            values = [los_batch.visible]
+
+            if extended_attributes:
+                values.append(los_batch.get_elevation_difference_horizon_at_points())
+                values.append(los_batch.get_angle_difference_horizon_at_points())
+
+                if export_global:
+                    values.append(los_batch.get_elevation_difference_global_horizon_at_points())
+                    values.append(los_batch.get_angle_difference_global_horizon_at_points())
+
+            rows = list(zip(*[value.tolist() for value in values]))
+
+            for los_index, los_feature in enumerate(los_features):
+                los_slice = los_batch.los_slice(los_index)
+
+                id_observer = los_feature.attribute(FieldNames.ID_OBSERVER)
+                id_target = los_feature.attribute(FieldNames.ID_TARGET)
+
+                for i in range(los_slice.start, los_slice.stop):
+                    row = rows[i]
+
+                    if only_visible and not row[0]:
+                        continue
+
+                    writer.add_feature(template.feature([id_observer, id_target, *row], los_batch.get_geom_at_index(i)))
+
+                feature_number += 1
 
             feedback.setProgress((feature_number / feature_count) * 100)
 
+        writer.flush()
+
         return {self.OUTPUT_LAYER: self.dest_id}
 
     def name(self):
@@ -1,6 +1,5 @@
 from qgis.core import (
     Qgis,
-    QgsFeature,
     QgsField,
     QgsFields,
     QgsProcessing,
@@ -14,6 +13,7 @@ from qgis.core import (
 from qgis.PyQt.QtCore import QMetaType
 
 from los_tools.constants.field_names import FieldNames
+from los_tools.processing.utils import BatchedFeatureSink, FeatureTemplate
 from los_tools.utils import get_doc_file
 
 
@@ -99,6 +99,9 @@ class AzimuthPointPolygonAlgorithm(QgsProcessingAlgorithm):
 
         object_layer_features = object_layer.getFeatures()
 
+        template = FeatureTemplate(fields)
+        writer = BatchedFeatureSink(sink)
+
         for object_layer_feature_count, object_layer_feature in enumerate(object_layer_features):
             for point_layer_feature_count, point_layer_feature in enumerate(point_layer.getFeatures()):
                 if feedback.isCanceled():
@@ -114,22 +117,21 @@ class AzimuthPointPolygonAlgorithm(QgsProcessingAlgorithm):
                 if azimuth < 0:
                     azimuth = 360 + azimuth
 
-                f = QgsFeature(fields)
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.ID_POINT),
-                    point_layer_feature.attribute(point_field_id),
-                )
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.ID_OBJECT),
-                    object_layer_feature.attribute(object_field_id),
+                writer.add_feature(
+                    template.feature(
+                        [
+                            point_layer_feature.attribute(point_field_id),
+                            object_layer_feature.attribute(object_field_id),
+                            azimuth,
+                        ]
+                    )
                 )
-                f.setAttribute(f.fieldNameIndex(FieldNames.AZIMUTH), azimuth)
-
-                sink.addFeature(f)
 
                 i += 1
                 feedback.setProgress((i / total) * 100)
 
+        writer.flush()
+
         return {self.OUTPUT_TABLE: dest_id}
 
     def name(self):
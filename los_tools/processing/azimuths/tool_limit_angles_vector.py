@@ -1,7 +1,6 @@
 from qgis.core import (
     Qgis,
     QgsCoordinateTransform,
-    QgsFeature,
     QgsFeatureRequest,
     QgsField,
     QgsFields,
@@ -19,7 +18,7 @@ from qgis.PyQt.QtCore import QMetaType
 
 from los_tools.constants.field_names import FieldNames
 from los_tools.constants.names_constants import NamesConstants
-from los_tools.processing.tools.util_functions import get_los_type
+from los_tools.processing.utils import BatchedFeatureSink, FeatureTemplate, LayerReader
 from los_tools.utils import get_doc_file
 
 
@@ -67,7 +66,7 @@ class LimitAnglesAlgorithm(QgsProcessingAlgorithm):
 
             return False, msg
 
-        los_type = get_los_type(los_layer, field_names)
+        los_type = LayerReader.los(los_layer).type
 
         if los_type != NamesConstants.LOS_NO_TARGET:
             msg = (
@@ -122,6 +121,9 @@ class LimitAnglesAlgorithm(QgsProcessingAlgorithm):
 
         object_layer_features = object_layer.getFeatures()
 
+        template = FeatureTemplate(fields)
+        writer = BatchedFeatureSink(sink)
+
         for object_layer_feature_count, object_layer_feature in enumerate(object_layer_features):
             object_layer_feature_geom = object_layer_feature.geometry()
             object_id = object_layer_feature.attribute(field_id)
@@ -155,17 +157,13 @@ class LimitAnglesAlgorithm(QgsProcessingAlgorithm):
                     if abs((max(azimuths) - min(azimuths)) - (az_step * (len(azimuths) - 1))) > 0.0001:
                         azimuths = [x - 360 if x > 180 else x for x in azimuths]
 
-                    f = QgsFeature(fields)
-                    f.setAttribute(f.fieldNameIndex(FieldNames.ID_OBSERVER), int(id_value))
-                    f.setAttribute(f.fieldNameIndex(FieldNames.AZIMUTH_MIN), min(azimuths))
-                    f.setAttribute(f.fieldNameIndex(FieldNames.AZIMUTH_MAX), max(azimuths))
-                    f.setAttribute(f.fieldNameIndex(FieldNames.ID_OBJECT), object_id)
-
-                    sink.addFeature(f)
+                    writer.add_feature(template.feature([int(id_value), object_id, min(azimuths), max(azimuths)]))
 
                 i += 1
                 feedback.setProgress((i / total) * 100)
 
+        writer.flush()
+
         return {self.OUTPUT_TABLE: dest_id}
 
     def name(self):
@@ -1,17 +1,23 @@
-from qgis.core import Qgis, QgsFeature, QgsGeometry, QgsLineString, QgsPoint, QgsProcessingException, QgsProcessingUtils
+import numpy as np
+from qgis.core import Qgis, QgsProcessingException, QgsProcessingUtils
 
 from los_tools.classes.list_raster import ListOfRasters
-from los_tools.constants.field_names import FieldNames
+from los_tools.classes.los_profiles import LoSProfilesWriter
 from los_tools.constants.fields import Fields
 from los_tools.constants.names_constants import NamesConstants
 from los_tools.processing.create_los.tool_create_local_los import CreateLocalLosAlgorithm
-from los_tools.processing.tools.util_functions import segmentize_los_line
+from los_tools.processing.tools.util_functions import extend_line_end, segmentize_lines_coordinates
+from los_tools.processing.utils import BatchedFeatureSink, FeatureTemplate, LoSToolsSettings
 from los_tools.utils import get_doc_file
 
 
 class CreateGlobalLosAlgorithm(CreateLocalLosAlgorithm):
     def processAlgorithm(self, parameters, context, feedback):
-        list_rasters = ListOfRasters(self.parameterAsLayerList(parameters, self.DEM_RASTERS, context))
+        profile_cache = LoSToolsSettings.profile_cache()
+
+        list_rasters = ListOfRasters(
+            self.parameterAsLayerList(parameters, self.DEM_RASTERS, context), profile_cache=profile_cache
+        )
 
         observers_layer = self.parameterAsSource(parameters, self.OBSERVER_POINTS_LAYER, context)
 
@@ -31,6 +37,8 @@ class CreateGlobalLosAlgorithm(CreateLocalLosAlgorithm):
 
         sampling_distance = self.parameterAsDouble(parameters, self.LINE_DENSITY, context)
 
+        maximum_distance = self.parameterAsDouble(parameters, self.MAXIMUM_DISTANCE, context)
+
         fields = Fields.los_global_fields
 
         sink, dest_id = self.parameterAsSink(
@@ -45,74 +53,108 @@ class CreateGlobalLosAlgorithm(CreateLocalLosAlgorithm):
         if sink is None:
             raise QgsProcessingException(self.invalidSinkError(parameters, self.OUTPUT_LAYER))
 
-        feature_count = observers_layer.featureCount() * targets_layer.featureCount()
+        feature_count = observers_layer.featureCount()
 
         observers_iterator = observers_layer.getFeatures()
 
         max_length_extension = list_rasters.maximal_diagonal_size()
 
-        for observer_count, observer_feature in enumerate(observers_iterator):
-            if feedback.isCanceled():
-                break
+        targets = [
+            (
+                target_feature.geometry().asPoint(),
+                int(target_feature.attribute(targets_id)),
+                float(target_feature.attribute(targets_offset)),
+            )
+            for target_feature in targets_layer.getFeatures()
+        ]
 
-            targets_iterators = targets_layer.getFeatures()
+        targets_xy = np.array([[point.x(), point.y()] for point, _, _ in targets], dtype=float).reshape(-1, 2)
 
-            for target_count, target_feature in enumerate(targets_iterators):
-                line = QgsLineString(
-                    [
-                        QgsPoint(observer_feature.geometry().asPoint()),
-                        QgsPoint(target_feature.geometry().asPoint()),
-                    ]
-                )
+        targets_index = self.targets_spatial_index(targets_xy) if 0 < maximum_distance else None
 
-                line_temp = line.clone()
-                line_temp.extend(0, max_length_extension)
+        profiles_path = self.parameterAsFileOutput(parameters, self.OUTPUT_PROFILES, context)
+        profiles = (
+            LoSProfilesWriter(profiles_path, NamesConstants.LOS_GLOBAL, sampling_distance) if profiles_path else None
+        )
 
-                line = QgsGeometry.fromPolyline(
-                    [
-                        QgsPoint(observer_feature.geometry().asPoint()),
-                        QgsPoint(target_feature.geometry().asPoint()),
-                        line_temp.endPoint(),
-                    ]
-                )
+        template = FeatureTemplate(fields)
+        writer = BatchedFeatureSink(sink)
 
-                line = segmentize_los_line(line, segment_length=sampling_distance)
+        for observer_count, observer_feature in enumerate(observers_iterator):
+            if feedback.isCanceled():
+                break
 
-                line = list_rasters.add_z_values(line.points())
+            observer_point = observer_feature.geometry().asPoint()
+            observer_id = int(observer_feature.attribute(observers_id))
+            observer_offset = float(observer_feature.attribute(observers_offset))
 
-                f = QgsFeature(fields)
-                f.setGeometry(line)
-                f.setAttribute(f.fieldNameIndex(FieldNames.LOS_TYPE), NamesConstants.LOS_GLOBAL)
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.ID_OBSERVER),
-                    int(observer_feature.attribute(observers_id)),
-                )
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.ID_TARGET),
-                    int(target_feature.attribute(targets_id)),
-                )
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.OBSERVER_OFFSET),
-                    float(observer_feature.attribute(observers_offset)),
-                )
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.TARGET_OFFSET),
-                    float(target_feature.attribute(targets_offset)),
-                )
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.TARGET_X),
-                    float(target_feature.geometry().asPoint().x()),
-                )
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.TARGET_Y),
-                    float(target_feature.geometry().asPoint().y()),
-                )
+            target_indices = self.targets_in_range(observer_point, targets_xy, targets_index, maximum_distance)
 
-                sink.addFeature(f)
+            for chunk_start in range(0, target_indices.shape[0], self.LINES_CHUNK_SIZE):
+                chunk_indices = target_indices[chunk_start : chunk_start + self.LINES_CHUNK_SIZE]
+                chunk_xy = targets_xy[chunk_indices]
 
-                feedback.setProgress(((observer_count + 1 * target_count + 1 + target_count) / feature_count) * 100)
+                # observer, target and point behind target extended by the maximal raster diagonal
+                vertices = np.empty((chunk_xy.shape[0], 3, 2))
+                vertices[:, 0] = [observer_point.x(), observer_point.y()]
+                vertices[:, 1] = chunk_xy
+                vertices[:, 2] = extend_line_end(
+                    vertices[:, 0], chunk_xy, np.full(chunk_xy.shape[0], max_length_extension, dtype=float)
+                )
 
-        return {self.OUTPUT_LAYER: dest_id}
+                coords, offsets = segmentize_lines_coordinates(vertices, sampling_distance)
+
+                # whole chunk sampled (or read from profile cache) at once
+                chunk_zs = list_rasters.sample_profiles(coords[:, 0], coords[:, 1])
+
+                for i in range(chunk_xy.shape[0]):
+                    target_count = int(chunk_indices[i])
+                    target_point, target_id, target_offset = targets[target_count]
+
+                    line_coords = coords[offsets[i] : offsets[i + 1]]
+                    zs = chunk_zs[offsets[i] : offsets[i + 1]]
+                    line = list_rasters.line_from_arrays(line_coords[:, 0], line_coords[:, 1], zs)
+
+                    writer.add_feature(
+                        template.feature(
+                            [
+                                NamesConstants.LOS_GLOBAL,
+                                observer_id,
+                                target_id,
+                                observer_offset,
+                                target_offset,
+                                float(target_point.x()),
+                                float(target_point.y()),
+                            ],
+                            line,
+                        )
+                    )
+
+                    if profiles is not None:
+                        profiles.add_segmented_line(
+                            observer_point.x(),
+                            observer_point.y(),
+                            chunk_xy[i, 0],
+                            chunk_xy[i, 1],
+                            zs,
+                            id_observer=observer_id,
+                            id_target=target_id,
+                            observer_offset=observer_offset,
+                            target_offset=target_offset,
+                            extension=max_length_extension,
+                        )
+
+            feedback.setProgress(((observer_count + 1) / feature_count) * 100)
+
+        writer.flush()
+
+        if profile_cache is not None:
+            feedback.pushInfo(f"Profile cache size: {profile_cache.size / 1024 / 1024:.1f} MB.")
+
+        if profiles is not None:
+            profiles.close()
+
+        return {self.OUTPUT_LAYER: dest_id, self.OUTPUT_PROFILES: profiles_path or None}
 
     def name(self):
         return "globallos"
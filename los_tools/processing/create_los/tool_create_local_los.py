@@ -1,8 +1,9 @@
+from typing import Optional
+
+import numpy as np
 from qgis.core import (
     Qgis,
-    QgsFeature,
-    QgsGeometry,
-    QgsPoint,
+    QgsPointXY,
     QgsProcessing,
     QgsProcessingAlgorithm,
     QgsProcessingException,
@@ -10,19 +11,26 @@ from qgis.core import (
     QgsProcessingParameterFeatureSink,
     QgsProcessingParameterFeatureSource,
     QgsProcessingParameterField,
+    QgsProcessingParameterFileDestination,
     QgsProcessingParameterMultipleLayers,
     QgsProcessingUtils,
+    QgsRectangle,
+    QgsSpatialIndex,
 )
 
 from los_tools.classes.list_raster import ListOfRasters
-from los_tools.constants.field_names import FieldNames
+from los_tools.classes.los_profiles import LOS_PROFILES_FILE_FILTER, LoSProfilesWriter
 from los_tools.constants.fields import Fields
 from los_tools.constants.names_constants import NamesConstants
-from los_tools.processing.tools.util_functions import segmentize_los_line
+from los_tools.processing.tools.util_functions import segmentize_lines_coordinates
+from los_tools.processing.utils import BatchedFeatureSink, FeatureTemplate, LoSToolsSettings
 from los_tools.utils import get_doc_file
 
 
 class CreateLocalLosAlgorithm(QgsProcessingAlgorithm):
+    # number of lines segmentized together, limits memory used for sample coordinates
+    LINES_CHUNK_SIZE = 1000
+
     OBSERVER_POINTS_LAYER = "ObserverPoints"
     OBSERVER_ID_FIELD = "ObserverIdField"
     OBSERVER_OFFSET_FIELD = "ObserverOffset"
@@ -31,7 +39,9 @@ class CreateLocalLosAlgorithm(QgsProcessingAlgorithm):
     TARGET_OFFSET_FIELD = "TargetOffset"
     OUTPUT_LAYER = "OutputLayer"
     LINE_DENSITY = "LineDensity"
+    MAXIMUM_DISTANCE = "MaximumDistance"
     DEM_RASTERS = "DemRasters"
+    OUTPUT_PROFILES = "OutputProfiles"
 
     def initAlgorithm(self, configuration=None):
         self.addParameter(
@@ -106,8 +116,29 @@ class CreateLocalLosAlgorithm(QgsProcessingAlgorithm):
             )
         )
 
+        self.addParameter(
+            QgsProcessingParameterDistance(
+                self.MAXIMUM_DISTANCE,
+                "Maximal distance of target from observer (0 means no limit)",
+                parentParameterName=self.OBSERVER_POINTS_LAYER,
+                defaultValue=0,
+                minValue=0,
+                optional=True,
+            )
+        )
+
         self.addParameter(QgsProcessingParameterFeatureSink(self.OUTPUT_LAYER, "Output layer"))
 
+        self.addParameter(
+            QgsProcessingParameterFileDestination(
+                self.OUTPUT_PROFILES,
+                "Output LoS profiles file",
+                fileFilter=LOS_PROFILES_FILE_FILTER,
+                optional=True,
+                createByDefault=False,
+            )
+        )
+
     def checkParameterValues(self, parameters, context):
         observers_layer = self.parameterAsSource(parameters, self.OBSERVER_POINTS_LAYER, context)
         targets_layer = self.parameterAsSource(parameters, self.TARGET_POINTS_LAYER, context)
@@ -147,7 +178,11 @@ class CreateLocalLosAlgorithm(QgsProcessingAlgorithm):
         return super().checkParameterValues(parameters, context)
 
     def processAlgorithm(self, parameters, context, feedback):
-        list_rasters = ListOfRasters(self.parameterAsLayerList(parameters, self.DEM_RASTERS, context))
+        profile_cache = LoSToolsSettings.profile_cache()
+
+        list_rasters = ListOfRasters(
+            self.parameterAsLayerList(parameters, self.DEM_RASTERS, context), profile_cache=profile_cache
+        )
 
         observers_layer = self.parameterAsSource(parameters, self.OBSERVER_POINTS_LAYER, context)
 
@@ -167,6 +202,8 @@ class CreateLocalLosAlgorithm(QgsProcessingAlgorithm):
 
         sampling_distance = self.parameterAsDouble(parameters, self.LINE_DENSITY, context)
 
+        maximum_distance = self.parameterAsDouble(parameters, self.MAXIMUM_DISTANCE, context)
+
         fields = Fields.los_local_fields
 
         sink, dest_id = self.parameterAsSink(
@@ -181,53 +218,131 @@ class CreateLocalLosAlgorithm(QgsProcessingAlgorithm):
         if sink is None:
             raise QgsProcessingException(self.invalidSinkError(parameters, self.OUTPUT_LAYER))
 
-        feature_count = observers_layer.featureCount() * targets_layer.featureCount()
+        feature_count = observers_layer.featureCount()
 
         observers_iterator = observers_layer.getFeatures()
 
-        for observer_count, observer_feature in enumerate(observers_iterator):
-            if feedback.isCanceled():
-                break
+        targets = [
+            (
+                target_feature.geometry().asPoint(),
+                int(target_feature.attribute(targets_id)),
+                float(target_feature.attribute(targets_offset)),
+            )
+            for target_feature in targets_layer.getFeatures()
+        ]
 
-            targets_iterators = targets_layer.getFeatures()
+        targets_xy = np.array([[point.x(), point.y()] for point, _, _ in targets], dtype=float).reshape(-1, 2)
 
-            for target_count, target_feature in enumerate(targets_iterators):
-                line = QgsGeometry.fromPolyline(
-                    [
-                        QgsPoint(observer_feature.geometry().asPoint()),
-                        QgsPoint(target_feature.geometry().asPoint()),
-                    ]
-                )
+        targets_index = self.targets_spatial_index(targets_xy) if 0 < maximum_distance else None
 
-                line = segmentize_los_line(line, segment_length=sampling_distance)
+        profiles_path = self.parameterAsFileOutput(parameters, self.OUTPUT_PROFILES, context)
+        profiles = (
+            LoSProfilesWriter(profiles_path, NamesConstants.LOS_LOCAL, sampling_distance) if profiles_path else None
+        )
 
-                line = list_rasters.add_z_values(line.points())
+        template = FeatureTemplate(fields)
+        writer = BatchedFeatureSink(sink)
 
-                f = QgsFeature(fields)
-                f.setGeometry(line)
-                f.setAttribute(f.fieldNameIndex(FieldNames.LOS_TYPE), NamesConstants.LOS_LOCAL)
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.ID_OBSERVER),
-                    int(observer_feature.attribute(observers_id)),
-                )
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.ID_TARGET),
-                    int(target_feature.attribute(targets_id)),
-                )
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.OBSERVER_OFFSET),
-                    float(observer_feature.attribute(observers_offset)),
-                )
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.TARGET_OFFSET),
-                    float(target_feature.attribute(targets_offset)),
-                )
+        for observer_count, observer_feature in enumerate(observers_iterator):
+            if feedback.isCanceled():
+                break
 
-                sink.addFeature(f)
+            observer_point = observer_feature.geometry().asPoint()
+            observer_id = int(observer_feature.attribute(observers_id))
+            observer_offset = float(observer_feature.attribute(observers_offset))
+
+            target_indices = self.targets_in_range(observer_point, targets_xy, targets_index, maximum_distance)
+
+            for chunk_start in range(0, target_indices.shape[0], self.LINES_CHUNK_SIZE):
+                chunk_indices = target_indices[chunk_start : chunk_start + self.LINES_CHUNK_SIZE]
+                chunk_xy = targets_xy[chunk_indices]
+
+                vertices = np.empty((chunk_xy.shape[0], 2, 2))
+                vertices[:, 0] = [observer_point.x(), observer_point.y()]
+                vertices[:, 1] = chunk_xy
+
+                coords, offsets = segmentize_lines_coordinates(vertices, sampling_distance)
+
+                # whole chunk sampled (or read from profile cache) at once
+                chunk_zs = list_rasters.sample_profiles(coords[:, 0], coords[:, 1])
+
+                for i in range(chunk_xy.shape[0]):
+                    target_count = int(chunk_indices[i])
+                    _, target_id, target_offset = targets[target_count]
+
+                    line_coords = coords[offsets[i] : offsets[i + 1]]
+                    zs = chunk_zs[offsets[i] : offsets[i + 1]]
+                    line = list_rasters.line_from_arrays(line_coords[:, 0], line_coords[:, 1], zs)
+
+                    writer.add_feature(
+                        template.feature(
+                            [NamesConstants.LOS_LOCAL, observer_id, target_id, observer_offset, target_offset],
+                            line,
+                        )
+                    )
+
+                    if profiles is not None:
+                        profiles.add_segmented_line(
+                            observer_point.x(),
+                            observer_point.y(),
+                            chunk_xy[i, 0],
+                            chunk_xy[i, 1],
+                            zs,
+                            id_observer=observer_id,
+                            id_target=target_id,
+                            observer_offset=observer_offset,
+                            target_offset=target_offset,
+                        )
+
+            feedback.setProgress(((observer_count + 1) / feature_count) * 100)
+
+        writer.flush()
+
+        if profile_cache is not None:
+            feedback.pushInfo(f"Profile cache size: {profile_cache.size / 1024 / 1024:.1f} MB.")
+
+        if profiles is not None:
+            profiles.close()
+
+        return {self.OUTPUT_LAYER: dest_id, self.OUTPUT_PROFILES: profiles_path or None}
+
+    @staticmethod
+    def targets_spatial_index(targets_xy: np.ndarray) -> QgsSpatialIndex:
+        """Spatial index of target points, feature IDs are indices of targets."""
+        spatial_index = QgsSpatialIndex()
+
+        for i, (x, y) in enumerate(targets_xy.tolist()):
+            spatial_index.addFeature(i, QgsRectangle(x, y, x, y))
+
+        return spatial_index
+
+    @staticmethod
+    def targets_in_range(
+        observer_point: QgsPointXY,
+        targets_xy: np.ndarray,
+        targets_index: Optional[QgsSpatialIndex],
+        maximum_distance: float,
+    ) -> np.ndarray:
+        """Indices of targets (in original order) within maximum distance from observer, all targets without index."""
+        if targets_index is None:
+            return np.arange(targets_xy.shape[0])
+
+        x = observer_point.x()
+        y = observer_point.y()
+
+        candidates = np.array(
+            sorted(
+                targets_index.intersects(
+                    QgsRectangle(x - maximum_distance, y - maximum_distance, x + maximum_distance, y + maximum_distance)
+                )
+            ),
+            dtype=np.int64,
+        )
 
-                feedback.setProgress(((observer_count + 1 * target_count + 1 + target_count) / feature_count) * 100)
+        dx = targets_xy[candidates, 0] - x
+        dy = targets_xy[candidates, 1] - y
 
-        return {self.OUTPUT_LAYER: dest_id}
+        return candidates[np.sqrt(dx * dx + dy * dy) <= maximum_distance]
 
     def name(self):
         return "locallos"
@@ -1,7 +1,12 @@
+import queue
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
 from qgis.core import (
     Qgis,
     QgsFeature,
     QgsFeatureRequest,
+    QgsLineString,
     QgsPoint,
     QgsProcessing,
     QgsProcessingAlgorithm,
@@ -10,17 +15,22 @@ from qgis.core import (
     QgsProcessingParameterFeatureSink,
     QgsProcessingParameterFeatureSource,
     QgsProcessingParameterField,
+    QgsProcessingParameterFileDestination,
     QgsProcessingParameterMultipleLayers,
+    QgsProcessingParameterNumber,
     QgsProcessingParameterVectorLayer,
     QgsProcessingUtils,
+    QgsVariantUtils,
 )
 
 from los_tools.classes.list_raster import ListOfRasters
+from los_tools.classes.los_profiles import LOS_PROFILES_FILE_FILTER, LoSProfilesWriter
 from los_tools.classes.sampling_distance_matrix import SamplingDistanceMatrix
 from los_tools.constants.field_names import FieldNames
 from los_tools.constants.fields import Fields
 from los_tools.constants.names_constants import NamesConstants
-from los_tools.processing.utils import LoSToolsSettings
+from los_tools.processing.tools.util_functions import ordered_parallel_map
+from los_tools.processing.utils import BatchedFeatureSink, FeatureTemplate, LoSToolsSettings
 from los_tools.utils import get_doc_file
 
 
@@ -35,6 +45,8 @@ class CreateNoTargetLosAlgorithm(QgsProcessingAlgorithm):
 
     DEM_RASTERS = "DemRasters"
     LINE_SETTINGS_TABLE = "LineSettingsTable"
+    WORKERS = "Workers"
+    OUTPUT_PROFILES = "OutputProfiles"
 
     def initAlgorithm(self, configuration=None):
         self.addParameter(
@@ -105,8 +117,28 @@ class CreateNoTargetLosAlgorithm(QgsProcessingAlgorithm):
             )
         )
 
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.WORKERS,
+                "Number of workers",
+                QgsProcessingParameterNumber.Integer,
+                defaultValue=1,
+                minValue=1,
+            )
+        )
+
         self.addParameter(QgsProcessingParameterFeatureSink(self.OUTPUT_LAYER, "Output layer"))
 
+        self.addParameter(
+            QgsProcessingParameterFileDestination(
+                self.OUTPUT_PROFILES,
+                "Output LoS profiles file",
+                fileFilter=LOS_PROFILES_FILE_FILTER,
+                optional=True,
+                createByDefault=False,
+            )
+        )
+
     def checkParameterValues(self, parameters, context):
         observers_layer = self.parameterAsSource(parameters, self.OBSERVER_POINTS_LAYER, context)
         targets_layer = self.parameterAsSource(parameters, self.TARGET_POINTS_LAYER, context)
@@ -169,7 +201,20 @@ class CreateNoTargetLosAlgorithm(QgsProcessingAlgorithm):
         targets_id = self.parameterAsString(parameters, self.TARGET_ID_FIELD, context)
         target_definition_id_field = self.parameterAsString(parameters, self.TARGET_DEFINITION_ID_FIELD, context)
 
-        list_rasters = ListOfRasters(self.parameterAsLayerList(parameters, self.DEM_RASTERS, context))
+        rasters = self.parameterAsLayerList(parameters, self.DEM_RASTERS, context)
+
+        workers = self.parameterAsInt(parameters, self.WORKERS, context)
+
+        profile_cache = LoSToolsSettings.profile_cache()
+
+        list_rasters = ListOfRasters(rasters, profile_cache=profile_cache)
+
+        # every worker samples with its own copies of raster layers (and data providers)
+        rasters_pool: queue.Queue = queue.Queue()
+        rasters_pool.put(list_rasters)
+
+        for _ in range(1, workers):
+            rasters_pool.put(ListOfRasters([raster.clone() for raster in rasters], profile_cache=profile_cache))
 
         line_settings_table = self.parameterAsVectorLayer(parameters, self.LINE_SETTINGS_TABLE, context)
 
@@ -197,66 +242,161 @@ class CreateNoTargetLosAlgorithm(QgsProcessingAlgorithm):
 
         feedback.pushCommandInfo(f"Sample Z: {LoSToolsSettings.sample_Z_using_plugin()}.")
 
-        i = 0
-
         sampleZ = LoSToolsSettings.sample_Z_using_plugin()
 
-        for observer_feature in observers_iterator:
-            request = QgsFeatureRequest()
-            request.setFilterExpression(f"{target_definition_id_field} = {observer_feature.attribute(observers_id)}")
+        # targets grouped by the agreement ID in one pass over the target layer
+        targets_request = QgsFeatureRequest()
+        targets_request.setSubsetOfAttributes(
+            [targets_id, target_definition_id_field, FieldNames.AZIMUTH, FieldNames.ANGLE_STEP_POINTS],
+            targets_layer.fields(),
+        )
 
-            targets_iterators = targets_layer.getFeatures(request)
+        targets_by_definition_id: Dict[Any, List[Tuple]] = {}
 
-            for target_feature in targets_iterators:
+        for target_feature in targets_layer.getFeatures(targets_request):
+            definition_id = target_feature.attribute(target_definition_id_field)
+
+            if QgsVariantUtils.isNull(definition_id):
+                continue
+
+            targets_by_definition_id.setdefault(definition_id, []).append(
+                (
+                    QgsPoint(target_feature.geometry().asPoint()),
+                    int(target_feature.attribute(targets_id)),
+                    target_feature.attribute(FieldNames.AZIMUTH),
+                    target_feature.attribute(FieldNames.ANGLE_STEP_POINTS),
+                )
+            )
+
+        def observers_with_targets():
+            for observer_feature in observers_iterator:
                 if feedback.isCanceled():
                     break
 
-                start_point = QgsPoint(observer_feature.geometry().asPoint())
-                direction_point = QgsPoint(target_feature.geometry().asPoint())
+                observer_id = observer_feature.attribute(observers_id)
 
-                line = distance_matrix.build_line(start_point, direction_point)
+                if QgsVariantUtils.isNull(observer_id):
+                    continue
 
-                if sampleZ:
-                    line = list_rasters.add_z_values(line.points())
+                targets = targets_by_definition_id.get(observer_id)
 
-                f = QgsFeature(fields)
-                f.setGeometry(line)
-                f.setAttribute(f.fieldNameIndex(FieldNames.LOS_TYPE), NamesConstants.LOS_NO_TARGET)
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.ID_OBSERVER),
-                    int(observer_feature.attribute(observers_id)),
-                )
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.ID_TARGET),
-                    int(target_feature.attribute(targets_id)),
-                )
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.OBSERVER_OFFSET),
+                if not targets:
+                    continue
+
+                yield (
+                    QgsPoint(observer_feature.geometry().asPoint()),
+                    int(observer_id),
                     float(observer_feature.attribute(observers_offset)),
+                    targets,
                 )
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.AZIMUTH),
-                    target_feature.attribute(FieldNames.AZIMUTH),
-                )
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.OBSERVER_X),
-                    observer_feature.geometry().asPoint().x(),
-                )
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.OBSERVER_Y),
-                    observer_feature.geometry().asPoint().y(),
-                )
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.ANGLE_STEP),
-                    target_feature.attribute(FieldNames.ANGLE_STEP_POINTS),
+
+        profiles_path = self.parameterAsFileOutput(parameters, self.OUTPUT_PROFILES, context)
+        profiles = LoSProfilesWriter(profiles_path, NamesConstants.LOS_NO_TARGET) if profiles_path else None
+
+        # shared by all LoS, so the profiles file stores it only once
+        distance_template = distance_matrix.distance_template()
+
+        template = FeatureTemplate(fields)
+        writer = BatchedFeatureSink(sink)
+
+        def create_observer_los(
+            observer: Tuple[QgsPoint, int, float, List[Tuple]],
+        ) -> Tuple[List[QgsFeature], List[Tuple[float, np.ndarray]]]:
+            observer_rasters = rasters_pool.get()
+
+            try:
+                return self.create_los_features(
+                    observer, observer_rasters, distance_matrix, template, sampleZ, profiles is not None
                 )
+            finally:
+                rasters_pool.put(observer_rasters)
 
-                sink.addFeature(f)
+        i = 0
+
+        for los_features, los_profiles in ordered_parallel_map(create_observer_los, observers_with_targets(), workers):
+            if feedback.isCanceled():
+                break
+
+            writer.add_features(los_features)
+
+            for los_feature, (azimuth, zs) in zip(los_features, los_profiles):
+                profiles.add_profile(
+                    los_feature.attribute(FieldNames.OBSERVER_X),
+                    los_feature.attribute(FieldNames.OBSERVER_Y),
+                    azimuth,
+                    distance_template,
+                    zs,
+                    id_observer=los_feature.attribute(FieldNames.ID_OBSERVER),
+                    id_target=los_feature.attribute(FieldNames.ID_TARGET),
+                    observer_offset=los_feature.attribute(FieldNames.OBSERVER_OFFSET),
+                )
 
-                feedback.setProgress((i / feature_count) * 100)
-                i += 1
+            i += len(los_features)
+            feedback.setProgress((i / feature_count) * 100)
+
+        writer.flush()
+
+        if profile_cache is not None:
+            feedback.pushInfo(f"Profile cache size: {profile_cache.size / 1024 / 1024:.1f} MB.")
+
+        if profiles is not None:
+            profiles.close()
+
+        return {self.OUTPUT_LAYER: dest_id, self.OUTPUT_PROFILES: profiles_path or None}
+
+    @staticmethod
+    def create_los_features(
+        observer: Tuple[QgsPoint, int, float, List[Tuple]],
+        list_rasters: ListOfRasters,
+        distance_matrix: SamplingDistanceMatrix,
+        template: FeatureTemplate,
+        sample_z: bool,
+        sample_profiles: bool = False,
+    ) -> Tuple[List[QgsFeature], List[Tuple[float, np.ndarray]]]:
+        """Creates LoS features from observer to all its targets (point, id, azimuth, angle step).
+
+        If `sample_profiles` is set, returns also azimuths and elevations (sampled by the plugin regardless of
+        `sample_z`) of the lines for LoS profiles.
+        """
+        start_point, observer_id, observer_offset, targets = observer
+
+        los_features = []
+        los_profiles = []
+
+        line_azimuths = [start_point.azimuth(direction_point) for direction_point, _, _, _ in targets]
+
+        xs, ys = distance_matrix.build_lines_arrays(start_point, np.array(line_azimuths))
+
+        # all lines of observer sampled (or read from profile cache) at once
+        if sample_z or sample_profiles:
+            zs = list_rasters.sample_profiles(xs.ravel(), ys.ravel()).reshape(xs.shape)
+
+        for i, (_, target_id, azimuth, angle_step) in enumerate(targets):
+            if sample_z:
+                line = list_rasters.line_from_arrays(xs[i], ys[i], zs[i])
+            else:
+                line = QgsLineString(xs[i].tolist(), ys[i].tolist())
+
+            if sample_profiles:
+                los_profiles.append((line_azimuths[i], zs[i]))
+
+            los_features.append(
+                template.feature(
+                    [
+                        NamesConstants.LOS_NO_TARGET,
+                        observer_id,
+                        target_id,
+                        observer_offset,
+                        azimuth,
+                        start_point.x(),
+                        start_point.y(),
+                        angle_step,
+                    ],
+                    line,
+                )
+            )
 
-        return {self.OUTPUT_LAYER: dest_id}
+        return los_features, los_profiles
 
     def name(self):
         return "notargetlos"
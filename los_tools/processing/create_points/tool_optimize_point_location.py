@@ -2,7 +2,6 @@ import math
 from typing import Optional, Union
 
 from qgis.core import (
-    QgsFeature,
     QgsGeometry,
     QgsPoint,
     QgsPointXY,
@@ -22,6 +21,7 @@ from qgis.core import (
     qgsFloatNear,
 )
 
+from los_tools.processing.utils import BatchedFeatureSink, FeatureTemplate
 from los_tools.utils import get_doc_file
 
 
@@ -184,6 +184,9 @@ class OptimizePointLocationAlgorithm(QgsProcessingAlgorithm):
 
         input_layer_iterator = input_layer.getFeatures()
 
+        template = FeatureTemplate(input_layer.fields())
+        writer = BatchedFeatureSink(sink)
+
         for input_feature_count, input_layer_feature in enumerate(input_layer_iterator):
             if feedback.isCanceled():
                 break
@@ -201,13 +204,14 @@ class OptimizePointLocationAlgorithm(QgsProcessingAlgorithm):
                 mask_no_data_value=mask_no_data_value,
             )
 
-            f = QgsFeature(input_layer.fields())
-            f.setGeometry(QgsGeometry.fromPointXY(result_point))
-            f.setAttributes(input_layer_feature.attributes())
-            sink.addFeature(f)
+            writer.add_feature(
+                template.feature(input_layer_feature.attributes(), QgsGeometry.fromPointXY(result_point))
+            )
 
             feedback.setProgress((input_feature_count / feature_count) * 100)
 
+        writer.flush()
+
         return {self.OUTPUT_LAYER: dest_id}
 
     def name(self):
@@ -1,7 +1,6 @@
 import numpy as np
 from qgis.core import (
     Qgis,
-    QgsFeature,
     QgsField,
     QgsFields,
     QgsGeometry,
@@ -20,6 +19,7 @@ from qgis.PyQt.QtCore import QMetaType
 
 from los_tools.constants.field_names import FieldNames
 from los_tools.processing.tools.util_functions import get_max_decimal_numbers, round_all_values
+from los_tools.processing.utils import BatchedFeatureSink, FeatureTemplate
 from los_tools.utils import get_doc_file
 
 
@@ -136,26 +136,30 @@ class CreatePointsAroundAlgorithm(QgsProcessingAlgorithm):
 
         iterator = input_layer.getFeatures()
 
+        template = FeatureTemplate(fields)
+        writer = BatchedFeatureSink(sink)
+
         for cnt, feature in enumerate(iterator):
             if feedback.isCanceled():
                 break
 
+            point = feature.geometry().asPoint()
+            id_original_point = int(feature.attribute(id_field))
+
             for angle in angles:
-                new_point: QgsPointXY = feature.geometry().asPoint().project(distance, angle)
+                new_point: QgsPointXY = point.project(distance, angle)
 
-                f = QgsFeature(fields)
-                f.setGeometry(QgsGeometry().fromPointXY(new_point))
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.ID_ORIGINAL_POINT),
-                    int(feature.attribute(id_field)),
+                writer.add_feature(
+                    template.feature(
+                        [id_original_point, float(angle), float(angle_step)],
+                        QgsGeometry.fromPointXY(new_point),
+                    )
                 )
-                f.setAttribute(f.fieldNameIndex(FieldNames.AZIMUTH), float(angle))
-                f.setAttribute(f.fieldNameIndex(FieldNames.ANGLE_STEP_POINTS), float(angle_step))
-
-                sink.addFeature(f)
 
             feedback.setProgress((cnt / feature_count) * 100)
 
+        writer.flush()
+
         return {self.OUTPUT_LAYER: dest_id}
 
     def name(self):
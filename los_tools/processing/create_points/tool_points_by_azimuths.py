@@ -1,7 +1,6 @@
 import numpy as np
 from qgis.core import (
     Qgis,
-    QgsFeature,
     QgsField,
     QgsFields,
     QgsGeometry,
@@ -21,6 +20,7 @@ from qgis.PyQt.QtCore import QMetaType
 
 from los_tools.constants.field_names import FieldNames
 from los_tools.processing.tools.util_functions import get_max_decimal_numbers, round_all_values
+from los_tools.processing.utils import BatchedFeatureSink, FeatureTemplate
 from los_tools.utils import get_doc_file
 
 
@@ -157,11 +157,15 @@ class CreatePointsInAzimuthsAlgorithm(QgsProcessingAlgorithm):
 
         iterator = input_layer.getFeatures()
 
+        template = FeatureTemplate(fields)
+        writer = BatchedFeatureSink(sink)
+
         for cnt, feature in enumerate(iterator):
             if feedback.isCanceled():
                 break
 
             feature_point: QgsPointXY = feature.geometry().asPoint()
+            id_original_point = int(feature.attribute(id_field))
 
             if not over_north:
                 angles = np.arange(angle_min, angle_max + 0.1 * angle_step, step=angle_step).tolist()
@@ -179,26 +183,20 @@ class CreatePointsInAzimuthsAlgorithm(QgsProcessingAlgorithm):
 
             angles = round_all_values(angles, round_digits)
 
-            i = 0
-
-            for angle in angles:
+            for i, angle in enumerate(angles):
                 new_point: QgsPointXY = feature_point.project(distance, angle)
 
-                f = QgsFeature(fields)
-                f.setGeometry(QgsGeometry().fromPointXY(new_point))
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.ID_ORIGINAL_POINT),
-                    int(feature.attribute(id_field)),
+                writer.add_feature(
+                    template.feature(
+                        [id_original_point, i, float(angle), angle_step],
+                        QgsGeometry.fromPointXY(new_point),
+                    )
                 )
-                f.setAttribute(f.fieldNameIndex(FieldNames.AZIMUTH), float(angle))
-                f.setAttribute(f.fieldNameIndex(FieldNames.ID_POINT), int(i))
-                f.setAttribute(f.fieldNameIndex(FieldNames.ANGLE_STEP_POINTS), angle_step)
-
-                sink.addFeature(f)
-                i += 1
 
             feedback.setProgress((cnt / feature_count) * 100)
 
+        writer.flush()
+
         return {self.OUTPUT_LAYER: dest_id}
 
     def name(self):
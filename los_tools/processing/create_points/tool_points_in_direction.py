@@ -1,7 +1,6 @@
 import numpy as np
 from qgis.core import (
     Qgis,
-    QgsFeature,
     QgsField,
     QgsFields,
     QgsGeometry,
@@ -20,6 +19,7 @@ from qgis.PyQt.QtCore import QMetaType
 
 from los_tools.constants.field_names import FieldNames
 from los_tools.processing.tools.util_functions import get_max_decimal_numbers, round_all_values
+from los_tools.processing.utils import BatchedFeatureSink, FeatureTemplate
 from los_tools.utils import get_doc_file
 
 
@@ -145,6 +145,9 @@ class CreatePointsInDirectionAlgorithm(QgsProcessingAlgorithm):
 
         iterator = input_layer.getFeatures()
 
+        template = FeatureTemplate(fields)
+        writer = BatchedFeatureSink(sink)
+
         for cnt, feature in enumerate(iterator):
             if feedback.isCanceled():
                 break
@@ -152,6 +155,7 @@ class CreatePointsInDirectionAlgorithm(QgsProcessingAlgorithm):
             iterator_direction = main_direction_layer.getFeatures()
 
             feature_point: QgsPointXY = feature.geometry().asPoint()
+            id_original_point = int(feature.attribute(id_field))
 
             for cnt_direction, feature_direction in enumerate(iterator_direction):
                 main_angle = feature_point.azimuth(feature_direction.geometry().asPoint())
@@ -166,30 +170,20 @@ class CreatePointsInDirectionAlgorithm(QgsProcessingAlgorithm):
 
                 angles = round_all_values(angles, round_digits)
 
-                i = 0
-
-                for angle in angles:
+                for i, angle in enumerate(angles):
                     new_point: QgsPointXY = feature_point.project(distance, angle)
 
-                    f = QgsFeature(fields)
-                    f.setGeometry(QgsGeometry().fromPointXY(new_point))
-                    f.setAttribute(
-                        f.fieldNameIndex(FieldNames.ID_ORIGINAL_POINT),
-                        int(feature.attribute(id_field)),
-                    )
-                    f.setAttribute(f.fieldNameIndex(FieldNames.AZIMUTH), float(angle))
-                    f.setAttribute(f.fieldNameIndex(FieldNames.ID_POINT), int(i))
-                    f.setAttribute(
-                        f.fieldNameIndex(FieldNames.DIFF_TO_MAIN_AZIMUTH),
-                        float(angle) - main_angle,
+                    writer.add_feature(
+                        template.feature(
+                            [id_original_point, i, float(angle), float(angle) - main_angle, angle_step],
+                            QgsGeometry.fromPointXY(new_point),
+                        )
                     )
-                    f.setAttribute(f.fieldNameIndex(FieldNames.ANGLE_STEP_POINTS), angle_step)
-
-                    sink.addFeature(f)
-                    i += 1
 
             feedback.setProgress((cnt / feature_count) * 100)
 
+        writer.flush()
+
         return {self.OUTPUT_LAYER: dest_id}
 
     def name(self):
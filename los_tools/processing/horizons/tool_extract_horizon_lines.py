@@ -1,7 +1,5 @@
 from qgis.core import (
     Qgis,
-    QgsFeature,
-    QgsFeatureRequest,
     QgsField,
     QgsFields,
     QgsLineString,
@@ -22,7 +20,7 @@ from qgis.PyQt.QtCore import QMetaType
 from los_tools.classes.classes_los import LoSWithoutTarget
 from los_tools.constants.field_names import FieldNames
 from los_tools.constants.names_constants import NamesConstants
-from los_tools.processing.tools.util_functions import get_los_type
+from los_tools.processing.utils import BatchedFeatureSink, FeatureTemplate, LayerReader
 from los_tools.utils import get_doc_file
 
 
@@ -81,7 +79,7 @@ class ExtractHorizonLinesAlgorithm(QgsProcessingAlgorithm):
 
             return False, msg
 
-        los_type = get_los_type(los_layer, field_names)
+        los_type = LayerReader.los(los_layer).type
 
         if los_type != NamesConstants.LOS_NO_TARGET:
             msg = (
@@ -121,19 +119,23 @@ class ExtractHorizonLinesAlgorithm(QgsProcessingAlgorithm):
         if sink is None:
             raise QgsProcessingException(self.invalidSinkError(parameters, self.OUTPUT_LAYER))
 
-        id_values = list(los_layer.uniqueValues(los_layer.fields().indexFromName(FieldNames.ID_OBSERVER)))
-
         total = 100 / los_layer.featureCount() if los_layer.featureCount() else 0
 
-        i = 0
+        template = FeatureTemplate(fields)
+        writer = BatchedFeatureSink(sink)
+
+        los_reader = LayerReader.los(los_layer)
+        attributes = [
+            FieldNames.OBSERVER_OFFSET,
+            FieldNames.OBSERVER_X,
+            FieldNames.OBSERVER_Y,
+        ]
 
-        for id_value in id_values:
-            request = QgsFeatureRequest()
-            request.setFilterExpression(f"{FieldNames.ID_OBSERVER} = '{id_value}'")
-            order_by_clause = QgsFeatureRequest.OrderByClause(FieldNames.AZIMUTH, ascending=True)
-            request.setOrderBy(QgsFeatureRequest.OrderBy([order_by_clause]))
+        i = 0
 
-            features = los_layer.getFeatures(request)
+        for id_value, features in los_reader.features_by_observer(attributes):
+            if feedback.isCanceled():
+                break
 
             line_points = []
             values = []
@@ -165,23 +167,22 @@ class ExtractHorizonLinesAlgorithm(QgsProcessingAlgorithm):
                 line = QgsLineString(line_points)
                 line.addMValue()
 
-                for i in range(0, line.numPoints()):
-                    line.setMAt(i, values[i])
-
-                f = QgsFeature(fields)
-                f.setGeometry(line)
-                f.setAttribute(f.fieldNameIndex(FieldNames.ID_OBSERVER), id_value)
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.OBSERVER_X),
-                    los_feature.attribute(FieldNames.OBSERVER_X),
-                )
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.OBSERVER_Y),
-                    los_feature.attribute(FieldNames.OBSERVER_Y),
+                for j in range(0, line.numPoints()):
+                    line.setMAt(j, values[j])
+
+                writer.add_feature(
+                    template.feature(
+                        [
+                            horizon_type,
+                            id_value,
+                            los_feature.attribute(FieldNames.OBSERVER_X),
+                            los_feature.attribute(FieldNames.OBSERVER_Y),
+                        ],
+                        line,
+                    )
                 )
-                f.setAttribute(f.fieldNameIndex(FieldNames.HORIZON_TYPE), horizon_type)
 
-                sink.addFeature(f)
+        writer.flush()
 
         return {self.OUTPUT_LAYER: dest_id}
 
@@ -3,8 +3,6 @@ import typing
 from qgis.core import (
     Qgis,
     QgsColorRamp,
-    QgsFeature,
-    QgsFeatureRequest,
     QgsField,
     QgsFields,
     QgsGraduatedSymbolRenderer,
@@ -31,7 +29,7 @@ from qgis.PyQt.QtCore import QMetaType
 from los_tools.classes.classes_los import LoSWithoutTarget
 from los_tools.constants.field_names import FieldNames
 from los_tools.constants.names_constants import NamesConstants
-from los_tools.processing.tools.util_functions import get_los_type
+from los_tools.processing.utils import BatchedFeatureSink, FeatureTemplate, LayerReader
 from los_tools.utils import get_doc_file
 
 
@@ -91,7 +89,7 @@ class ExtractHorizonLinesByDistanceAlgorithm(QgsProcessingAlgorithm):
 
             return False, msg
 
-        los_type = get_los_type(los_layer, field_names)
+        los_type = LayerReader.los(los_layer).type
 
         if los_type != NamesConstants.LOS_NO_TARGET:
             msg = (
@@ -135,11 +133,6 @@ class ExtractHorizonLinesByDistanceAlgorithm(QgsProcessingAlgorithm):
         fields.append(QgsField(FieldNames.OBSERVER_X, QMetaType.Type.Double))
         fields.append(QgsField(FieldNames.OBSERVER_Y, QMetaType.Type.Double))
 
-        horizon_distance_field_index = fields.indexFromName(FieldNames.HORIZON_DISTANCE)
-        id_observer_field_index = fields.indexFromName(FieldNames.ID_OBSERVER)
-        observer_x_field_index = fields.indexFromName(FieldNames.OBSERVER_X)
-        observer_y_field_index = fields.indexFromName(FieldNames.OBSERVER_Y)
-
         sink, self.dest_id = self.parameterAsSink(
             parameters,
             self.OUTPUT_LAYER,
@@ -152,19 +145,23 @@ class ExtractHorizonLinesByDistanceAlgorithm(QgsProcessingAlgorithm):
         if sink is None:
             raise QgsProcessingException(self.invalidSinkError(parameters, self.OUTPUT_LAYER))
 
-        id_values = list(los_layer.uniqueValues(los_layer.fields().indexFromName(FieldNames.ID_OBSERVER)))
-
         total = 100 / (los_layer.featureCount()) if los_layer.featureCount() else 0
 
-        i = 0
+        template = FeatureTemplate(fields)
+        writer = BatchedFeatureSink(sink)
+
+        los_reader = LayerReader.los(los_layer)
+        attributes = [
+            FieldNames.OBSERVER_OFFSET,
+            FieldNames.OBSERVER_X,
+            FieldNames.OBSERVER_Y,
+        ]
 
-        for id_value in id_values:
-            request = QgsFeatureRequest()
-            request.setFilterExpression(f"{FieldNames.ID_OBSERVER} = '{id_value}'")
-            order_by_clause = QgsFeatureRequest.OrderByClause(FieldNames.AZIMUTH, ascending=True)
-            request.setOrderBy(QgsFeatureRequest.OrderBy([order_by_clause]))
+        i = 0
 
-            features = los_layer.getFeatures(request)
+        for id_value, features in los_reader.features_by_observer(attributes):
+            if feedback.isCanceled():
+                break
 
             line_points: typing.Dict[float, typing.List[QgsPoint]] = {}
             values: typing.Dict[float, typing.List[float]] = {}
@@ -184,11 +181,9 @@ class ExtractHorizonLinesByDistanceAlgorithm(QgsProcessingAlgorithm):
                     refraction_coefficient=ref_coeff,
                 )
 
-                for distance in distances:
-                    los_limited = LoSWithoutTarget.from_another(full_los, distance_limit=distance)
-
-                    line_points[distance].append(los_limited.get_global_horizon())
-                    values[distance].append(los_limited.get_global_horizon_angle())
+                for distance, (horizon, angle) in zip(distances, full_los.get_global_horizons_at_distances(distances)):
+                    line_points[distance].append(horizon)
+                    values[distance].append(angle)
 
                 i += 1
 
@@ -203,23 +198,22 @@ class ExtractHorizonLinesByDistanceAlgorithm(QgsProcessingAlgorithm):
                     line = QgsLineString(points)
                     line.addMValue()
 
-                    for i in range(0, line.numPoints()):
-                        line.setMAt(i, m_values[i])
-
-                    f = QgsFeature(fields)
-                    f.setGeometry(line)
-                    f.setAttribute(id_observer_field_index, id_value)
-                    f.setAttribute(
-                        observer_x_field_index,
-                        los_feature.attribute(FieldNames.OBSERVER_X),
-                    )
-                    f.setAttribute(
-                        observer_y_field_index,
-                        los_feature.attribute(FieldNames.OBSERVER_Y),
+                    for j in range(0, line.numPoints()):
+                        line.setMAt(j, m_values[j])
+
+                    writer.add_feature(
+                        template.feature(
+                            [
+                                distance,
+                                id_value,
+                                los_feature.attribute(FieldNames.OBSERVER_X),
+                                los_feature.attribute(FieldNames.OBSERVER_Y),
+                            ],
+                            line,
+                        )
                     )
-                    f.setAttribute(horizon_distance_field_index, distance)
 
-                    sink.addFeature(f)
+        writer.flush()
 
         return {self.OUTPUT_LAYER: self.dest_id}
 
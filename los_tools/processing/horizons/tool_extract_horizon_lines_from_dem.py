@@ -0,0 +1,377 @@
+import math
+from typing import List, Optional
+
+import numpy as np
+from qgis.core import (
+    Qgis,
+    QgsField,
+    QgsFields,
+    QgsLineString,
+    QgsPoint,
+    QgsProcessing,
+    QgsProcessingAlgorithm,
+    QgsProcessingException,
+    QgsProcessingFeedback,
+    QgsProcessingParameterBoolean,
+    QgsProcessingParameterEnum,
+    QgsProcessingParameterFeatureSink,
+    QgsProcessingParameterFeatureSource,
+    QgsProcessingParameterField,
+    QgsProcessingParameterMultipleLayers,
+    QgsProcessingParameterNumber,
+    QgsProcessingUtils,
+)
+from qgis.PyQt.QtCore import QMetaType
+
+from los_tools.classes.list_raster import ListOfRasters
+from los_tools.classes.los_arrays import polar_coordinates
+from los_tools.classes.los_batch import LoSBatch
+from los_tools.constants.field_names import FieldNames
+from los_tools.constants.names_constants import NamesConstants
+from los_tools.processing.tools.util_functions import (
+    farthest_distance_in_extent,
+    finest_cell_size,
+    get_max_decimal_numbers,
+    round_all_values,
+)
+from los_tools.processing.utils import BatchedFeatureSink, FeatureTemplate
+from los_tools.utils import get_doc_file
+
+
+class ExtractHorizonLinesFromDemAlgorithm(QgsProcessingAlgorithm):
+    DEM_RASTERS = "DemRasters"
+    OBSERVER_POINTS_LAYER = "ObserverPoints"
+    OBSERVER_ID_FIELD = "ObserverIdField"
+    OBSERVER_OFFSET_FIELD = "ObserverOffset"
+    ANGLE_START = "AngleStart"
+    ANGLE_END = "AngleEnd"
+    ANGLE_STEP = "AngleStep"
+    MAXIMUM_DISTANCE = "MaximumDistance"
+    SAMPLING_DISTANCE = "SamplingDistance"
+    HORIZON_TYPE = "HorizonType"
+    CURVATURE_CORRECTIONS = "CurvatureCorrections"
+    REFRACTION_COEFFICIENT = "RefractionCoefficient"
+    OUTPUT_LAYER = "OutputLayer"
+
+    SAMPLES_CHUNK_SIZE = 2**20  # number of samples of all azimuths processed together, limits memory used
+
+    horizons_types = [NamesConstants.HORIZON_MAX_LOCAL, NamesConstants.HORIZON_GLOBAL]
+
+    def initAlgorithm(self, configuration=None):
+        self.addParameter(
+            QgsProcessingParameterMultipleLayers(self.DEM_RASTERS, "Raster DEM Layers", QgsProcessing.TypeRaster)
+        )
+
+        self.addParameter(
+            QgsProcessingParameterFeatureSource(
+                self.OBSERVER_POINTS_LAYER,
+                "Observers point layer",
+                [QgsProcessing.TypeVectorPoint],
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterField(
+                self.OBSERVER_ID_FIELD,
+                "Observer ID field",
+                parentLayerParameterName=self.OBSERVER_POINTS_LAYER,
+                type=QgsProcessingParameterField.Numeric,
+                optional=False,
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterField(
+                self.OBSERVER_OFFSET_FIELD,
+                "Observer offset field",
+                parentLayerParameterName=self.OBSERVER_POINTS_LAYER,
+                type=QgsProcessingParameterField.Numeric,
+                optional=False,
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.ANGLE_START,
+                "Minimal angle",
+                QgsProcessingParameterNumber.Double,
+                defaultValue=0.0,
+                minValue=0.0,
+                maxValue=360.0,
+                optional=False,
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.ANGLE_END,
+                "Maximal angle",
+                QgsProcessingParameterNumber.Double,
+                defaultValue=359.999,
+                minValue=0.0,
+                maxValue=360.0,
+                optional=False,
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.ANGLE_STEP,
+                "Angle step",
+                QgsProcessingParameterNumber.Double,
+                defaultValue=1.0,
+                minValue=0.001,
+                maxValue=360.0,
+                optional=False,
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.MAXIMUM_DISTANCE,
+                "Maximal distance of horizons (0 means up to extent of rasters)",
+                QgsProcessingParameterNumber.Double,
+                defaultValue=0.0,
+                minValue=0.0,
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.SAMPLING_DISTANCE,
+                "Sampling distance (0 means cell size of the most detailed raster)",
+                QgsProcessingParameterNumber.Double,
+                defaultValue=0.0,
+                minValue=0.0,
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterEnum(
+                self.HORIZON_TYPE,
+                "Horizon type",
+                options=self.horizons_types,
+                defaultValue=1,
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterBoolean(
+                self.CURVATURE_CORRECTIONS,
+                "Use curvature corrections?",
+                defaultValue=True,
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.REFRACTION_COEFFICIENT,
+                "Refraction coefficient value",
+                type=QgsProcessingParameterNumber.Double,
+                defaultValue=0.13,
+            )
+        )
+
+        self.addParameter(QgsProcessingParameterFeatureSink(self.OUTPUT_LAYER, "Output layer"))
+
+    def checkParameterValues(self, parameters, context):
+        observers_layer = self.parameterAsSource(parameters, self.OBSERVER_POINTS_LAYER, context)
+
+        if observers_layer.sourceCrs().isGeographic():
+            msg = "`Observers point layer` crs must be projected. " "Right now it is `geographic`."
+
+            return False, msg
+
+        rasters = self.parameterAsLayerList(parameters, self.DEM_RASTERS, context)
+
+        correct, msg = ListOfRasters.validate_bands(rasters)
+
+        if not correct:
+            return correct, msg
+
+        correct, msg = ListOfRasters.validate_crs(rasters, crs=observers_layer.sourceCrs())
+
+        if not correct:
+            return correct, msg
+
+        correct, msg = ListOfRasters.validate_ordering(rasters)
+
+        if not correct:
+            return correct, msg
+
+        correct, msg = ListOfRasters.validate_square_cell_size(rasters)
+
+        if not correct:
+            return correct, msg
+
+        return super().checkParameterValues(parameters, context)
+
+    def processAlgorithm(self, parameters, context, feedback: QgsProcessingFeedback):
+        observers_layer = self.parameterAsSource(parameters, self.OBSERVER_POINTS_LAYER, context)
+
+        if observers_layer is None:
+            raise QgsProcessingException(self.invalidSourceError(parameters, self.OBSERVER_POINTS_LAYER))
+
+        observers_id = self.parameterAsString(parameters, self.OBSERVER_ID_FIELD, context)
+        observers_offset = self.parameterAsString(parameters, self.OBSERVER_OFFSET_FIELD, context)
+
+        list_rasters = ListOfRasters(self.parameterAsLayerList(parameters, self.DEM_RASTERS, context))
+
+        angle_min = self.parameterAsDouble(parameters, self.ANGLE_START, context)
+        angle_max = self.parameterAsDouble(parameters, self.ANGLE_END, context)
+        angle_step = self.parameterAsDouble(parameters, self.ANGLE_STEP, context)
+
+        # same azimuths as `CreatePointsAroundAlgorithm` produces
+        angles = np.arange(angle_min, angle_max + 0.000000001 * angle_step, step=angle_step).tolist()
+        angles = round_all_values(angles, get_max_decimal_numbers([angle_min, angle_max, angle_step]))
+        azimuths = np.array(angles, dtype=float)
+
+        maximum_distance = self.parameterAsDouble(parameters, self.MAXIMUM_DISTANCE, context)
+        sampling_distance = self.parameterAsDouble(parameters, self.SAMPLING_DISTANCE, context)
+
+        if sampling_distance <= 0:
+            sampling_distance = finest_cell_size(list_rasters.rasters)
+
+        horizon_type = self.horizons_types[self.parameterAsEnum(parameters, self.HORIZON_TYPE, context)]
+        curvature_corrections = self.parameterAsBool(parameters, self.CURVATURE_CORRECTIONS, context)
+        ref_coeff = self.parameterAsDouble(parameters, self.REFRACTION_COEFFICIENT, context)
+
+        fields = QgsFields()
+        fields.append(QgsField(FieldNames.HORIZON_TYPE, QMetaType.Type.QString))
+        fields.append(QgsField(FieldNames.ID_OBSERVER, QMetaType.Type.Int))
+        fields.append(QgsField(FieldNames.OBSERVER_X, QMetaType.Type.Double))
+        fields.append(QgsField(FieldNames.OBSERVER_Y, QMetaType.Type.Double))
+
+        sink, dest_id = self.parameterAsSink(
+            parameters,
+            self.OUTPUT_LAYER,
+            context,
+            fields,
+            Qgis.WkbType.LineStringZM,
+            observers_layer.sourceCrs(),
+        )
+
+        if sink is None:
+            raise QgsProcessingException(self.invalidSinkError(parameters, self.OUTPUT_LAYER))
+
+        rasters_extent = list_rasters.extent_polygon().boundingBox()
+
+        feature_count = observers_layer.featureCount()
+
+        template = FeatureTemplate(fields)
+        writer = BatchedFeatureSink(sink)
+
+        for observer_count, observer_feature in enumerate(observers_layer.getFeatures()):
+            if feedback.isCanceled():
+                break
+
+            observer_point = observer_feature.geometry().asPoint()
+
+            # samples farther than the farthest corner of rasters extent have no elevation
+            distance = farthest_distance_in_extent(observer_point, rasters_extent)
+
+            if 0 < maximum_distance:
+                distance = min(distance, maximum_distance)
+
+            distances = np.arange(math.floor(distance / sampling_distance) + 1) * sampling_distance
+
+            line = self.horizon_line(
+                QgsPoint(observer_point),
+                float(observer_feature.attribute(observers_offset)),
+                azimuths,
+                distances,
+                list_rasters,
+                horizon_type,
+                curvature_corrections,
+                ref_coeff,
+                self.SAMPLES_CHUNK_SIZE,
+            )
+
+            if line is not None:
+                writer.add_feature(
+                    template.feature(
+                        [
+                            horizon_type,
+                            int(observer_feature.attribute(observers_id)),
+                            observer_point.x(),
+                            observer_point.y(),
+                        ],
+                        line,
+                    )
+                )
+
+            feedback.setProgress(((observer_count + 1) / feature_count) * 100)
+
+        writer.flush()
+
+        return {self.OUTPUT_LAYER: dest_id}
+
+    @staticmethod
+    def horizon_line(
+        observer_point: QgsPoint,
+        observer_offset: float,
+        azimuths: np.ndarray,
+        distances: np.ndarray,
+        list_rasters: ListOfRasters,
+        horizon_type: str,
+        curvature_corrections: bool,
+        refraction_coefficient: float,
+        samples_chunk_size: int,
+    ) -> Optional[QgsLineString]:
+        """Horizon line of observer with vertical angles as M, None if it has less than two vertices.
+
+        Rasters are resampled on polar grid of azimuths and distances, every azimuth is no target LoS. Azimuths are
+        processed in chunks so that `samples_chunk_size` samples are not exceeded.
+        """
+        chunk_size = max(1, samples_chunk_size // distances.shape[0])
+
+        vertices: List[List[np.ndarray]] = [[], [], [], []]
+
+        for start in range(0, azimuths.shape[0], chunk_size):
+            xs, ys = polar_coordinates(
+                observer_point.x(), observer_point.y(), azimuths[start : start + chunk_size], distances
+            )
+
+            zs, _ = list_rasters.sample_many(xs.ravel(), ys.ravel())
+
+            _, los_batch = LoSBatch.from_lines_arrays(
+                xs,
+                ys,
+                zs.reshape(xs.shape),
+                observer_offset,
+                curvature_corrections=curvature_corrections,
+                refraction_coefficient=refraction_coefficient,
+                distances=distances,
+            )
+
+            if los_batch is None:
+                continue
+
+            for values, chunk_values in zip(vertices, los_batch.horizon_line_vertices(horizon_type)):
+                values.append(chunk_values)
+
+        if not vertices[0] or sum(values.shape[0] for values in vertices[0]) < 2:
+            return None
+
+        return QgsLineString(*[np.concatenate(values).tolist() for values in vertices])
+
+    def name(self):
+        return "extracthorizonlinesfromdem"
+
+    def displayName(self):
+        return "Extract Horizon Lines from DEM"
+
+    def group(self):
+        return "Horizons"
+
+    def groupId(self):
+        return "horizons"
+
+    def createInstance(self):
+        return ExtractHorizonLinesFromDemAlgorithm()
+
+    def helpUrl(self):
+        return "https://jancaha.github.io/qgis_los_tools/tools/Horizons/tool_extract_horizon_lines_from_dem/"
+
+    def shortHelpString(self):
+        return QgsProcessingUtils.formatHelpMapAsHtml(get_doc_file(__file__), self)
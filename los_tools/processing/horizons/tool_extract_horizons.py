@@ -1,13 +1,13 @@
-from typing import Union
+from typing import List
 
+import numpy as np
 from qgis.core import (
     Qgis,
     QgsCategorizedSymbolRenderer,
-    QgsFeature,
-    QgsFeatureSink,
     QgsField,
     QgsFields,
     QgsMapLayer,
+    QgsPoint,
     QgsProcessing,
     QgsProcessingAlgorithm,
     QgsProcessingException,
@@ -22,11 +22,10 @@ from qgis.core import (
 )
 from qgis.PyQt.QtCore import QMetaType, Qt
 
-from los_tools.classes.classes_los import LoSGlobal, LoSLocal, LoSWithoutTarget
 from los_tools.constants.field_names import FieldNames
 from los_tools.constants.names_constants import NamesConstants
 from los_tools.constants.textlabels import TextLabels
-from los_tools.processing.tools.util_functions import get_los_type
+from los_tools.processing.utils import BatchedFeatureSink, FeatureTemplate, LayerReader, LoSToolsSettings, los_layer_key
 from los_tools.utils import get_doc_file
 
 
@@ -95,7 +94,7 @@ class ExtractHorizonsAlgorithm(QgsProcessingAlgorithm):
 
             return False, msg
 
-        los_type = get_los_type(los_layer, field_names)
+        los_type = LayerReader.los(los_layer).type
 
         if horizon_type == NamesConstants.HORIZON_GLOBAL and los_type == NamesConstants.LOS_LOCAL:
             msg = "Cannot extract global horizon from local LoS."
@@ -144,9 +143,8 @@ class ExtractHorizonsAlgorithm(QgsProcessingAlgorithm):
 
         self.horizon_type = horizon_type
 
-        field_names = los_layer.fields().names()
-
-        los_type = get_los_type(los_layer, field_names)
+        los_reader = LayerReader.los(los_layer)
+        los_type = los_reader.type
 
         fields = QgsFields()
         fields.append(QgsField(FieldNames.HORIZON_TYPE, QMetaType.Type.QString))
@@ -170,46 +168,62 @@ class ExtractHorizonsAlgorithm(QgsProcessingAlgorithm):
 
         feature_count = los_layer.featureCount()
 
-        los_iterator = los_layer.getFeatures()
+        attributes = [FieldNames.ID_OBSERVER, FieldNames.ID_TARGET]
+
+        if los_type == NamesConstants.LOS_NO_TARGET:
+            attributes.append(FieldNames.AZIMUTH)
+
+        template = FeatureTemplate(fields)
+        writer = BatchedFeatureSink(sink)
+
+        feature_number = 0
 
-        for feature_number, los_feature in enumerate(los_iterator):
+        for los_features, los_batch in los_reader.los_batches(
+            attributes,
+            curvature_corrections=curvature_corrections,
+            refraction_coefficient=ref_coeff,
+            parse_cache=LoSToolsSettings.los_parse_cache(los_reader.estimated_los_size()),
+            layer_key=los_layer_key(los_layer),
+        ):
             if feedback.isCanceled():
                 break
 
-            if los_type == NamesConstants.LOS_LOCAL:
-                los = LoSLocal.from_feature(
-                    feature=los_feature,
-                    curvature_corrections=curvature_corrections,
-                    refraction_coefficient=ref_coeff,
-                )
+            global_horizons = los_batch.global_horizon_indices()
 
-            elif los_type == NamesConstants.LOS_GLOBAL:
-                los = LoSGlobal.from_feature(
-                    feature=los_feature,
-                    curvature_corrections=curvature_corrections,
-                    refraction_coefficient=ref_coeff,
-                )
+            for los_index, los_feature in enumerate(los_features):
+                los_slice = los_batch.los_slice(los_index)
 
-            elif los_type == NamesConstants.LOS_NO_TARGET:
-                los = LoSWithoutTarget.from_feature(
-                    feature=los_feature,
-                    curvature_corrections=curvature_corrections,
-                    refraction_coefficient=ref_coeff,
-                )
+                local_horizons = [
+                    los_batch.get_geom_at_index(los_slice.start + i)
+                    for i in np.flatnonzero(los_batch.horizon[los_slice]).tolist()
+                ]
+                global_horizon = los_batch.get_geom_at_index(global_horizons[los_index])
+
+                los_attributes = [
+                    int(los_feature.attribute(FieldNames.ID_OBSERVER)),
+                    int(los_feature.attribute(FieldNames.ID_TARGET)),
+                ]
+
+                if los_type == NamesConstants.LOS_NO_TARGET:
+                    los_attributes.append(los_feature.attribute(FieldNames.AZIMUTH))
+
+                if horizon_type == NamesConstants.HORIZON_LOCAL:
+                    self.save_local_horizons(writer, template, los_attributes, local_horizons)
 
-            if horizon_type == NamesConstants.HORIZON_LOCAL:
-                self.save_local_horizons(sink, fields, los_feature, los, los_type)
+                elif horizon_type == NamesConstants.HORIZON_GLOBAL:
+                    self.save_global_horizon(writer, template, los_attributes, global_horizon)
 
-            elif horizon_type == NamesConstants.HORIZON_GLOBAL:
-                self.save_global_horizon(sink, fields, los_feature, los, los_type)
+                else:
+                    self.save_local_horizons(writer, template, los_attributes, local_horizons)
 
-            else:
-                self.save_local_horizons(sink, fields, los_feature, los, los_type)
+                    self.save_global_horizon(writer, template, los_attributes, global_horizon)
 
-                self.save_global_horizon(sink, fields, los_feature, los, los_type)
+                feature_number += 1
 
             feedback.setProgress((feature_number / feature_count) * 100)
 
+        writer.flush()
+
         return {self.OUTPUT_LAYER: self.dest_id}
 
     def name(self):
@@ -235,63 +249,19 @@ class ExtractHorizonsAlgorithm(QgsProcessingAlgorithm):
 
     def save_local_horizons(
         self,
-        sink: QgsFeatureSink,
-        fields: QgsFields,
-        los_feature: QgsFeature,
-        los: Union[LoSLocal, LoSGlobal, LoSWithoutTarget],
-        los_type: str,
+        writer: BatchedFeatureSink,
+        template: FeatureTemplate,
+        los_attributes: List,
+        horizons: List[QgsPoint],
     ):
-        horizons = los.get_horizons()
-
-        if 0 < len(horizons):
-            for horizon in horizons:
-                f = QgsFeature(fields)
-                f.setGeometry(horizon)
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.HORIZON_TYPE),
-                    str(NamesConstants.HORIZON_LOCAL),
-                )
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.ID_OBSERVER),
-                    int(los_feature.attribute(FieldNames.ID_OBSERVER)),
-                )
-                f.setAttribute(
-                    f.fieldNameIndex(FieldNames.ID_TARGET),
-                    int(los_feature.attribute(FieldNames.ID_TARGET)),
-                )
-
-                if los_type == NamesConstants.LOS_NO_TARGET:
-                    f.setAttribute(
-                        f.fieldNameIndex(FieldNames.AZIMUTH),
-                        los_feature.attribute(FieldNames.AZIMUTH),
-                    )
-
-                sink.addFeature(f)
+        for horizon in horizons:
+            writer.add_feature(template.feature([NamesConstants.HORIZON_LOCAL, *los_attributes], horizon))
 
     def save_global_horizon(
         self,
-        sink: QgsFeatureSink,
-        fields: QgsFields,
-        los_feature: QgsFeature,
-        los: Union[LoSLocal, LoSGlobal, LoSWithoutTarget],
-        los_type: str,
+        writer: BatchedFeatureSink,
+        template: FeatureTemplate,
+        los_attributes: List,
+        horizon: QgsPoint,
     ):
-        f = QgsFeature(fields)
-        f.setGeometry(los.get_global_horizon())
-        f.setAttribute(f.fieldNameIndex(FieldNames.HORIZON_TYPE), NamesConstants.HORIZON_GLOBAL)
-        f.setAttribute(
-            f.fieldNameIndex(FieldNames.ID_OBSERVER),
-            int(los_feature.attribute(FieldNames.ID_OBSERVER)),
-        )
-        f.setAttribute(
-            f.fieldNameIndex(FieldNames.ID_TARGET),
-            int(los_feature.attribute(FieldNames.ID_TARGET)),
-        )
-
-        if los_type == NamesConstants.LOS_NO_TARGET:
-            f.setAttribute(
-                f.fieldNameIndex(FieldNames.AZIMUTH),
-                los_feature.attribute(FieldNames.AZIMUTH),
-            )
-
-        sink.addFeature(f)
+        writer.add_feature(template.feature([NamesConstants.HORIZON_GLOBAL, *los_attributes], horizon))
@@ -5,6 +5,7 @@ from qgis.PyQt.QtGui import QIcon
 from los_tools.constants.plugin import PluginConstants
 from los_tools.constants.settings import Settings
 from los_tools.processing.analyse_los.tool_analyse_los import AnalyseLosAlgorithm
+from los_tools.processing.analyse_los.tool_analyse_observers import AnalyseObserversAlgorithm
 from los_tools.processing.analyse_los.tool_extract_los_visibility_parts import ExtractLoSVisibilityPartsAlgorithm
 from los_tools.processing.analyse_los.tool_extract_los_visibility_polygons import ExtractLoSVisibilityPolygonsAlgorithm
 from los_tools.processing.analyse_los.tool_extract_points_los import ExtractPointsLoSAlgorithm
@@ -19,6 +20,7 @@ from los_tools.processing.create_points.tool_points_by_azimuths import CreatePoi
 from los_tools.processing.create_points.tool_points_in_direction import CreatePointsInDirectionAlgorithm
 from los_tools.processing.horizons.tool_extract_horizon_lines import ExtractHorizonLinesAlgorithm
 from los_tools.processing.horizons.tool_extract_horizon_lines_by_distances import ExtractHorizonLinesByDistanceAlgorithm
+from los_tools.processing.horizons.tool_extract_horizon_lines_from_dem import ExtractHorizonLinesFromDemAlgorithm
 from los_tools.processing.horizons.tool_extract_horizons import ExtractHorizonsAlgorithm
 from los_tools.processing.parameter_settings.tool_angle_at_distance_for_size import ObjectDetectionAngleAlgorithm
 from los_tools.processing.parameter_settings.tool_distances_for_sizes import ObjectDistancesAlgorithm
@@ -29,6 +31,8 @@ from los_tools.processing.tools.tool_replace_raster_values_by_constant import (
     ReplaceRasterValuesByConstantValueAlgorithm,
 )
 from los_tools.processing.tools.tool_replace_raster_values_by_field import ReplaceRasterValuesByFieldValuesAlgorithm
+from los_tools.processing.viewshed.tool_cumulative_viewshed import CumulativeViewshedAlgorithm
+from los_tools.processing.viewshed.tool_viewshed import ViewshedAlgorithm
 from los_tools.utils import get_icon_path, get_plugin_version
 
 
@@ -52,6 +56,37 @@ class LoSToolsProvider(QgsProcessingProvider):
             )
         )
 
+        ProcessingConfig.addSetting(
+            Setting(
+                PluginConstants.provider_name_short,
+                Settings.name_profile_cache_directory,
+                "Directory of cache of sampled elevation profiles used by tools that create LoS "
+                "(cache is not used if empty)",
+                "",
+                valuetype=Setting.FOLDER,
+            )
+        )
+
+        ProcessingConfig.addSetting(
+            Setting(
+                PluginConstants.provider_name_short,
+                Settings.name_profile_cache_size,
+                "Maximal size of cache of sampled elevation profiles (MB)",
+                1024,
+                valuetype=Setting.INT,
+            )
+        )
+
+        ProcessingConfig.addSetting(
+            Setting(
+                PluginConstants.provider_name_short,
+                Settings.name_parse_cache_size,
+                "Memory for LoS parsed by analysis tools and shared among them (MB, 0 disables sharing)",
+                512,
+                valuetype=Setting.INT,
+            )
+        )
+
         ProcessingConfig.readSettings()
 
         return super().load()
@@ -80,6 +115,10 @@ class LoSToolsProvider(QgsProcessingProvider):
         self.addAlgorithm(ObjectDetectionAngleAlgorithm())
         self.addAlgorithm(CreatePointsInAzimuthsAlgorithm())
         self.addAlgorithm(ExtractHorizonLinesByDistanceAlgorithm())
+        self.addAlgorithm(AnalyseObserversAlgorithm())
+        self.addAlgorithm(ViewshedAlgorithm())
+        self.addAlgorithm(CumulativeViewshedAlgorithm())
+        self.addAlgorithm(ExtractHorizonLinesFromDemAlgorithm())
 
     def id(self):
         return PluginConstants.provider_id
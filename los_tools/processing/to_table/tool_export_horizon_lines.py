@@ -1,6 +1,5 @@
 from qgis.core import (
     Qgis,
-    QgsFeature,
     QgsFeatureSink,
     QgsFeatureSource,
     QgsField,
@@ -18,6 +17,7 @@ from qgis.core import (
 from qgis.PyQt.QtCore import QMetaType
 
 from los_tools.constants.field_names import FieldNames
+from los_tools.processing.utils import BatchedFeatureSink, FeatureTemplate, LayerReader
 from los_tools.utils import get_doc_file
 
 
@@ -84,7 +84,16 @@ class ExportHorizonLinesAlgorithm(QgsProcessingAlgorithm):
         if sink is None:
             raise QgsProcessingException(self.invalidSinkError(parameters, self.OUTPUT_LAYER))
 
-        iterator = input_horizon_lines_layer.getFeatures()
+        horizon_lines_reader = LayerReader(input_horizon_lines_layer)
+
+        iterator = horizon_lines_reader.features(
+            horizon_lines_reader.request(
+                [FieldNames.ID_OBSERVER, FieldNames.HORIZON_TYPE, FieldNames.OBSERVER_X, FieldNames.OBSERVER_Y]
+            )
+        )
+
+        template = FeatureTemplate(fields)
+        writer = BatchedFeatureSink(sink)
 
         for cnt, horizon_line_feature in enumerate(iterator):
             if feedback.isCanceled():
@@ -100,27 +109,25 @@ class ExportHorizonLinesAlgorithm(QgsProcessingAlgorithm):
 
             line_geometry = horizon_line_feature.geometry()
 
-            i = 0
             for v in line_geometry.vertices():
                 horizon_point = QgsPointXY(v.x(), v.y())
 
-                feature = QgsFeature(fields)
-
-                feature.setAttribute(FieldNames.ID_OBSERVER, observer_id)
-                feature.setAttribute(FieldNames.HORIZON_TYPE, horizon_type)
-                feature.setAttribute(FieldNames.ANGLE, observer_point.azimuth(horizon_point))
-                feature.setAttribute(FieldNames.VIEWING_ANGLE, v.m())
-                feature.setAttribute(
-                    FieldNames.CSV_HORIZON_DISTANCE,
-                    observer_point.distance(v.x(), v.y()),
+                writer.add_feature(
+                    template.feature(
+                        [
+                            observer_id,
+                            horizon_type,
+                            observer_point.azimuth(horizon_point),
+                            v.m(),
+                            observer_point.distance(v.x(), v.y()),
+                        ]
+                    )
                 )
 
-                i += 1
-
-                sink.addFeature(feature)
-
             feedback.setProgress((cnt / feature_count) * 100)
 
+        writer.flush()
+
         return {self.OUTPUT: path_sink}
 
     def name(self):
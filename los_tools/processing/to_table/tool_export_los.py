@@ -1,3 +1,6 @@
+from typing import Dict, List
+
+import numpy as np
 from qgis.core import (
     Qgis,
     QgsFeature,
@@ -10,15 +13,23 @@ from qgis.core import (
     QgsProcessingParameterBoolean,
     QgsProcessingParameterFeatureSink,
     QgsProcessingParameterFeatureSource,
+    QgsProcessingParameterFileDestination,
     QgsProcessingParameterNumber,
     QgsProcessingUtils,
+    QgsVariantUtils,
 )
 from qgis.PyQt.QtCore import QMetaType
 
-from los_tools.classes.classes_los import LoSGlobal, LoSLocal, LoSWithoutTarget
+from los_tools.classes.columnar_table import (
+    COLUMNAR_FILE_FILTER,
+    ColumnarTableWriter,
+    columnar_format,
+    pyarrow_available,
+)
+from los_tools.classes.los_batch import LoSBatch
 from los_tools.constants.field_names import FieldNames
 from los_tools.constants.names_constants import NamesConstants
-from los_tools.processing.tools.util_functions import get_los_type
+from los_tools.processing.utils import BatchedFeatureSink, FeatureTemplate, LayerReader
 from los_tools.utils import get_doc_file
 
 
@@ -27,6 +38,13 @@ class ExportLoSAlgorithm(QgsProcessingAlgorithm):
     OUTPUT = "OutputFile"
     CURVATURE_CORRECTIONS = "CurvatureCorrections"
     REFRACTION_COEFFICIENT = "RefractionCoefficient"
+    OUTPUT_COLUMNAR = "OutputColumnarFile"
+
+    COLUMN_TYPES = {
+        QMetaType.Type.Int: np.int64,
+        QMetaType.Type.Double: np.float64,
+        QMetaType.Type.Bool: np.bool_,
+    }
 
     def initAlgorithm(self, configuration=None):
         self.addParameter(
@@ -50,7 +68,17 @@ class ExportLoSAlgorithm(QgsProcessingAlgorithm):
             )
         )
 
-        self.addParameter(QgsProcessingParameterFeatureSink(self.OUTPUT, "Output file"))
+        self.addParameter(QgsProcessingParameterFeatureSink(self.OUTPUT, "Output file", optional=True))
+
+        self.addParameter(
+            QgsProcessingParameterFileDestination(
+                self.OUTPUT_COLUMNAR,
+                "Output columnar file (Parquet or Arrow IPC)",
+                fileFilter=COLUMNAR_FILE_FILTER,
+                optional=True,
+                createByDefault=False,
+            )
+        )
 
     def checkParameterValues(self, parameters, context):
         input_los_layer = self.parameterAsSource(parameters, self.INPUT_LOS_LAYER, context)
@@ -77,9 +105,13 @@ class ExportLoSAlgorithm(QgsProcessingAlgorithm):
         ref_coeff = self.parameterAsDouble(parameters, self.REFRACTION_COEFFICIENT, context)
 
         feature_count = input_los_layer.featureCount()
-        iterator = input_los_layer.getFeatures()
 
-        los_type = get_los_type(input_los_layer, input_los_layer.fields().names())
+        los_reader = LayerReader.los(input_los_layer)
+        los_type = los_reader.type
+
+        iterator = los_reader.features(
+            los_reader.request([FieldNames.ID_OBSERVER, FieldNames.ID_TARGET] + LoSBatch.feature_attributes(los_type))
+        )
 
         fields = QgsFields()
 
@@ -115,105 +147,150 @@ class ExportLoSAlgorithm(QgsProcessingAlgorithm):
             input_los_layer.sourceCrs(),
         )
 
-        if sink is None:
-            raise QgsProcessingException(self.invalidSinkError(parameters, self.OUTPUT))
-
-        los_feature: QgsFeature
-        for cnt, los_feature in enumerate(iterator):
-            if feedback.isCanceled():
-                break
-
-            los_id = los_feature.id()
-            observer_id = los_feature.attribute(FieldNames.ID_OBSERVER)
-            observer_offset = los_feature.attribute(FieldNames.OBSERVER_OFFSET)
-
-            if los_type == NamesConstants.LOS_LOCAL:
-                target_id = los_feature.attribute(FieldNames.ID_TARGET)
-                target_offset = los_feature.attribute(FieldNames.TARGET_OFFSET)
-
-                los = LoSLocal.from_feature(
-                    feature=los_feature,
-                    curvature_corrections=curvature_corrections,
-                    refraction_coefficient=ref_coeff,
-                )
-
-            elif los_type == NamesConstants.LOS_GLOBAL:
-                target_id = los_feature.attribute(FieldNames.ID_TARGET)
-                target_offset = los_feature.attribute(FieldNames.TARGET_OFFSET)
-                target_x = los_feature.attribute(FieldNames.TARGET_X)
-                target_y = los_feature.attribute(FieldNames.TARGET_Y)
-
-                los = LoSGlobal.from_feature(
-                    feature=los_feature,
-                    curvature_corrections=curvature_corrections,
-                    refraction_coefficient=ref_coeff,
-                )
-
-            # elif los_type == NamesConstants.LOS_NO_TARGET:
-            else:
-                los = LoSWithoutTarget.from_feature(
-                    feature=los_feature,
-                    curvature_corrections=curvature_corrections,
-                    refraction_coefficient=ref_coeff,
-                )
-
-            for i, _ in enumerate(los.points):
-                feature = QgsFeature(fields)
-
-                if los_type == NamesConstants.LOS_LOCAL:
-                    feature.setAttributes(
-                        [
-                            los_id,
-                            observer_id,
-                            observer_offset,
-                            los.points[i].distance,
-                            los.points[i].z,
-                            los.visible[i],
-                            los.horizon[i],
-                            target_id,
-                            target_offset,
-                        ]
-                    )
-
-                elif los_type == NamesConstants.LOS_GLOBAL:
-                    is_target = i == los.target_index
-
-                    feature.setAttributes(
-                        [
-                            los_id,
-                            observer_id,
-                            observer_offset,
-                            los.points[i].distance,
-                            los.points[i].z,
-                            los.visible[i],
-                            los.horizon[i],
-                            target_id,
-                            target_offset,
-                            target_x,
-                            target_y,
-                            is_target,
-                        ]
-                    )
-
-                # elif los_type == NamesConstants.LOS_NO_TARGET:
-                else:
-                    feature.setAttributes(
-                        [
-                            los_id,
-                            observer_id,
-                            observer_offset,
-                            los.points[i].distance,
-                            los.points[i].z,
-                            los.visible[i],
-                            los.horizon[i],
-                        ]
-                    )
-
-                sink.addFeature(feature)
-
-            feedback.setProgress((cnt / feature_count) * 100)
-
-        return {self.OUTPUT: path_sink}
+        columnar_path = self.parameterAsFileOutput(parameters, self.OUTPUT_COLUMNAR, context)
+
+        if columnar_path and not pyarrow_available():
+            msg = "Python package `pyarrow` is not available, columnar output cannot be written."
+
+            if sink is None:
+                raise QgsProcessingException(msg)
+
+            feedback.pushWarning(f"{msg} Table is written only into `Output file`.")
+
+            columnar_path = None
+
+        if sink is None and not columnar_path:
+            raise QgsProcessingException("At least one of the outputs has to be set.")
+
+        if columnar_path and columnar_format(columnar_path) is None:
+            raise QgsProcessingException(f"Unsupported format of columnar output file `{columnar_path}`.")
+
+        if sink is not None:
+            template = FeatureTemplate(fields)
+            writer = BatchedFeatureSink(sink)
+
+        columnar_writer = None
+
+        if columnar_path:
+            columnar_writer = ColumnarTableWriter(
+                columnar_path, [(field.name(), self.COLUMN_TYPES[field.type()]) for field in fields]
+            )
+
+        cnt = 0
+
+        try:
+            for los_features, los_batch in LoSBatch.batches_from_features(
+                iterator,
+                los_type,
+                curvature_corrections=curvature_corrections,
+                refraction_coefficient=ref_coeff,
+            ):
+                if feedback.isCanceled():
+                    break
+
+                los_attributes = [self.los_attributes(los_feature, los_type) for los_feature in los_features]
+
+                if sink is not None:
+                    self.save_points(writer, template, los_batch, los_attributes)
+
+                if columnar_writer is not None:
+                    columnar_writer.write(self.points_columns(fields, los_batch, los_attributes))
+
+                cnt += len(los_features)
+
+                feedback.setProgress((cnt / feature_count) * 100)
+
+        finally:
+            if columnar_writer is not None:
+                columnar_writer.close()
+
+        if sink is not None:
+            writer.flush()
+
+        return {self.OUTPUT: path_sink, self.OUTPUT_COLUMNAR: columnar_path or None}
+
+    @staticmethod
+    def los_attributes(los_feature: QgsFeature, los_type: str) -> List:
+        """Attributes of LoS repeated on every point, in order of fields without the points attributes."""
+        attributes = [
+            los_feature.id(),
+            los_feature.attribute(FieldNames.ID_OBSERVER),
+            los_feature.attribute(FieldNames.OBSERVER_OFFSET),
+        ]
+
+        if los_type == NamesConstants.LOS_LOCAL:
+            attributes += [
+                los_feature.attribute(FieldNames.ID_TARGET),
+                los_feature.attribute(FieldNames.TARGET_OFFSET),
+            ]
+
+        elif los_type == NamesConstants.LOS_GLOBAL:
+            attributes += [
+                los_feature.attribute(FieldNames.ID_TARGET),
+                los_feature.attribute(FieldNames.TARGET_OFFSET),
+                los_feature.attribute(FieldNames.TARGET_X),
+                los_feature.attribute(FieldNames.TARGET_Y),
+            ]
+
+        return attributes
+
+    @staticmethod
+    def save_points(
+        writer: BatchedFeatureSink, template: FeatureTemplate, los_batch: LoSBatch, los_attributes: List[List]
+    ) -> None:
+        distances = los_batch.distance.tolist()
+        elevations = los_batch.z.tolist()
+        visible = los_batch.visible.tolist()
+        horizons = los_batch.horizon.tolist()
+        target_indices = los_batch.target_indices.tolist()
+
+        for los_index, attributes in enumerate(los_attributes):
+            los_slice = los_batch.los_slice(los_index)
+
+            for i in range(los_slice.start, los_slice.stop):
+                point_attributes = [
+                    *attributes[:3],
+                    distances[i],
+                    elevations[i],
+                    visible[i],
+                    horizons[i],
+                    *attributes[3:],
+                ]
+
+                if los_batch.los_type == NamesConstants.LOS_GLOBAL:
+                    point_attributes.append(i == target_indices[los_index])
+
+                writer.add_feature(template.feature(point_attributes))
+
+    @staticmethod
+    def points_columns(fields: QgsFields, los_batch: LoSBatch, los_attributes: List[List]) -> Dict[str, np.ndarray]:
+        """Columns of the points table, attributes of LoS are repeated for all its points and NULLs are masked."""
+        counts = np.diff(los_batch.offsets)
+
+        columns = {
+            FieldNames.CSV_OBSERVER_DISTANCE: los_batch.distance,
+            FieldNames.CSV_ELEVATION: los_batch.z,
+            FieldNames.CSV_VISIBLE: los_batch.visible,
+            FieldNames.CSV_HORIZON: los_batch.horizon,
+        }
+
+        if los_batch.los_type == NamesConstants.LOS_GLOBAL:
+            columns[FieldNames.CSV_TARGET] = np.arange(los_batch.distance.shape[0]) == np.repeat(
+                los_batch.target_indices, counts
+            )
+
+        los_fields = [field for field in fields if field.name() not in columns]
+
+        for field, values in zip(los_fields, zip(*los_attributes)):
+            mask = np.array([QgsVariantUtils.isNull(value) for value in values], dtype=bool)
+            data = np.array(
+                [0 if is_null else value for value, is_null in zip(values, mask.tolist())],
+                dtype=ExportLoSAlgorithm.COLUMN_TYPES[field.type()],
+            )
+
+            columns[field.name()] = np.ma.array(data, mask=mask).repeat(counts)
+
+        return columns
 
     def name(self):
         return "exportlos"
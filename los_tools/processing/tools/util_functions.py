@@ -1,25 +1,45 @@
 import math
+import os
 import re
-from typing import List, Optional, Union
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar, Union
 
 import numpy as np
 from qgis.core import (
     Qgis,
+    QgsCoordinateReferenceSystem,
     QgsGeometry,
     QgsLineString,
-    QgsMessageLog,
     QgsPoint,
     QgsPointXY,
     QgsPolygon,
     QgsProcessingException,
+    QgsRasterBlock,
     QgsRasterDataProvider,
+    QgsRasterFileWriter,
+    QgsRasterLayer,
     QgsRectangle,
-    QgsVectorLayer,
-    QgsVertexId,
     QgsVertexIterator,
 )
+from qgis.PyQt.QtCore import QByteArray
 
-from los_tools.constants.field_names import FieldNames
+from los_tools.classes.los_arrays import linestring_z_wkb_to_array
+from los_tools.classes.raster_tiles import RasterGrid
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+RASTER_DATA_TYPES = {
+    np.dtype(np.uint8): Qgis.DataType.Byte,
+    np.dtype(np.uint16): Qgis.DataType.UInt16,
+    np.dtype(np.int16): Qgis.DataType.Int16,
+    np.dtype(np.uint32): Qgis.DataType.UInt32,
+    np.dtype(np.int32): Qgis.DataType.Int32,
+    np.dtype(np.float32): Qgis.DataType.Float32,
+    np.dtype(np.float64): Qgis.DataType.Float64,
+}
 
 
 def line_to_polygon(line: QgsLineString, observer_point: QgsPointXY, angle_width: float) -> QgsPolygon:
@@ -40,42 +60,6 @@ def line_to_polygon(line: QgsLineString, observer_point: QgsPointXY, angle_width
     return poly
 
 
-def get_los_type(los_layer: QgsVectorLayer, field_names: List[str]) -> str:
-    index = field_names.index(FieldNames.LOS_TYPE)
-    los_types = los_layer.uniqueValues(index)
-
-    if len(los_types) != 1:
-        types_txt = ", ".join(los_types)
-        msg = (
-            f"More than one type of LoS present in layer. Cannot process such layer. "
-            f"Existing LoS types are {types_txt}."
-        )
-
-        QgsMessageLog.logMessage(msg, "los_tools", Qgis.Critical)
-
-        raise QgsProcessingException(msg)
-
-    return list(los_types)[0]
-
-
-def get_horizon_lines_type(horizon_lines_layer: QgsVectorLayer) -> str:
-    index = horizon_lines_layer.fields().names().index(FieldNames.HORIZON_TYPE)
-    horizon_lines_types = horizon_lines_layer.uniqueValues(index)
-
-    if len(horizon_lines_types) != 1:
-        types_txt = ", ".join(horizon_lines_types)
-        msg = (
-            "More than one type of horizon lines present in layer. Cannot process such layer. "
-            f"Existing horizon lines types are {types_txt}."
-        )
-
-        QgsMessageLog.logMessage(msg, "los_tools", Qgis.Critical)
-
-        raise QgsProcessingException(msg)
-
-    return list(horizon_lines_types)[0]
-
-
 def wkt_to_array_points(wkt: str) -> List[List[float]]:
     reg = re.compile(r"(LineString\s?Z |LINESTRING |MULTILINESTRING |MultiLineString\s?Z )", re.IGNORECASE)
 
@@ -125,6 +109,16 @@ def line_geometry_to_coords(geom: QgsGeometry) -> List[List[float]]:
     return coords
 
 
+def line_geometry_to_array(geom: QgsGeometry) -> np.ndarray:
+    """Coordinates of line geometry as array of shape (n, 3). LineString Z is decoded directly from WKB."""
+    coords = linestring_z_wkb_to_array(bytes(geom.asWkb()))
+
+    if coords is None:
+        coords = np.array(line_geometry_to_coords(geom), dtype=float).reshape(-1, 3)
+
+    return coords
+
+
 def segmentize_los_line(line: QgsGeometry, segment_length: float) -> QgsLineString:
     if not isinstance(line, QgsGeometry):
         raise TypeError("`line` should be `QgsGeometry`.")
@@ -139,24 +133,96 @@ def segmentize_los_line(line: QgsGeometry, segment_length: float) -> QgsLineStri
 
 
 def segmentize_line(line: QgsGeometry, segment_length: float) -> QgsLineString:
-    ideal_length_parts = math.ceil(line.length() / segment_length)
-    ideal_length_addition = ideal_length_parts * segment_length - line.length()
+    is_3d = line.constGet().is3D()
 
-    line_extented = QgsLineString([x for x in line.vertices()])
-    line_extented.extend(0, ideal_length_addition * 0.9)
+    vertices = np.array([[v.x(), v.y(), v.z()] if is_3d else [v.x(), v.y()] for v in line.vertices()], dtype=float)
 
-    line_geom = QgsGeometry(line_extented)
+    coords = segmentize_line_coordinates(vertices, segment_length)
 
-    line_geom = line_geom.densifyByDistance(distance=np.nextafter(float(segment_length), np.inf))
+    return QgsLineString(*coords.T.tolist())
 
-    line_res = QgsLineString([x for x in line_geom.vertices()])
 
-    line_res.moveVertex(
-        QgsVertexId(0, 0, line_geom.constGet().vertexCount() - 1),
-        line.vertexAt(line.constGet().vertexCount() - 1),
-    )
+def segmentize_line_coordinates(vertices: np.ndarray, segment_length: float) -> np.ndarray:
+    """Coordinates of vertices of line (array of shape (vertices, dims)) segmentized by `segment_length`."""
+    coords, _ = segmentize_lines_coordinates(np.asarray(vertices, dtype=float)[np.newaxis], segment_length)
+    return coords
+
+
+def extend_line_end(previous: np.ndarray, last: np.ndarray, distance: np.ndarray) -> np.ndarray:
+    """XY of last vertices (n, 2) moved by `distance` in direction of last segments, same as `QgsLineString.extend`."""
+    dx = last[:, 0] - previous[:, 0]
+    dy = last[:, 1] - previous[:, 1]
+
+    current_length = np.sqrt(dx * dx + dy * dy)
+    new_length = current_length + distance
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return previous + (last - previous) / current_length[:, np.newaxis] * new_length[:, np.newaxis]
+
+
+def segmentize_lines_coordinates(vertices: np.ndarray, segment_length: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Vectorized `segmentize_line` for lines with the same number of vertices, array of shape (lines, vertices, dims).
+
+    The last segment of each line is extended so that the densified vertices are spread evenly, the last vertex
+    is then moved back to its original position. Only X and Y are used for lengths, other dimensions are interpolated.
+    Returns coordinates of vertices of all lines and offsets of the lines in them.
+    """
+    vertices = np.array(vertices, dtype=float)
+
+    lines_count, vertices_count, _ = vertices.shape
+
+    last_vertices = vertices[:, -1].copy()
+
+    dxy = vertices[:, 1:, :2] - vertices[:, :-1, :2]
+    segment_lengths = np.sqrt(dxy[..., 0] * dxy[..., 0] + dxy[..., 1] * dxy[..., 1])
+
+    # summed segment by segment, same as `QgsLineString.length`
+    line_lengths = segment_lengths[:, 0].copy()
+    for i in range(1, vertices_count - 1):
+        line_lengths += segment_lengths[:, i]
+
+    extension = (np.ceil(line_lengths / segment_length) * segment_length - line_lengths) * 0.9
+
+    extend = extension > 0
+
+    vertices[extend, -1, :2] = extend_line_end(vertices[extend, -2, :2], vertices[extend, -1, :2], extension[extend])
+
+    dx = vertices[:, -1, 0] - vertices[:, -2, 0]
+    dy = vertices[:, -1, 1] - vertices[:, -2, 1]
+    segment_lengths[:, -1] = np.sqrt(dx * dx + dy * dy)
+
+    # number of vertices added into each segment, same as `QgsGeometry.densifyByDistance`
+    with np.errstate(invalid="ignore"):
+        extra_vertices = np.floor(segment_lengths / np.nextafter(float(segment_length), np.inf))
+
+    extra_vertices[~np.isfinite(extra_vertices)] = 0
+    extra_vertices = extra_vertices.astype(np.int64)
+
+    # every segment contributes its start and added vertices, every line its last vertex
+    segment_counts = (extra_vertices + 1).ravel()
 
-    return line_res
+    line_counts = (extra_vertices + 1).sum(axis=1) + 1
+    offsets = np.zeros(lines_count + 1, dtype=np.int64)
+    np.cumsum(line_counts, out=offsets[1:])
+
+    segment_positions = np.cumsum(segment_counts) - segment_counts
+    segment_positions += np.repeat(np.arange(lines_count), vertices_count - 1)
+
+    segment_ids = np.repeat(np.arange(segment_counts.shape[0]), segment_counts)
+
+    steps = np.arange(segment_ids.shape[0]) - np.repeat(np.cumsum(segment_counts) - segment_counts, segment_counts)
+
+    delta = (1.0 / (extra_vertices.ravel() + 1))[segment_ids] * steps
+
+    starts = vertices[:, :-1].reshape(-1, vertices.shape[2])[segment_ids]
+    ends = vertices[:, 1:].reshape(-1, vertices.shape[2])[segment_ids]
+
+    coords = np.empty((offsets[-1], vertices.shape[2]))
+
+    coords[segment_positions[segment_ids] + steps] = starts + delta[:, np.newaxis] * (ends - starts)
+    coords[offsets[1:] - 1] = last_vertices
+
+    return coords, offsets
 
 
 def get_diagonal_size(raster: QgsRasterDataProvider) -> float:
@@ -164,6 +230,62 @@ def get_diagonal_size(raster: QgsRasterDataProvider) -> float:
     return math.sqrt(math.pow(extent.width(), 2) + math.pow(extent.height(), 2))
 
 
+def farthest_distance_in_extent(point: QgsPointXY, extent: QgsRectangle) -> float:
+    """Distance from point to the farthest corner of extent."""
+    return max(
+        math.hypot(x - point.x(), y - point.y())
+        for x in [extent.xMinimum(), extent.xMaximum()]
+        for y in [extent.yMinimum(), extent.yMaximum()]
+    )
+
+
+def finest_cell_size(rasters: Sequence[QgsRasterLayer]) -> float:
+    """The smallest cell size of rasters."""
+    return min(raster.extent().width() / raster.width() for raster in rasters)
+
+
+def create_raster(
+    path: str, grid: RasterGrid, crs: QgsCoordinateReferenceSystem, dtype: np.dtype
+) -> QgsRasterDataProvider:
+    """Creates single band raster file covering the grid, format is given by extension of the path (GeoTIFF if unknown).
+
+    Returned provider is editable, blocks are written by `write_raster_block`.
+    """
+    writer = QgsRasterFileWriter(path)
+    writer.setOutputProviderKey("gdal")
+    writer.setOutputFormat(QgsRasterFileWriter.driverForExtension(os.path.splitext(path)[1]) or "GTiff")
+
+    extent = QgsRectangle(
+        grid.x_min,
+        grid.y_max - grid.height * grid.y_res,
+        grid.x_min + grid.width * grid.x_res,
+        grid.y_max,
+    )
+
+    provider = writer.createOneBandRaster(RASTER_DATA_TYPES[np.dtype(dtype)], grid.width, grid.height, extent, crs)
+
+    if provider is None or not provider.isValid():
+        raise QgsProcessingException(f"Could not create raster `{path}`.")
+
+    if grid.no_data is not None:
+        provider.setNoDataValue(1, grid.no_data)
+
+    provider.setEditable(True)
+
+    return provider
+
+
+def write_raster_block(provider: QgsRasterDataProvider, values: np.ndarray, row: int = 0, col: int = 0) -> None:
+    """Writes 2D array into the first band of raster with its top left cell at given row and column."""
+    height, width = values.shape
+
+    block = QgsRasterBlock(RASTER_DATA_TYPES[values.dtype], width, height)
+    block.setData(QByteArray(np.ascontiguousarray(values).tobytes()))
+
+    if not provider.writeBlock(block, 1, col, row):
+        raise QgsProcessingException("Could not write values to raster.")
+
+
 # taken from plugin rasterinterpolation https://plugins.qgis.org/plugins/rasterinterpolation/
 def bilinear_interpolated_value(
     raster_dp: Optional[QgsRasterDataProvider], point: Union[QgsPoint, QgsPointXY]
@@ -229,3 +351,40 @@ def get_max_decimal_numbers(values: List[Union[int, float]]) -> int:
 
 def round_all_values(values: List[Union[int, float]], number_of_digits: int) -> List[Union[int, float]]:
     return [round(x, number_of_digits) for x in values]
+
+
+def chunked(items: Iterable[T], chunk_size: int) -> Iterator[List[T]]:
+    """Splits items into lists of `chunk_size` items (the last one can be shorter), items are consumed lazily."""
+    iterator = iter(items)
+
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+
+        if not chunk:
+            break
+
+        yield chunk
+
+
+def ordered_parallel_map(function: Callable[[T], R], items: Iterable[T], workers: int = 1) -> Iterator[R]:
+    """Applies function to items in a pool of worker threads and yields results in the order of items.
+
+    Items are consumed lazily and only a limited number of them is processed at once, so results can be written as
+    they come. With a single worker the function is called directly in the current thread.
+    """
+    if workers <= 1:
+        for item in items:
+            yield function(item)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+
+        for item in items:
+            pending.append(executor.submit(function, item))
+
+            if 2 * workers <= len(pending):
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
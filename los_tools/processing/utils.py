@@ -1,9 +1,302 @@
+import os
+from functools import partial
+from itertools import groupby
+from typing import Any, Hashable, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
 from processing.core.ProcessingConfig import ProcessingConfig
+from qgis.core import (
+    Qgis,
+    QgsAbstractGeometry,
+    QgsFeature,
+    QgsFeatureRequest,
+    QgsFeatureSink,
+    QgsFeatureSource,
+    QgsFields,
+    QgsGeometry,
+    QgsMessageLog,
+    QgsProcessingException,
+    QgsProviderRegistry,
+    QgsVectorLayer,
+)
 
+from los_tools.classes.los_arrays import LOS_POINT_DTYPE
+from los_tools.classes.los_batch import LoSBatch
+from los_tools.classes.los_parse_cache import DEFAULT_PARSE_CACHE_MEMORY, LoSParseCache, shared_parse_cache
+from los_tools.classes.profile_cache import ProfileCache
+from los_tools.constants.field_names import FieldNames
 from los_tools.constants.settings import Settings
 
+SINK_BATCH_SIZE = 1000
+
 
 class LoSToolsSettings:
     @staticmethod
     def sample_Z_using_plugin() -> bool:
         return ProcessingConfig.getSetting(Settings.name_sample_z)
+
+    @staticmethod
+    def profile_cache() -> Optional[ProfileCache]:
+        """Cache of sampled elevation profiles, None if the cache directory is not set."""
+        directory = ProcessingConfig.getSetting(Settings.name_profile_cache_directory)
+
+        if not directory:
+            return None
+
+        size = ProcessingConfig.getSetting(Settings.name_profile_cache_size) or 0
+
+        return ProfileCache(directory, int(size) * 1024 * 1024)
+
+    @staticmethod
+    def los_parse_cache(estimated_size: int = 0) -> Optional[LoSParseCache]:
+        """Cache of parsed LoS shared by analysis algorithms, None if sharing is disabled.
+
+        None is returned also if LoS of `estimated_size` (bytes, see `LayerReader.estimated_los_size`) do not fit into
+        the cache, a sequential pass over them would only evict every cached LoS before it is read again.
+        """
+        size = ProcessingConfig.getSetting(Settings.name_parse_cache_size)
+
+        memory_budget = DEFAULT_PARSE_CACHE_MEMORY if size is None else int(size) * 1024 * 1024
+
+        if memory_budget <= 0 or memory_budget < estimated_size:
+            return None
+
+        return shared_parse_cache(memory_budget)
+
+
+def los_layer_key(layer: Optional[QgsVectorLayer]) -> Optional[Tuple]:
+    """Identification of LoS layer and state of its data for parse cache, None if LoS of the layer cannot be cached.
+
+    Only layers stored in local files without unsaved edits are cached. Size and modification time of the file (and
+    of its write-ahead log) identify the state of data, as layers do not provide any modification counter.
+    """
+    if layer is None or layer.isModified():
+        return None
+
+    path = QgsProviderRegistry.instance().decodeUri(layer.providerType(), layer.source()).get("path", "")
+
+    if not path or not os.path.isfile(path):
+        return None
+
+    key = [layer.id(), layer.source(), layer.featureCount()]
+
+    for file_path in (path, f"{path}-wal"):
+        if os.path.isfile(file_path):
+            stat = os.stat(file_path)
+            key += [stat.st_size, stat.st_mtime_ns]
+
+    return tuple(key)
+
+
+class FeatureTemplate:
+    """Creates features with given fields, attributes are passed as list ordered as `field_names`.
+
+    Field indices are resolved once, if `field_names` are not provided, attributes are expected in order of `fields`.
+    """
+
+    def __init__(self, fields: QgsFields, field_names: Optional[Sequence[str]] = None):
+        self.fields = QgsFields(fields)
+        self.size = self.fields.count()
+
+        if field_names is None:
+            field_names = self.fields.names()
+
+        self.indices = [self.fields.lookupField(name) for name in field_names]
+
+        missing_fields = [name for name, index in zip(field_names, self.indices) if index < 0]
+
+        if missing_fields:
+            raise QgsProcessingException(f"Fields `{', '.join(missing_fields)}` do not exist.")
+
+        self._ordered = self.indices == list(range(self.size))
+
+    def attributes(self, values: Sequence) -> List:
+        """Values placed at positions of fields, fields not in template are left empty."""
+        if self._ordered:
+            return list(values)
+
+        attributes = [None] * self.size
+
+        for index, value in zip(self.indices, values):
+            attributes[index] = value
+
+        return attributes
+
+    def feature(
+        self, values: Sequence, geometry: Optional[Union[QgsGeometry, QgsAbstractGeometry]] = None
+    ) -> QgsFeature:
+        feature = QgsFeature(self.fields)
+        feature.setAttributes(self.attributes(values))
+
+        if geometry is not None:
+            feature.setGeometry(geometry)
+
+        return feature
+
+
+class BatchedFeatureSink:
+    """Buffers features and adds them to sink in batches with `FastInsert` flag. `flush()` must be called at the end."""
+
+    def __init__(self, sink: QgsFeatureSink, batch_size: int = SINK_BATCH_SIZE):
+        self.sink = sink
+        self.batch_size = max(1, batch_size)
+        self._buffer: List[QgsFeature] = []
+
+    def add_feature(self, feature: QgsFeature) -> None:
+        self._buffer.append(feature)
+
+        if self.batch_size <= len(self._buffer):
+            self.flush()
+
+    def add_features(self, features: Iterable[QgsFeature]) -> None:
+        for feature in features:
+            self.add_feature(feature)
+
+    def flush(self) -> None:
+        if not self._buffer:
+            return
+
+        if not self.sink.addFeatures(self._buffer, QgsFeatureSink.Flag.FastInsert):
+            raise QgsProcessingException(f"Could not write features into sink: {self.sink.lastError()}")
+
+        self._buffer = []
+
+
+class LayerReader:
+    """Reads features of layer (or feature source) in one pass, fetching only the needed attributes and geometry.
+
+    If `type_field` is set, all features must have the same value of it (e.g. LoS type). The type is taken from the
+    first feature and every read feature is checked against it, so the layer does not have to be scanned in advance.
+    `type` is None for empty layer.
+    """
+
+    def __init__(self, source: QgsFeatureSource, type_field: Optional[str] = None, description: str = "features"):
+        self.source = source
+        self.type_field = type_field
+        self.description = description
+        self.type = self._first_type() if type_field else None
+
+    @classmethod
+    def los(cls, source: QgsFeatureSource) -> "LayerReader":
+        """Reader of LoS layer that checks that all LoS are of the same type."""
+        return cls(source, FieldNames.LOS_TYPE, "LoS")
+
+    def _first_type(self) -> Optional[str]:
+        request = self.request([], geometry=False)
+        request.setLimit(1)
+
+        for feature in self.source.getFeatures(request):
+            return feature.attribute(self.type_field)
+
+        return None
+
+    def request(self, attributes: Optional[Iterable[str]] = None, geometry: bool = True) -> QgsFeatureRequest:
+        """Request fetching given attributes (all if None) together with type field, without geometry if not needed."""
+        request = QgsFeatureRequest()
+
+        if attributes is not None:
+            attributes = list(attributes)
+
+            if self.type_field and self.type_field not in attributes:
+                attributes.append(self.type_field)
+
+            request.setSubsetOfAttributes(attributes, self.source.fields())
+
+        if not geometry:
+            request.setFlags(QgsFeatureRequest.Flag.NoGeometry)
+
+        return request
+
+    def estimated_los_size(self, sample_size: int = 100) -> int:
+        """Estimated size (bytes) of all LoS of the source parsed into `LoSBatch`, from the first `sample_size` LoS."""
+        request = self.request([])
+        request.setLimit(sample_size)
+
+        vertices = [
+            feature.geometry().constGet().nCoordinates() if feature.hasGeometry() else 0
+            for feature in self.features(request)
+        ]
+
+        if not vertices:
+            return 0
+
+        return int(sum(vertices) / len(vertices) * self.source.featureCount() * LOS_POINT_DTYPE.itemsize)
+
+    def los_batches(
+        self,
+        attributes: Iterable[str],
+        curvature_corrections: bool = True,
+        refraction_coefficient: float = 0.13,
+        parse_cache: Optional[LoSParseCache] = None,
+        layer_key: Optional[Hashable] = None,
+        chunk_size: int = LoSBatch.DEFAULT_CHUNK_SIZE,
+    ) -> Iterator[Tuple[List[QgsFeature], LoSBatch]]:
+        """Chunks of LoS features with given attributes (and attributes needed by `LoSBatch`) and their `LoSBatch`.
+
+        If all LoS of the layer are in the parse cache, features are read without geometry and only LoS evicted from
+        the cache meanwhile are fetched again with geometry. Features do not have geometry in such case.
+        """
+        attributes = list(attributes) + LoSBatch.feature_attributes(self.type)
+
+        cached = False
+
+        if parse_cache is not None and layer_key is not None:
+            group = LoSBatch.parse_cache_group(layer_key, curvature_corrections, refraction_coefficient)
+            cached = 0 < self.source.featureCount() <= parse_cache.count(group)
+
+        yield from LoSBatch.batches_from_features(
+            self.features(self.request(attributes, geometry=not cached)),
+            self.type,
+            curvature_corrections=curvature_corrections,
+            refraction_coefficient=refraction_coefficient,
+            chunk_size=chunk_size,
+            parse_cache=parse_cache,
+            layer_key=layer_key,
+            fetch_features=partial(self.features_by_ids, attributes=attributes) if cached else None,
+        )
+
+    def features_by_ids(self, fids: List[int], attributes: Optional[Iterable[str]] = None) -> Iterator[QgsFeature]:
+        """Features with given ids (in any order) with geometry and given attributes (all if None)."""
+        request = self.request(attributes)
+        request.setFilterFids(fids)
+
+        return self.features(request)
+
+    def features_by_observer(self, attributes: Iterable[str]) -> Iterator[Tuple[Any, List[QgsFeature]]]:
+        """Features with given attributes, read in one pass ordered by observer id and azimuth, grouped by observer."""
+        request = self.request(list(attributes) + [FieldNames.ID_OBSERVER, FieldNames.AZIMUTH])
+        request.setOrderBy(
+            QgsFeatureRequest.OrderBy(
+                [
+                    QgsFeatureRequest.OrderByClause(FieldNames.ID_OBSERVER, ascending=True),
+                    QgsFeatureRequest.OrderByClause(FieldNames.AZIMUTH, ascending=True),
+                ]
+            )
+        )
+
+        for id_observer, features in groupby(
+            self.features(request), key=lambda feature: feature.attribute(FieldNames.ID_OBSERVER)
+        ):
+            yield id_observer, list(features)
+
+    def features(self, request: Optional[QgsFeatureRequest] = None) -> Iterator[QgsFeature]:
+        """Features of the source, raises `QgsProcessingException` when feature of different type is read."""
+        features = self.source.getFeatures(request if request is not None else QgsFeatureRequest())
+
+        if not self.type_field:
+            yield from features
+            return
+
+        for feature in features:
+            feature_type = feature.attribute(self.type_field)
+
+            if feature_type != self.type:
+                msg = (
+                    f"More than one type of {self.description} present in layer. Cannot process such layer. "
+                    f"Existing {self.description} types are {self.type}, {feature_type}."
+                )
+
+                QgsMessageLog.logMessage(msg, "los_tools", Qgis.Critical)
+
+                raise QgsProcessingException(msg)
+
+            yield feature
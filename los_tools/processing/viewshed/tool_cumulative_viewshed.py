@@ -0,0 +1,356 @@
+import math
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+from qgis.core import (
+    QgsPoint,
+    QgsPointXY,
+    QgsProcessing,
+    QgsProcessingAlgorithm,
+    QgsProcessingException,
+    QgsProcessingFeedback,
+    QgsProcessingParameterBoolean,
+    QgsProcessingParameterFeatureSource,
+    QgsProcessingParameterField,
+    QgsProcessingParameterMultipleLayers,
+    QgsProcessingParameterNumber,
+    QgsProcessingParameterRasterDestination,
+    QgsProcessingUtils,
+    QgsRectangle,
+)
+
+from los_tools.classes.list_raster import ListOfRasters
+from los_tools.classes.raster_tiles import RasterGrid
+from los_tools.classes.viewshed import RadialViewshed, TiledAccumulator, window_offset
+from los_tools.processing.tools.util_functions import (
+    create_raster,
+    farthest_distance_in_extent,
+    finest_cell_size,
+    ordered_parallel_map,
+    write_raster_block,
+)
+from los_tools.utils import get_doc_file
+
+
+class CumulativeViewshedAlgorithm(QgsProcessingAlgorithm):
+    DEM_RASTERS = "DemRasters"
+    OBSERVER_POINTS_LAYER = "ObserverPoints"
+    OBSERVER_OFFSET_FIELD = "ObserverOffset"
+    TARGET_OFFSET = "TargetOffset"
+    MAXIMUM_DISTANCE = "MaximumDistance"
+    CELL_SIZE = "CellSize"
+    CURVATURE_CORRECTIONS = "CurvatureCorrections"
+    REFRACTION_COEFFICIENT = "RefractionCoefficient"
+    WORKERS = "Workers"
+    OUTPUT_RASTER = "OutputRaster"
+
+    def initAlgorithm(self, configuration=None):
+        self.addParameter(
+            QgsProcessingParameterMultipleLayers(self.DEM_RASTERS, "Raster DEM Layers", QgsProcessing.TypeRaster)
+        )
+
+        self.addParameter(
+            QgsProcessingParameterFeatureSource(
+                self.OBSERVER_POINTS_LAYER,
+                "Observers point layer",
+                [QgsProcessing.TypeVectorPoint],
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterField(
+                self.OBSERVER_OFFSET_FIELD,
+                "Observer offset field",
+                parentLayerParameterName=self.OBSERVER_POINTS_LAYER,
+                type=QgsProcessingParameterField.Numeric,
+                optional=False,
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.TARGET_OFFSET,
+                "Target offset",
+                QgsProcessingParameterNumber.Double,
+                defaultValue=0.0,
+                minValue=0.0,
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.MAXIMUM_DISTANCE,
+                "Maximal distance of viewshed (0 means up to extent of rasters)",
+                QgsProcessingParameterNumber.Double,
+                defaultValue=0.0,
+                minValue=0.0,
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.CELL_SIZE,
+                "Cell size of output raster (0 means cell size of the most detailed raster)",
+                QgsProcessingParameterNumber.Double,
+                defaultValue=0.0,
+                minValue=0.0,
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterBoolean(
+                self.CURVATURE_CORRECTIONS,
+                "Use curvature corrections?",
+                defaultValue=True,
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.REFRACTION_COEFFICIENT,
+                "Refraction coefficient value",
+                type=QgsProcessingParameterNumber.Double,
+                defaultValue=0.13,
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.WORKERS,
+                "Number of workers",
+                QgsProcessingParameterNumber.Integer,
+                defaultValue=1,
+                minValue=1,
+            )
+        )
+
+        self.addParameter(QgsProcessingParameterRasterDestination(self.OUTPUT_RASTER, "Output cumulative viewshed"))
+
+    def checkParameterValues(self, parameters, context):
+        observers_layer = self.parameterAsSource(parameters, self.OBSERVER_POINTS_LAYER, context)
+
+        if observers_layer.sourceCrs().isGeographic():
+            msg = "`Observers point layer` crs must be projected. " "Right now it is `geographic`."
+
+            return False, msg
+
+        rasters = self.parameterAsLayerList(parameters, self.DEM_RASTERS, context)
+
+        correct, msg = ListOfRasters.validate_bands(rasters)
+
+        if not correct:
+            return correct, msg
+
+        correct, msg = ListOfRasters.validate_crs(rasters, crs=observers_layer.sourceCrs())
+
+        if not correct:
+            return correct, msg
+
+        correct, msg = ListOfRasters.validate_ordering(rasters)
+
+        if not correct:
+            return correct, msg
+
+        correct, msg = ListOfRasters.validate_square_cell_size(rasters)
+
+        if not correct:
+            return correct, msg
+
+        return super().checkParameterValues(parameters, context)
+
+    def processAlgorithm(self, parameters, context, feedback: QgsProcessingFeedback):
+        observers_layer = self.parameterAsSource(parameters, self.OBSERVER_POINTS_LAYER, context)
+
+        if observers_layer is None:
+            raise QgsProcessingException(self.invalidSourceError(parameters, self.OBSERVER_POINTS_LAYER))
+
+        observers_offset = self.parameterAsString(parameters, self.OBSERVER_OFFSET_FIELD, context)
+
+        rasters = self.parameterAsLayerList(parameters, self.DEM_RASTERS, context)
+        list_rasters = ListOfRasters(rasters)
+
+        target_offset = self.parameterAsDouble(parameters, self.TARGET_OFFSET, context)
+        maximum_distance = self.parameterAsDouble(parameters, self.MAXIMUM_DISTANCE, context)
+        cell_size = self.parameterAsDouble(parameters, self.CELL_SIZE, context)
+
+        curvature_corrections = self.parameterAsBool(parameters, self.CURVATURE_CORRECTIONS, context)
+        ref_coeff = self.parameterAsDouble(parameters, self.REFRACTION_COEFFICIENT, context)
+
+        workers = self.parameterAsInt(parameters, self.WORKERS, context)
+
+        output_raster = self.parameterAsOutputLayer(parameters, self.OUTPUT_RASTER, context)
+
+        rasters_extent = list_rasters.extent_polygon().boundingBox()
+
+        if cell_size <= 0:
+            cell_size = finest_cell_size(list_rasters.rasters)
+
+        observers: List[Tuple[QgsPointXY, float, float]] = []
+
+        for observer_feature in observers_layer.getFeatures():
+            observer_point = observer_feature.geometry().asPoint()
+
+            # cells farther than the farthest corner of rasters extent have no elevation
+            radius = farthest_distance_in_extent(observer_point, rasters_extent)
+
+            if 0 < maximum_distance:
+                radius = min(radius, maximum_distance)
+
+            observers.append((observer_point, float(observer_feature.attribute(observers_offset)), radius))
+
+        if not observers:
+            raise QgsProcessingException("There are no observers.")
+
+        grid = self.output_grid(observers, rasters_extent, cell_size)
+
+        feedback.pushInfo(f"Computing cumulative viewshed on grid of {grid.width} x {grid.height} cells.")
+
+        # number of observers always fits into the data type
+        dtype = np.promote_types(np.min_scalar_type(len(observers)), np.uint8)
+
+        # every worker owns a part of observers and its own copies of raster layers, visibility of each observer is
+        # added to the shared accumulator by blocks of rows, so only the output tiles are kept for the whole run
+        groups = [observers[i::workers] for i in range(workers)]
+        groups_rasters = [list_rasters] + [ListOfRasters([raster.clone() for raster in rasters]) for _ in groups[1:]]
+
+        accumulator = TiledAccumulator(grid.width, grid.height, dtype)
+
+        lock = threading.Lock()
+        processed = [0]
+
+        def accumulate(group_index: int) -> None:
+            for observer_point, observer_offset, radius in groups[group_index]:
+                if feedback.isCanceled():
+                    break
+
+                viewshed = self.observer_viewshed(
+                    groups_rasters[group_index],
+                    observer_point,
+                    observer_offset,
+                    target_offset,
+                    radius,
+                    cell_size,
+                    curvature_corrections,
+                    ref_coeff,
+                    rasters_extent,
+                )
+
+                if viewshed is not None:
+                    row, col = window_offset(viewshed.grid, grid)
+
+                    for block_row, angle_differences in viewshed.angle_differences_blocks():
+                        visible = (angle_differences > 0).astype(np.uint8)
+
+                        with lock:
+                            accumulator.add(visible, row + block_row, col)
+
+                with lock:
+                    processed[0] += 1
+                    feedback.setProgress((processed[0] / len(observers)) * 100)
+
+        for _ in ordered_parallel_map(accumulate, range(workers), workers):
+            pass
+
+        provider = create_raster(output_raster, grid, list_rasters.crs(), dtype)
+
+        for row, col, values in accumulator.tiles():
+            write_raster_block(provider, values, row, col)
+
+        provider.setEditable(False)
+
+        return {self.OUTPUT_RASTER: output_raster}
+
+    @staticmethod
+    def output_grid(
+        observers: List[Tuple[QgsPointXY, float, float]], rasters_extent: QgsRectangle, cell_size: float
+    ) -> RasterGrid:
+        """Grid covering viewsheds of all observers within rasters extent, aligned to the corner of rasters extent."""
+        extent = QgsRectangle()
+
+        for observer_point, _, radius in observers:
+            extent.combineExtentWith(
+                QgsRectangle(
+                    observer_point.x() - radius,
+                    observer_point.y() - radius,
+                    observer_point.x() + radius,
+                    observer_point.y() + radius,
+                )
+            )
+
+        extent = extent.intersect(rasters_extent)
+
+        col_start = math.floor((extent.xMinimum() - rasters_extent.xMinimum()) / cell_size)
+        col_end = math.ceil((extent.xMaximum() - rasters_extent.xMinimum()) / cell_size)
+        row_start = math.floor((rasters_extent.yMaximum() - extent.yMaximum()) / cell_size)
+        row_end = math.ceil((rasters_extent.yMaximum() - extent.yMinimum()) / cell_size)
+
+        return RasterGrid(
+            x_min=rasters_extent.xMinimum() + col_start * cell_size,
+            y_max=rasters_extent.yMaximum() - row_start * cell_size,
+            x_res=cell_size,
+            y_res=cell_size,
+            width=max(1, col_end - col_start),
+            height=max(1, row_end - row_start),
+        )
+
+    @staticmethod
+    def observer_viewshed(
+        list_rasters: ListOfRasters,
+        observer_point: QgsPointXY,
+        observer_offset: float,
+        target_offset: float,
+        radius: float,
+        cell_size: float,
+        curvature_corrections: bool,
+        refraction_coefficient: float,
+        rasters_extent: QgsRectangle,
+    ) -> Optional[RadialViewshed]:
+        """Computed viewshed of observer clipped to rasters extent, None if there is no elevation at observer's
+        position."""
+        observer_z = list_rasters.extract_interpolated_value(QgsPoint(observer_point))
+
+        if observer_z is None:
+            return None
+
+        viewshed = RadialViewshed(
+            observer_point.x(),
+            observer_point.y(),
+            observer_z + observer_offset,
+            radius,
+            cell_size,
+            target_offset=target_offset,
+            use_curvature_corrections=curvature_corrections,
+            refraction_coefficient=refraction_coefficient,
+            clip_extent=(
+                rasters_extent.xMinimum(),
+                rasters_extent.yMinimum(),
+                rasters_extent.xMaximum(),
+                rasters_extent.yMaximum(),
+            ),
+        )
+
+        viewshed.compute(lambda xs, ys: list_rasters.sample_many(xs, ys)[0])
+
+        return viewshed
+
+    def name(self):
+        return "cumulativeviewshed"
+
+    def displayName(self):
+        return "Cumulative Viewshed"
+
+    def group(self):
+        return "Viewshed"
+
+    def groupId(self):
+        return "viewshed"
+
+    def createInstance(self):
+        return CumulativeViewshedAlgorithm()
+
+    def helpUrl(self):
+        return "https://jancaha.github.io/qgis_los_tools/tools/Viewshed/tool_cumulative_viewshed/"
+
+    def shortHelpString(self):
+        return QgsProcessingUtils.formatHelpMapAsHtml(get_doc_file(__file__), self)
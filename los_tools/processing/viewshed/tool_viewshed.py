@@ -0,0 +1,273 @@
+import numpy as np
+from qgis.core import (
+    QgsPoint,
+    QgsProcessing,
+    QgsProcessingAlgorithm,
+    QgsProcessingException,
+    QgsProcessingFeedback,
+    QgsProcessingParameterBoolean,
+    QgsProcessingParameterMultipleLayers,
+    QgsProcessingParameterNumber,
+    QgsProcessingParameterPoint,
+    QgsProcessingParameterRasterDestination,
+    QgsProcessingUtils,
+)
+
+from los_tools.classes.list_raster import ListOfRasters
+from los_tools.classes.viewshed import RadialViewshed, visibility_from_angle_differences
+from los_tools.processing.tools.util_functions import (
+    create_raster,
+    farthest_distance_in_extent,
+    finest_cell_size,
+    write_raster_block,
+)
+from los_tools.utils import get_doc_file
+
+
+class ViewshedAlgorithm(QgsProcessingAlgorithm):
+    DEM_RASTERS = "DemRasters"
+    OBSERVER_POINT = "ObserverPoint"
+    OBSERVER_OFFSET = "ObserverOffset"
+    TARGET_OFFSET = "TargetOffset"
+    MAXIMUM_DISTANCE = "MaximumDistance"
+    CELL_SIZE = "CellSize"
+    CURVATURE_CORRECTIONS = "CurvatureCorrections"
+    REFRACTION_COEFFICIENT = "RefractionCoefficient"
+    OUTPUT_VIEWSHED = "OutputViewshed"
+    OUTPUT_ANGLE_DIFFERENCE = "OutputAngleDifference"
+
+    VIEWSHED_NO_DATA = 255
+    ANGLE_DIFFERENCE_NO_DATA = -9999
+
+    def initAlgorithm(self, configuration=None):
+        self.addParameter(
+            QgsProcessingParameterMultipleLayers(self.DEM_RASTERS, "Raster DEM Layers", QgsProcessing.TypeRaster)
+        )
+
+        self.addParameter(QgsProcessingParameterPoint(self.OBSERVER_POINT, "Observer point"))
+
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.OBSERVER_OFFSET,
+                "Observer offset",
+                QgsProcessingParameterNumber.Double,
+                defaultValue=1.6,
+                minValue=0.0,
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.TARGET_OFFSET,
+                "Target offset",
+                QgsProcessingParameterNumber.Double,
+                defaultValue=0.0,
+                minValue=0.0,
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.MAXIMUM_DISTANCE,
+                "Maximal distance of viewshed (0 means up to extent of rasters)",
+                QgsProcessingParameterNumber.Double,
+                defaultValue=0.0,
+                minValue=0.0,
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.CELL_SIZE,
+                "Cell size of output rasters (0 means cell size of the most detailed raster)",
+                QgsProcessingParameterNumber.Double,
+                defaultValue=0.0,
+                minValue=0.0,
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterBoolean(
+                self.CURVATURE_CORRECTIONS,
+                "Use curvature corrections?",
+                defaultValue=True,
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.REFRACTION_COEFFICIENT,
+                "Refraction coefficient value",
+                type=QgsProcessingParameterNumber.Double,
+                defaultValue=0.13,
+            )
+        )
+
+        self.addParameter(QgsProcessingParameterRasterDestination(self.OUTPUT_VIEWSHED, "Output viewshed"))
+
+        self.addParameter(
+            QgsProcessingParameterRasterDestination(
+                self.OUTPUT_ANGLE_DIFFERENCE,
+                "Output angle difference",
+                optional=True,
+                createByDefault=False,
+            )
+        )
+
+    def checkParameterValues(self, parameters, context):
+        rasters = self.parameterAsLayerList(parameters, self.DEM_RASTERS, context)
+
+        if not rasters:
+            return False, "At least one raster DEM layer has to be provided."
+
+        if rasters[0].crs().isGeographic():
+            msg = "`Raster DEM Layers` crs must be projected. Right now it is `geographic`."
+
+            return False, msg
+
+        correct, msg = ListOfRasters.validate_bands(rasters)
+
+        if not correct:
+            return correct, msg
+
+        correct, msg = ListOfRasters.validate_crs(rasters)
+
+        if not correct:
+            return correct, msg
+
+        correct, msg = ListOfRasters.validate_ordering(rasters)
+
+        if not correct:
+            return correct, msg
+
+        correct, msg = ListOfRasters.validate_square_cell_size(rasters)
+
+        if not correct:
+            return correct, msg
+
+        return super().checkParameterValues(parameters, context)
+
+    def processAlgorithm(self, parameters, context, feedback: QgsProcessingFeedback):
+        list_rasters = ListOfRasters(self.parameterAsLayerList(parameters, self.DEM_RASTERS, context))
+
+        crs = list_rasters.crs()
+
+        observer_point = self.parameterAsPoint(parameters, self.OBSERVER_POINT, context, crs)
+
+        observer_offset = self.parameterAsDouble(parameters, self.OBSERVER_OFFSET, context)
+        target_offset = self.parameterAsDouble(parameters, self.TARGET_OFFSET, context)
+        maximum_distance = self.parameterAsDouble(parameters, self.MAXIMUM_DISTANCE, context)
+        cell_size = self.parameterAsDouble(parameters, self.CELL_SIZE, context)
+
+        curvature_corrections = self.parameterAsBool(parameters, self.CURVATURE_CORRECTIONS, context)
+        ref_coeff = self.parameterAsDouble(parameters, self.REFRACTION_COEFFICIENT, context)
+
+        output_viewshed = self.parameterAsOutputLayer(parameters, self.OUTPUT_VIEWSHED, context)
+        output_angle_difference = self.parameterAsOutputLayer(parameters, self.OUTPUT_ANGLE_DIFFERENCE, context)
+
+        observer_z = list_rasters.extract_interpolated_value(QgsPoint(observer_point))
+
+        if observer_z is None:
+            raise QgsProcessingException("Observer point does not have elevation value in any of the rasters.")
+
+        rasters_extent = list_rasters.extent_polygon().boundingBox()
+
+        # cells farther than the farthest corner of rasters extent have no elevation
+        radius = farthest_distance_in_extent(observer_point, rasters_extent)
+
+        if 0 < maximum_distance:
+            radius = min(radius, maximum_distance)
+
+        if cell_size <= 0:
+            cell_size = finest_cell_size(list_rasters.rasters)
+
+        viewshed = RadialViewshed(
+            observer_point.x(),
+            observer_point.y(),
+            observer_z + observer_offset,
+            radius,
+            cell_size,
+            target_offset=target_offset,
+            use_curvature_corrections=curvature_corrections,
+            refraction_coefficient=ref_coeff,
+            clip_extent=(
+                rasters_extent.xMinimum(),
+                rasters_extent.yMinimum(),
+                rasters_extent.xMaximum(),
+                rasters_extent.yMaximum(),
+            ),
+        )
+
+        feedback.pushInfo(f"Computing viewshed on grid of {viewshed.grid.width} x {viewshed.grid.height} cells.")
+
+        def sample(xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+            return list_rasters.sample_many(xs, ys)[0]
+
+        chunk_size = viewshed.rays_chunk_size()
+
+        for start in range(0, viewshed.number_of_rays, chunk_size):
+            if feedback.isCanceled():
+                break
+
+            viewshed.process_rays(sample, start, start + chunk_size)
+
+            feedback.setProgress((min(start + chunk_size, viewshed.number_of_rays) / viewshed.number_of_rays) * 100)
+
+        viewshed_provider = create_raster(
+            output_viewshed, viewshed.grid._replace(no_data=self.VIEWSHED_NO_DATA), crs, np.uint8
+        )
+
+        angle_difference_provider = None
+
+        if output_angle_difference:
+            angle_difference_provider = create_raster(
+                output_angle_difference,
+                viewshed.grid._replace(no_data=self.ANGLE_DIFFERENCE_NO_DATA),
+                crs,
+                np.float32,
+            )
+
+        for row, angle_differences in viewshed.angle_differences_blocks():
+            write_raster_block(
+                viewshed_provider,
+                visibility_from_angle_differences(angle_differences, self.VIEWSHED_NO_DATA),
+                row,
+            )
+
+            if angle_difference_provider is not None:
+                write_raster_block(
+                    angle_difference_provider,
+                    np.nan_to_num(angle_differences, nan=self.ANGLE_DIFFERENCE_NO_DATA).astype(np.float32),
+                    row,
+                )
+
+        viewshed_provider.setEditable(False)
+
+        results = {self.OUTPUT_VIEWSHED: output_viewshed, self.OUTPUT_ANGLE_DIFFERENCE: None}
+
+        if angle_difference_provider is not None:
+            angle_difference_provider.setEditable(False)
+            results[self.OUTPUT_ANGLE_DIFFERENCE] = output_angle_difference
+
+        return results
+
+    def name(self):
+        return "viewshed"
+
+    def displayName(self):
+        return "Viewshed"
+
+    def group(self):
+        return "Viewshed"
+
+    def groupId(self):
+        return "viewshed"
+
+    def createInstance(self):
+        return ViewshedAlgorithm()
+
+    def helpUrl(self):
+        return "https://jancaha.github.io/qgis_los_tools/tools/Viewshed/tool_viewshed/"
+
+    def shortHelpString(self):
+        return QgsProcessingUtils.formatHelpMapAsHtml(get_doc_file(__file__), self)
@@ -0,0 +1,54 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from los_tools.classes.columnar_table import ColumnarTableWriter, columnar_format
+
+pa = pytest.importorskip("pyarrow")
+
+
+def test_columnar_format() -> None:
+    assert columnar_format("table.parquet") == "parquet"
+    assert columnar_format("table.ARROW") == "arrow"
+    assert columnar_format("table.feather") == "arrow"
+    assert columnar_format("table.csv") is None
+
+    with pytest.raises(ValueError, match="Unsupported columnar file"):
+        ColumnarTableWriter("table.csv", [("a", np.int64)])
+
+
+@pytest.mark.parametrize("extension", ["parquet", "arrow"])
+def test_write(tmp_path: Path, extension: str) -> None:
+    path = str(tmp_path / f"table.{extension}")
+
+    writer = ColumnarTableWriter(path, [("id", np.int64), ("value", np.float64), ("flag", np.bool_)])
+
+    writer.write(
+        {
+            "id": np.ma.array([1, 0, 3], mask=[False, True, False]),
+            "value": np.array([0.5, 1.5, 2.5]),
+            "flag": np.array([True, False, True]),
+        }
+    )
+    writer.write({"id": np.array([], dtype=np.int64), "value": np.array([]), "flag": np.array([], dtype=bool)})
+    writer.write({"id": np.array([4]), "value": np.array([3.5]), "flag": np.array([False])})
+    writer.close()
+
+    assert writer.rows == 4
+
+    if extension == "parquet":
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(path)
+
+        assert parquet_file.num_row_groups == 2
+
+        table = parquet_file.read()
+    else:
+        table = pa.ipc.open_file(path).read_all()
+
+    assert table.column_names == ["id", "value", "flag"]
+    assert table.column("id").to_pylist() == [1, None, 3, 4]
+    assert table.column("value").to_pylist() == [0.5, 1.5, 2.5, 3.5]
+    assert table.column("flag").to_pylist() == [True, False, True, False]
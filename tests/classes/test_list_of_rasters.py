@@ -1,9 +1,12 @@
+import os
 import tempfile
 
+import numpy as np
 import pytest
 from qgis.core import (
     QgsCoordinateReferenceSystem,
     QgsPoint,
+    QgsPointXY,
     QgsProject,
     QgsRasterDataProvider,
     QgsRasterLayer,
@@ -11,7 +14,11 @@ from qgis.core import (
 )
 
 from los_tools.classes.list_raster import ListOfRasters
+from los_tools.classes.profile_cache import ProfileCache
+from los_tools.classes.raster_memmap import MemoryMappedRaster
+from los_tools.classes.raster_tiles import CachedRaster
 from los_tools.constants.plugin import PluginConstants
+from los_tools.processing.tools.util_functions import bilinear_interpolated_value
 
 
 @pytest.fixture(autouse=True)
@@ -70,6 +77,106 @@ def test_extract_interpolated_value(
     assert list_rasters.extract_interpolated_value(point_3) is None
 
 
+def test_extract_interpolated_value_tile_cache(
+    raster_small: QgsRasterLayer,
+    raster_large: QgsRasterLayer,
+):
+    list_rasters = ListOfRasters(
+        [raster_small, raster_large], tile_cache_memory=1024 * 1024, tile_size=64, use_memory_map=False
+    )
+
+    points = [QgsPoint(-336332.2 + i * 7.3, -1189104.8 + i * 3.1) for i in range(100)]
+
+    for point in points:
+        expected = None
+        for raster_dp in list_rasters.rasters_dp:
+            expected = bilinear_interpolated_value(raster_dp, point)
+            if expected is not None:
+                break
+
+        assert list_rasters.extract_interpolated_value(point) == expected
+
+    assert 0 < len(list_rasters._tile_cache)
+    assert list_rasters._tile_cache.memory_used <= 1024 * 1024
+
+
+def test_extract_interpolated_value_memory_map(
+    raster_small: QgsRasterLayer,
+    raster_large: QgsRasterLayer,
+):
+    list_rasters = ListOfRasters([raster_small, raster_large])
+    list_rasters_provider = ListOfRasters([raster_small, raster_large], use_memory_map=False)
+
+    # test rasters are uncompressed GeoTIFFs with contiguous strips
+    assert all(isinstance(sampler, MemoryMappedRaster) for sampler in list_rasters.raster_samplers)
+    assert all(isinstance(sampler, CachedRaster) for sampler in list_rasters_provider.raster_samplers)
+
+    xs = np.linspace(-337500, -334000, 200)
+    ys = np.linspace(-1189500, -1187500, 200)
+
+    values, sources = list_rasters.sample_many(xs, ys)
+    values_provider, sources_provider = list_rasters_provider.sample_many(xs, ys)
+
+    assert values.tolist() == pytest.approx(values_provider.tolist(), nan_ok=True)
+    assert sources.tolist() == sources_provider.tolist()
+
+
+def test_sample_many(
+    raster_small: QgsRasterLayer,
+    raster_large: QgsRasterLayer,
+):
+    list_rasters = ListOfRasters([raster_small, raster_large])
+
+    xs = np.array([-336332.2, -337045.6, -334597.8840])
+    ys = np.array([-1189104.8, -1188775.2, -1187659.5597])
+
+    values, sources = list_rasters.sample_many(xs, ys)
+
+    assert values[0] == 1007.409252288644
+    assert values[1] == 1076.6832007948944
+    assert np.isnan(values[2])
+
+    for i, (x, y) in enumerate(zip(xs, ys)):
+        name = list_rasters.sampling_from_raster_at_point(QgsPointXY(x, y), list_rasters.crs())
+
+        if name is None:
+            assert sources[i] == -1
+        else:
+            assert list_rasters.rasters[sources[i]].name() == name
+
+    line = list_rasters.add_z_values([QgsPoint(x, y) for x, y in zip(xs, ys)])
+
+    assert line.numPoints() == 2
+    assert line.zAt(1) == 1076.6832007948944
+
+
+def test_sample_profiles_cache(
+    raster_small: QgsRasterLayer,
+    raster_large: QgsRasterLayer,
+):
+    xs = np.array([-336332.2, -337045.6, -334597.8840])
+    ys = np.array([-1189104.8, -1188775.2, -1187659.5597])
+
+    with tempfile.TemporaryDirectory() as directory:
+        profile_cache = ProfileCache(directory)
+
+        list_rasters = ListOfRasters([raster_small, raster_large], profile_cache=profile_cache)
+
+        values = list_rasters.sample_profiles(xs, ys)
+
+        np.testing.assert_array_equal(values, list_rasters.sample_many(xs, ys)[0])
+        assert len(os.listdir(directory)) == 1
+
+        # second list of the same rasters reads values from cache
+        list_rasters = ListOfRasters([raster_small, raster_large], profile_cache=profile_cache)
+        list_rasters.sample_many = None
+
+        np.testing.assert_array_equal(list_rasters.sample_profiles(xs, ys), values)
+        assert list_rasters.add_z_values_to_arrays(xs, ys).numPoints() == 2
+
+        assert ListOfRasters([raster_small], profile_cache=profile_cache).fingerprint() != list_rasters.fingerprint()
+
+
 def test_validate_crs(
     raster_small: QgsRasterLayer,
     raster_large: QgsRasterLayer,
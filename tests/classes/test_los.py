@@ -1,7 +1,12 @@
+import numpy as np
 import pytest
 from qgis.core import QgsFeature, QgsVectorLayer
 
 from los_tools.classes.classes_los import LoSGlobal, LoSLocal, LoSWithoutTarget
+from los_tools.classes.los_profiles import LoSProfiles, LoSProfilesWriter
+from los_tools.constants.field_names import FieldNames
+from los_tools.processing.tools.util_functions import line_geometry_to_array
+from tests.utils import result_filename
 
 
 def test_los_creation(los_local: QgsVectorLayer) -> None:
@@ -125,3 +130,66 @@ def test_notarget_los(notarget_los_feature: QgsFeature) -> None:
 
     assert notarget_los._get_global_horizon_index() == 9
     assert notarget_los.get_max_local_horizon_angle() == pytest.approx(49.394, rel=1e-2)
+
+
+def test_notarget_los_from_another(notarget_los_feature: QgsFeature) -> None:
+    notarget_los = LoSWithoutTarget.from_feature(notarget_los_feature)
+
+    limited_los = LoSWithoutTarget.from_another(notarget_los, distance_limit=6.5)
+
+    assert len(limited_los.points) == 7
+    assert np.shares_memory(limited_los.data, notarget_los.data)
+    assert list(limited_los.horizon) == list(notarget_los.horizon)[:7]
+    assert limited_los.visible[4] is False
+    assert limited_los.points[-1].distance == pytest.approx(notarget_los.points[6].distance)
+    assert limited_los._get_global_horizon_index() == 6
+
+
+def test_los_from_profile(
+    local_los_feature: QgsFeature, global_los_feature: QgsFeature, notarget_los_feature: QgsFeature
+) -> None:
+    path = result_filename("los_profiles.npz")
+
+    points = line_geometry_to_array(local_los_feature.geometry())
+
+    writer = LoSProfilesWriter(path, "local")
+    writer.add_line(points[:, 0], points[:, 1], points[:, 2], id_observer=1, id_target=1, observer_offset=1)
+    writer.close()
+
+    profile = LoSProfiles(path)[0]
+
+    for los_class, feature in [
+        (LoSLocal, local_los_feature),
+        (LoSGlobal, global_los_feature),
+        (LoSWithoutTarget, notarget_los_feature),
+    ]:
+        los = los_class.from_feature(feature)
+        los_profile = los_class.from_profile(
+            profile._replace(
+                observer_offset=los.observer_offset,
+                target_offset=los.target_offset,
+                target_x=feature.attribute(FieldNames.TARGET_X) if los_class is LoSGlobal else np.nan,
+                target_y=feature.attribute(FieldNames.TARGET_Y) if los_class is LoSGlobal else np.nan,
+            )
+        )
+
+        np.testing.assert_allclose(los_profile.data["distance"], los.data["distance"], atol=1e-9)
+        assert list(los_profile.visible) == list(los.visible)
+        assert list(los_profile.horizon) == list(los.horizon)
+        assert los_profile.target_index == los.target_index
+
+
+def test_notarget_los_global_horizons_at_distances(notarget_los_feature: QgsFeature) -> None:
+    notarget_los = LoSWithoutTarget.from_feature(notarget_los_feature)
+
+    distances = [2.5, 6.5, 20]
+
+    horizons = notarget_los.get_global_horizons_at_distances(distances)
+
+    assert len(horizons) == len(distances)
+
+    for distance, (horizon, angle) in zip(distances, horizons):
+        limited_los = LoSWithoutTarget.from_another(notarget_los, distance_limit=distance)
+
+        assert horizon == limited_los.get_global_horizon()
+        assert angle == pytest.approx(limited_los.get_global_horizon_angle())
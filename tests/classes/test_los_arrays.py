@@ -0,0 +1,146 @@
+import struct
+
+import numpy as np
+import pytest
+
+from los_tools.classes.los_arrays import (
+    LOS_POINT_DTYPE,
+    apply_curvature_corrections,
+    compute_los_arrays,
+    compute_los_batch_arrays,
+    curvature_corrections,
+    horizons_from_visibility,
+    linestring_z_wkb_to_array,
+    los_arrays_to_structured,
+    polar_coordinates,
+    running_last_index,
+    template_curvature_corrections,
+    vertical_angles,
+)
+
+
+@pytest.fixture
+def profile() -> np.ndarray:
+    z = [0, 1, 3, 5, 4, 5, 12, 8, 10, 25, 5]
+    return np.array([[i, 0, value] for i, value in enumerate(z)], dtype=float)
+
+
+def test_vertical_angles():
+    angles = vertical_angles(np.array([0.0, 1.0, 1.0]), np.array([5.0, 1.0, -1.0]))
+
+    assert angles.tolist() == pytest.approx([90, 45, -45])
+
+
+def test_horizons_from_visibility():
+    visible = np.array([True, True, False, True, False, True])
+
+    assert horizons_from_visibility(visible).tolist() == [False, True, False, True, False, False]
+
+
+def test_running_last_index():
+    flags = np.array([False, True, False, False, True, False])
+
+    assert running_last_index(flags).tolist() == [-1, 1, 1, 1, 4, 4]
+
+
+def test_compute_los_arrays_no_target(profile: np.ndarray):
+    arrays = compute_los_arrays(profile, is_without_target=True, use_curvature_corrections=False)
+
+    assert arrays.vertical_angle[0] == -90
+    assert arrays.distance.tolist() == pytest.approx(list(range(11)))
+    assert arrays.visible.tolist() == [True, True, True, True, False, False, True, False, False, True, False]
+    assert arrays.horizon.tolist() == [False, False, False, True, False, False, True, False, False, True, False]
+    assert arrays.target_index is None
+
+
+def test_compute_los_arrays_local_target_offset(profile: np.ndarray):
+    arrays = compute_los_arrays(profile, target_offset=30, use_curvature_corrections=True, refraction_coefficient=0)
+
+    curvature = 100 / 12740000
+
+    assert arrays.z[-1] == pytest.approx(5 + 30 - 2 * curvature)
+    assert arrays.visible[-1]
+
+
+def test_compute_los_arrays_global(profile: np.ndarray):
+    arrays = compute_los_arrays(profile, target_x=6, target_y=0, is_global=True, use_curvature_corrections=False)
+
+    assert arrays.target_index == 6
+    assert arrays.previous_max_angle[7] == pytest.approx(arrays.previous_max_angle[6])
+
+
+def test_los_arrays_to_structured(profile: np.ndarray):
+    arrays = compute_los_arrays(profile, is_without_target=True, use_curvature_corrections=False)
+
+    data = los_arrays_to_structured(arrays)
+
+    assert data.dtype == LOS_POINT_DTYPE
+    assert data.itemsize == 50
+    assert data["z"].tolist() == arrays.z.tolist()
+    assert data["horizon"].tolist() == arrays.horizon.tolist()
+
+
+def test_linestring_z_wkb_to_array():
+    wkb = struct.pack("<BII", 1, 1002, 2) + struct.pack("<6d", 1, 2, 3, 4, 5, 6)
+
+    assert linestring_z_wkb_to_array(wkb).tolist() == [[1, 2, 3], [4, 5, 6]]
+
+    wkb = struct.pack("<BII", 1, 2, 1) + struct.pack("<2d", 1, 2)
+
+    assert linestring_z_wkb_to_array(wkb) is None
+
+
+def test_polar_coordinates():
+    xs, ys = polar_coordinates(10, 20, np.array([0, 90, 225]), np.array([0, 1, 4]))
+
+    assert xs.shape == (3, 3)
+    assert xs[0].tolist() == pytest.approx([10, 10, 10])
+    assert ys[0].tolist() == pytest.approx([20, 21, 24])
+    assert xs[1].tolist() == pytest.approx([10, 11, 14])
+    assert ys[1].tolist() == pytest.approx([20, 20, 20])
+    assert xs[2, 2] == pytest.approx(10 - 2 * np.sqrt(2))
+    assert ys[2, 2] == pytest.approx(20 - 2 * np.sqrt(2))
+
+
+def test_curvature_corrections():
+    distances = np.array([0.0, 1000.0, 2000.0])
+
+    corrections = curvature_corrections(distances, 0.13)
+
+    assert corrections.curvature.tolist() == pytest.approx([0, 1000**2 / 12740000, 2000**2 / 12740000])
+    assert corrections.refraction.tolist() == pytest.approx((0.13 * corrections.curvature).tolist())
+    assert (
+        corrections.apply(np.full(3, 10.0)).tolist()
+        == apply_curvature_corrections(np.full(3, 10.0), distances, 0.13).tolist()
+    )
+
+
+def test_template_curvature_corrections():
+    distances = np.array([0.0, 1000.0, 2000.0])
+
+    corrections = template_curvature_corrections(distances, 0.13)
+
+    assert template_curvature_corrections(distances.copy(), 0.13) is corrections
+    assert template_curvature_corrections(distances, 0.2) is not corrections
+    assert not corrections.curvature.flags.writeable
+    assert corrections.refraction.tolist() == curvature_corrections(distances, 0.13).refraction.tolist()
+
+
+def test_compute_los_batch_arrays_given_distances(profile: np.ndarray):
+    coords = np.concatenate([profile, profile])
+    offsets = np.array([0, profile.shape[0], 2 * profile.shape[0]])
+    distances = np.tile(np.arange(profile.shape[0], dtype=float), 2)
+
+    arrays = compute_los_batch_arrays(coords, offsets, target_offsets=30)
+
+    given = compute_los_batch_arrays(
+        coords,
+        offsets,
+        target_offsets=30,
+        distances=distances,
+        corrections=curvature_corrections(distances, 0.13),
+    )
+
+    assert given.distance.tolist() == arrays.distance.tolist()
+    assert given.z.tolist() == arrays.z.tolist()
+    assert given.visible.tolist() == arrays.visible.tolist()
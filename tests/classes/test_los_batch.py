@@ -0,0 +1,199 @@
+import numpy as np
+import pytest
+from qgis.core import QgsFeature, QgsFeatureRequest, QgsGeometry, QgsPoint, QgsProcessingException, QgsVectorLayer
+
+from los_tools.classes.classes_los import LoSGlobal, LoSLocal, LoSWithoutTarget
+from los_tools.classes.los_arrays import polar_coordinates
+from los_tools.classes.los_batch import LoSBatch
+from los_tools.classes.los_parse_cache import LoSParseCache
+from los_tools.constants.field_names import FieldNames
+from los_tools.constants.names_constants import NamesConstants
+from los_tools.processing.tools.util_functions import line_geometry_to_array
+
+
+def test_local_batch(local_los_feature: QgsFeature) -> None:
+    los = LoSLocal.from_feature(local_los_feature)
+    batch = LoSBatch.from_features([local_los_feature, local_los_feature], NamesConstants.LOS_LOCAL)
+
+    assert len(batch) == 2
+    assert batch.offsets.tolist() == [0, 11, 22]
+    assert batch.visible[batch.los_slice(1)].tolist() == list(los.visible)
+    assert batch.horizon[batch.los_slice(1)].tolist() == list(los.horizon)
+
+    assert batch.is_target_visible().tolist() == [los.is_target_visible()] * 2
+    assert batch.get_view_angle()[1] == pytest.approx(los.get_view_angle())
+    assert batch.get_elevation_difference()[1] == pytest.approx(los.get_elevation_difference())
+    assert batch.get_angle_difference_local_horizon()[1] == pytest.approx(los.get_angle_difference_local_horizon())
+    assert batch.get_elevation_difference_local_horizon()[1] == pytest.approx(
+        los.get_elevation_difference_local_horizon()
+    )
+    assert batch.get_los_slope_difference()[1] == pytest.approx(los.get_los_slope_difference())
+    assert batch.get_local_horizon_count()[1] == los.get_local_horizon_count()
+    assert batch.get_local_horizon_distance()[1] == pytest.approx(los.get_local_horizon_distance())
+
+    assert batch.get_elevation_difference_horizon_at_points()[batch.los_slice(1)].tolist() == pytest.approx(
+        [los.get_elevation_difference_horizon_at_point(i) for i in range(len(los.points))]
+    )
+    assert batch.get_angle_difference_horizon_at_points()[batch.los_slice(1)].tolist() == pytest.approx(
+        [los.get_angle_difference_horizon_at_point(i) for i in range(len(los.points))]
+    )
+
+
+def test_batch_degenerate_los(local_los_feature: QgsFeature) -> None:
+    feature = QgsFeature(local_los_feature)
+    feature.setId(7)
+    feature.setGeometry(QgsGeometry.fromPolyline([QgsPoint(0, 0, 0)]))
+
+    with pytest.raises(QgsProcessingException, match="LoS with feature id `7` has less than two vertices"):
+        LoSBatch.from_features([local_los_feature, feature], NamesConstants.LOS_LOCAL)
+
+
+def test_global_batch(global_los_feature: QgsFeature) -> None:
+    los = LoSGlobal.from_feature(global_los_feature)
+    batch = LoSBatch.from_features([global_los_feature], NamesConstants.LOS_GLOBAL)
+
+    assert batch.target_indices.tolist() == [los.target_index]
+    assert batch.is_target_visible().tolist() == [los.is_target_visible()]
+    assert batch.get_angle_difference_global_horizon()[0] == pytest.approx(los.get_angle_difference_global_horizon())
+    assert batch.get_elevation_difference_global_horizon()[0] == pytest.approx(
+        los.get_elevation_difference_global_horizon()
+    )
+    assert batch.get_horizon_count()[0] == los.get_horizon_count()
+    assert batch.get_horizon_distance()[0] == pytest.approx(los.get_horizon_distance())
+    assert batch.get_geom_at_index(batch.global_horizon_indices()[0]) == los.get_global_horizon()
+
+
+def test_no_target_batch(notarget_los_feature: QgsFeature) -> None:
+    los = LoSWithoutTarget.from_feature(notarget_los_feature)
+    batch = LoSBatch.from_features([notarget_los_feature], NamesConstants.LOS_NO_TARGET)
+
+    assert batch.get_maximal_vertical_angle()[0] == pytest.approx(los.get_maximal_vertical_angle())
+    assert batch.get_global_horizon_distance()[0] == pytest.approx(los.get_global_horizon_distance())
+    assert batch.get_max_local_horizon_distance()[0] == pytest.approx(los.get_max_local_horizon_distance())
+    assert batch.get_max_local_horizon_angle()[0] == pytest.approx(los.get_max_local_horizon_angle())
+    assert batch.get_elevation_difference_global_horizon_at_points().tolist() == pytest.approx(
+        [los.get_elevation_difference_global_horizon_at_point(i) for i in range(len(los.points))]
+    )
+    assert batch.get_angle_difference_global_horizon_at_points().tolist() == pytest.approx(
+        [los.get_angle_difference_global_horizon_at_point(i) for i in range(len(los.points))]
+    )
+
+
+def test_batches_from_layer(los_local: QgsVectorLayer) -> None:
+    batches = list(LoSBatch.batches_from_features(los_local.getFeatures(), NamesConstants.LOS_LOCAL, chunk_size=100))
+
+    assert sum(len(features) for features, _ in batches) == los_local.featureCount()
+    assert all(len(features) == len(batch) for features, batch in batches)
+
+
+def test_from_lines_arrays(notarget_los_feature: QgsFeature) -> None:
+    los = LoSWithoutTarget.from_feature(notarget_los_feature)
+    coords = line_geometry_to_array(notarget_los_feature.geometry())
+
+    xs = np.vstack([coords[:, 0], coords[:, 0], coords[:, 0]])
+    ys = np.vstack([coords[:, 1], coords[:, 1], coords[:, 1]])
+    zs = np.vstack([coords[:, 2], np.full(coords.shape[0], np.nan), coords[:, 2]])
+    zs[2, 1::2] = np.nan
+
+    los_indices, batch = LoSBatch.from_lines_arrays(
+        xs, ys, zs, notarget_los_feature.attribute(FieldNames.OBSERVER_OFFSET)
+    )
+
+    assert los_indices.tolist() == [0, 2]
+    assert batch.offsets.tolist() == [0, coords.shape[0], coords.shape[0] + (coords.shape[0] + 1) // 2]
+    assert batch.visible[batch.los_slice(0)].tolist() == list(los.visible)
+
+    x, y, z, m = batch.horizon_line_vertices(NamesConstants.HORIZON_GLOBAL)
+
+    assert QgsPoint(x[0], y[0], z[0]) == los.get_global_horizon()
+    assert m[0] == pytest.approx(los.get_global_horizon_angle())
+
+    x, y, z, m = batch.horizon_line_vertices(NamesConstants.HORIZON_MAX_LOCAL)
+
+    assert QgsPoint(x[0], y[0], z[0]) == los.get_max_local_horizon(direction_point=True)
+    assert m[0] == pytest.approx(los.get_max_local_horizon_angle())
+
+    _, batch = LoSBatch.from_lines_arrays(xs[1:2], ys[1:2], zs[1:2], 0)
+
+    assert batch is None
+
+
+def test_from_lines_arrays_distance_template() -> None:
+    distances = np.arange(50) * 10.0
+    xs, ys = polar_coordinates(100, 200, np.array([0, 45, 90]), distances)
+    zs = 300 + 20 * np.sin(distances / 70)[np.newaxis, :] * np.array([[1], [2], [3]])
+    zs[1, 10:20] = np.nan
+
+    los_indices, batch = LoSBatch.from_lines_arrays(xs, ys, zs, 1.5)
+    template_los_indices, template_batch = LoSBatch.from_lines_arrays(xs, ys, zs, 1.5, distances=distances)
+
+    assert template_los_indices.tolist() == los_indices.tolist()
+    assert template_batch.distance == pytest.approx(batch.distance)
+    assert template_batch.z == pytest.approx(batch.z)
+    assert template_batch.visible.tolist() == batch.visible.tolist()
+    assert template_batch.horizon.tolist() == batch.horizon.tolist()
+
+
+@pytest.mark.parametrize(
+    "los_fixture_name,los_type",
+    [
+        ("los_local", NamesConstants.LOS_LOCAL),
+        ("los_global", NamesConstants.LOS_GLOBAL),
+        ("los_no_target", NamesConstants.LOS_NO_TARGET),
+    ],
+)
+def test_from_features_parse_cache(los_fixture_name: str, los_type: str, request) -> None:
+    los_layer: QgsVectorLayer = request.getfixturevalue(los_fixture_name)
+
+    features = list(los_layer.getFeatures())
+    parse_cache = LoSParseCache()
+
+    batch = LoSBatch.from_features(features, los_type)
+
+    partial_batch = LoSBatch.from_features(features[::2], los_type, parse_cache=parse_cache, layer_key="layer")
+
+    assert len(parse_cache) == len(partial_batch)
+
+    cached_batch = LoSBatch.from_features(features, los_type, parse_cache=parse_cache, layer_key="layer")
+
+    assert len(parse_cache) == len(features)
+
+    for name in ["offsets", "distance", "z", "vertical_angle", "visible", "horizon", "target_indices"]:
+        np.testing.assert_array_equal(getattr(cached_batch, name), getattr(batch, name))
+
+    np.testing.assert_array_equal(cached_batch.global_horizon_indices(), batch.global_horizon_indices())
+
+    # different settings are not taken from cache
+    LoSBatch.from_features(features, los_type, curvature_corrections=False, parse_cache=parse_cache, layer_key="layer")
+
+    assert len(parse_cache) == 2 * len(features)
+
+
+def test_from_features_fetch_missing(los_local: QgsVectorLayer) -> None:
+    features = list(los_local.getFeatures())
+    features_without_geometry = list(los_local.getFeatures(QgsFeatureRequest().setFlags(QgsFeatureRequest.NoGeometry)))
+
+    parse_cache = LoSParseCache()
+    LoSBatch.from_features(features[::2], NamesConstants.LOS_LOCAL, parse_cache=parse_cache, layer_key="layer")
+
+    fetched = []
+
+    def fetch_features(fids):
+        fetched.extend(fids)
+        return los_local.getFeatures(QgsFeatureRequest().setFilterFids(fids))
+
+    batch = LoSBatch.from_features(
+        features_without_geometry,
+        NamesConstants.LOS_LOCAL,
+        parse_cache=parse_cache,
+        layer_key="layer",
+        fetch_features=fetch_features,
+    )
+
+    # only LoS missing in cache are fetched with geometry
+    assert fetched == [feature.id() for feature in features[1::2]]
+
+    expected = LoSBatch.from_features(features, NamesConstants.LOS_LOCAL)
+
+    for name in ["offsets", "distance", "z", "vertical_angle", "visible", "horizon", "target_indices"]:
+        np.testing.assert_array_equal(getattr(batch, name), getattr(expected, name))
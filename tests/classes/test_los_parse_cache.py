@@ -0,0 +1,71 @@
+import numpy as np
+
+from los_tools.classes.los_arrays import LOS_POINT_DTYPE
+from los_tools.classes.los_parse_cache import LoSParseCache, shared_parse_cache
+
+
+def test_lru_eviction() -> None:
+    data = np.zeros(10, dtype=LOS_POINT_DTYPE)
+
+    cache = LoSParseCache(memory_budget=3 * data.nbytes)
+
+    for i in range(3):
+        cache.put(i, data.copy(), i)
+
+    assert cache.get(0)[1] == 0
+
+    cache.put(3, data.copy(), 3)
+
+    assert len(cache) == 3
+    assert cache.memory_used == 3 * data.nbytes
+    assert cache.get(1) is None
+    assert cache.get(0) is not None
+
+    cache.put(4, np.zeros(100, dtype=LOS_POINT_DTYPE), -1)
+
+    assert cache.get(4) is None
+
+    cache.resize(data.nbytes)
+
+    assert len(cache) == 1
+    assert cache.get(0) is not None
+
+    cache.clear()
+
+    assert len(cache) == 0
+    assert cache.memory_used == 0
+
+
+def test_groups() -> None:
+    data = np.zeros(10, dtype=LOS_POINT_DTYPE)
+
+    cache = LoSParseCache(memory_budget=3 * data.nbytes)
+
+    assert cache.fits(3 * data.nbytes)
+    assert not cache.fits(4 * data.nbytes)
+
+    cache.put(("a", 1), data.copy(), -1, group="a")
+    cache.put(("a", 2), data.copy(), -1, group="a")
+    cache.put(("a", 2), data.copy(), -1, group="a")
+    cache.put(("b", 1), data.copy(), -1, group="b")
+
+    assert cache.count("a") == 2
+    assert cache.count("b") == 1
+    assert cache.count("c") == 0
+
+    cache.put(("b", 2), data.copy(), -1, group="b")
+
+    assert cache.count("a") == 1
+    assert cache.count("b") == 2
+
+    cache.clear()
+
+    assert cache.count("b") == 0
+
+
+def test_shared_parse_cache() -> None:
+    cache = shared_parse_cache(1024)
+
+    assert shared_parse_cache(1024) is cache
+    assert shared_parse_cache(2048) is cache
+    assert cache.memory_budget == 2048
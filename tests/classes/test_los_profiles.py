@@ -0,0 +1,135 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from los_tools.classes import los_profiles
+from los_tools.classes.los_profiles import LoSProfiles, LoSProfilesWriter
+from los_tools.processing.tools.util_functions import extend_line_end, segmentize_lines_coordinates
+
+
+def test_write_and_load(tmp_path: Path) -> None:
+    path = str(tmp_path / "profiles.npz")
+
+    distances = np.array([0.0, 1.0, 2.5, 4.0])
+
+    writer = LoSProfilesWriter(path, "no target")
+
+    writer.add_profile(
+        10, 20, 90, distances, np.array([1.0, 2.0, np.nan, 4.0]), id_observer=1, id_target=5, observer_offset=1.5
+    )
+    writer.add_profile(
+        10, 20, 180, distances.copy(), np.array([1.0, 3.0, 5.0, 7.0]), id_observer=1, id_target=6, observer_offset=1.5
+    )
+    writer.add_line(
+        np.array([0.0, 3.0, 6.0]),
+        np.array([0.0, 4.0, 8.0]),
+        np.array([10.0, 11.0, 12.0]),
+        id_observer=2,
+        id_target=7,
+        observer_offset=2,
+        target_offset=0.5,
+        target_x=6,
+        target_y=8,
+    )
+
+    assert len(writer) == 3
+
+    writer.close()
+
+    profiles = LoSProfiles(path)
+
+    assert len(profiles) == 3
+    assert profiles.los_type == "no target"
+
+    np.testing.assert_array_equal(profiles.arrays["template"], [0, 0, 1])
+    np.testing.assert_array_equal(profiles.arrays["templates_offsets"], [0, 4, 7])
+
+    profile = profiles[0]
+
+    assert profile.id_observer == 1
+    assert profile.id_target == 5
+    assert profile.observer_offset == 1.5
+    assert profile.azimuth == 90
+    assert np.isnan(profile.target_x)
+
+    np.testing.assert_allclose(profile.points, [[10, 20, 1], [11, 20, 2], [14, 20, 4]], atol=1e-9)
+    np.testing.assert_allclose(profiles[1].points[:, :2], [[10, 20], [10, 19], [10, 17.5], [10, 16]], atol=1e-9)
+
+    profile = profiles[-1]
+
+    assert profile.id_target == 7
+    assert (profile.target_offset, profile.target_x, profile.target_y) == (0.5, 6, 8)
+
+    np.testing.assert_allclose(profile.points, [[0, 0, 10], [3, 4, 11], [6, 8, 12]], atol=1e-9)
+
+    assert [profile.id_target for profile in profiles] == [5, 6, 7]
+
+    with pytest.raises(IndexError):
+        profiles[3]
+
+
+@pytest.mark.parametrize("extension", [0.0, 50.0])
+def test_segmented_lines(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, extension: float) -> None:
+    path = str(tmp_path / "profiles.npz")
+
+    # several chunks are written
+    monkeypatch.setattr(los_profiles, "PROFILES_CHUNK_SAMPLES", 20)
+
+    targets = np.array([[13.7, -4.1], [-8.25, 9.5], [0.3, 0.2], [5.0, 5.0]])
+
+    vertices = np.empty((targets.shape[0], 3 if extension else 2, 2))
+    vertices[:, 0] = [1.1, 2.2]
+    vertices[:, 1] = targets
+
+    if extension:
+        vertices[:, 2] = extend_line_end(vertices[:, 0], targets, np.full(targets.shape[0], extension))
+
+    coords, offsets = segmentize_lines_coordinates(vertices, 1.5)
+    zs = np.sin(coords[:, 0]) + coords[:, 1]
+
+    writer = LoSProfilesWriter(path, "global", 1.5)
+
+    for i in range(targets.shape[0]):
+        writer.add_segmented_line(
+            1.1,
+            2.2,
+            targets[i, 0],
+            targets[i, 1],
+            zs[offsets[i] : offsets[i + 1]],
+            id_observer=1,
+            id_target=i,
+            observer_offset=1.6,
+            extension=extension,
+        )
+
+    assert len(writer) == targets.shape[0]
+
+    writer.close()
+
+    profiles = LoSProfiles(path)
+
+    assert len(profiles) == targets.shape[0]
+    assert profiles.arrays["templates_distances"].shape == (0,)
+
+    for i, profile in enumerate(profiles):
+        assert profile.id_target == i
+        assert (profile.target_x, profile.target_y) == tuple(targets[i])
+        np.testing.assert_array_equal(profile.points[:, :2], coords[offsets[i] : offsets[i + 1]])
+        np.testing.assert_array_equal(profile.points[:, 2], zs[offsets[i] : offsets[i + 1]])
+
+
+def test_segmented_line_without_segment_length(tmp_path: Path) -> None:
+    writer = LoSProfilesWriter(str(tmp_path / "profiles.npz"), "local")
+
+    with pytest.raises(ValueError, match="Segment length"):
+        writer.add_segmented_line(0, 0, 1, 1, np.array([1.0, 2.0]), id_observer=1, id_target=1, observer_offset=0)
+
+
+def test_wrong_sizes(tmp_path: Path) -> None:
+    writer = LoSProfilesWriter(str(tmp_path / "profiles.npz"), "local")
+
+    with pytest.raises(ValueError, match="same size"):
+        writer.add_profile(
+            0, 0, 0, np.array([0.0, 1.0]), np.array([1.0]), id_observer=1, id_target=1, observer_offset=0
+        )
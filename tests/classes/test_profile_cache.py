@@ -0,0 +1,56 @@
+import os
+from pathlib import Path
+
+import numpy as np
+
+from los_tools.classes.profile_cache import ProfileCache
+
+
+def test_get(tmp_path: Path) -> None:
+    cache = ProfileCache(str(tmp_path / "cache"))
+
+    xs = np.array([0.0, 1.0, 2.0])
+    ys = np.array([5.0, 5.0, 5.0])
+
+    key = ProfileCache.key("rasters", xs, ys)
+
+    assert key != ProfileCache.key("other rasters", xs, ys)
+    assert key != ProfileCache.key("rasters", ys, xs)
+
+    calls = []
+
+    def sample() -> np.ndarray:
+        calls.append(1)
+        return np.array([1.0, np.nan, 3.0])
+
+    values = cache.get(key, sample)
+    cached_values = cache.get(key, sample)
+
+    assert len(calls) == 1
+    np.testing.assert_array_equal(cached_values, values)
+    assert cache.size == os.path.getsize(tmp_path / "cache" / f"{key}.npy")
+
+    cache.clear()
+
+    assert cache.size == 0
+
+    cache.get(key, sample)
+
+    assert len(calls) == 2
+
+
+def test_eviction(tmp_path: Path) -> None:
+    values = np.zeros(100)
+    file_size = values.nbytes + 128
+
+    cache = ProfileCache(str(tmp_path), max_size=3 * file_size)
+
+    keys = [ProfileCache.key("rasters", np.array([float(i)]), np.array([0.0])) for i in range(5)]
+
+    for i, key in enumerate(keys):
+        cache.get(key, lambda: values)
+        os.utime(tmp_path / f"{key}.npy", ns=(i * 10**9, i * 10**9))
+
+    # the oldest files are removed to keep the cache within its size
+    assert cache.size <= 3 * file_size
+    assert sorted(os.listdir(tmp_path)) == sorted(f"{key}.npy" for key in keys[2:])
@@ -0,0 +1,123 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from los_tools.classes.raster_memmap import (
+    MemoryMappedRaster,
+    contiguous_blocks_layout,
+    envi_layout,
+    fits_file,
+    parse_envi_header,
+)
+from los_tools.classes.raster_tiles import CachedRaster, RasterGrid, TileCache
+
+ENVI_HEADER = """ENVI
+description = {
+  test raster}
+samples = 7
+lines = 5
+bands = 1
+header offset = 16
+file type = ENVI Standard
+data type = 4
+interleave = bsq
+byte order = 1
+"""
+
+
+@pytest.fixture
+def values() -> np.ndarray:
+    values = np.arange(35, dtype=np.float32).reshape(5, 7) * 1.5
+    values[2, 3] = -9999
+    return values
+
+
+@pytest.fixture
+def grid() -> RasterGrid:
+    return RasterGrid(x_min=10, y_max=20, x_res=2, y_res=2, width=7, height=5, no_data=-9999)
+
+
+def cached_raster(values: np.ndarray, grid: RasterGrid) -> CachedRaster:
+    def read_tile(row: int, col: int, rows: int, cols: int) -> np.ndarray:
+        tile = values[row : row + rows, col : col + cols].astype(np.float64)
+        tile[tile == grid.no_data] = np.nan
+        return tile
+
+    return CachedRaster("cached", grid, read_tile, TileCache(), tile_size=3)
+
+
+def test_parse_envi_header():
+    header = parse_envi_header(ENVI_HEADER)
+
+    assert header["samples"] == "7"
+    assert header["header offset"] == "16"
+    assert header["description"] == "{\n  test raster}"
+
+
+def test_envi_layout_scaled():
+    assert envi_layout("raster.img", ENVI_HEADER + "data gain values = {0.1}\n") is None
+    assert envi_layout("raster.img", ENVI_HEADER + "data offset values = {\n  100}\n") is None
+    assert envi_layout("raster.img", ENVI_HEADER + "data gain values = {1.0}\ndata offset values = {0}\n") is not None
+
+
+def test_envi_memory_mapped_raster(tmp_path: Path, values: np.ndarray, grid: RasterGrid):
+    path = tmp_path / "raster.img"
+    path.write_bytes(b"\0" * 16 + values.astype(">f4").tobytes())
+
+    layout = envi_layout(str(path), ENVI_HEADER)
+
+    assert layout is not None
+    assert fits_file(layout)
+
+    raster = MemoryMappedRaster("mapped", grid, layout)
+    reference = cached_raster(values, grid)
+
+    assert raster.cell_value(1, 2) == pytest.approx(values[1, 2])
+    assert np.isnan(raster.cell_value(2, 3))
+    assert np.isnan(raster.cell_value(5, 0))
+
+    rng = np.random.default_rng(1)
+    xs = rng.uniform(8, 26, 300)
+    ys = rng.uniform(8, 22, 300)
+
+    expected = reference.bilinear_values(xs, ys)
+
+    assert raster.bilinear_values(xs, ys).tolist() == pytest.approx(expected.tolist(), nan_ok=True)
+    assert raster.bilinear_value(xs[0], ys[0]) == reference.bilinear_value(xs[0], ys[0])
+
+    assert envi_layout(str(path), ENVI_HEADER.replace("bands = 1", "bands = 3")) is None
+
+
+def test_tiled_memory_mapped_raster(tmp_path: Path, values: np.ndarray, grid: RasterGrid):
+    tile_size = 4
+    padded = np.zeros((8, 8), dtype=np.float32)
+    padded[:5, :7] = values
+
+    tiles = [
+        padded[r : r + tile_size, c : c + tile_size] for r in range(0, 8, tile_size) for c in range(0, 8, tile_size)
+    ]
+
+    path = tmp_path / "raster.bin"
+    path.write_bytes(b"\0" * 8 + b"".join(tile.astype("<f4").tobytes() for tile in tiles))
+
+    block_offsets = [8 + i * tile_size * tile_size * 4 for i in range(len(tiles))]
+
+    layout = contiguous_blocks_layout(str(path), np.dtype("<f4"), 7, 5, tile_size, tile_size, block_offsets)
+
+    assert layout is not None
+    assert layout.blocks_x == 2
+    assert layout.blocks_y == 2
+    assert fits_file(layout)
+
+    raster = MemoryMappedRaster("mapped", grid, layout)
+
+    rows, cols = np.meshgrid(np.arange(-1, 6), np.arange(-1, 8), indexing="ij")
+
+    assert raster.cell_values(rows.ravel(), cols.ravel()).tolist() == pytest.approx(
+        cached_raster(values, grid).cell_values(rows.ravel(), cols.ravel()).tolist(), nan_ok=True
+    )
+
+    block_offsets[2] += 4
+
+    assert contiguous_blocks_layout(str(path), np.dtype("<f4"), 7, 5, tile_size, tile_size, block_offsets) is None
@@ -0,0 +1,98 @@
+import math
+
+import numpy as np
+import pytest
+
+from los_tools.classes.raster_tiles import CachedRaster, RasterGrid, RasterSampler, TileCache
+
+
+@pytest.fixture
+def values() -> np.ndarray:
+    values = np.arange(100, dtype=float).reshape(10, 10)
+    values[7, 7] = np.nan
+    return values
+
+
+@pytest.fixture
+def grid() -> RasterGrid:
+    return RasterGrid(x_min=0, y_max=10, x_res=1, y_res=1, width=10, height=10, no_data=-9999)
+
+
+def cached_raster(values: np.ndarray, grid: RasterGrid, cache: TileCache, reads: list) -> CachedRaster:
+    def read_tile(row: int, col: int, rows: int, cols: int) -> np.ndarray:
+        reads.append((row, col, rows, cols))
+        return values[row : row + rows, col : col + cols].copy()
+
+    return CachedRaster("raster", grid, read_tile, cache, tile_size=4)
+
+
+def test_tile_cache_eviction():
+    cache = TileCache(memory_budget=2 * 8 * 4)
+
+    cache.get("a", lambda: np.zeros(4))
+    cache.get("b", lambda: np.zeros(4))
+    cache.get("a", lambda: pytest.fail("tile should be cached"))
+    cache.get("c", lambda: np.zeros(4))
+
+    assert len(cache) == 2
+    assert cache.memory_used == 64
+    assert cache.get("a", lambda: np.ones(4))[0] == 0
+    assert cache.get("b", lambda: np.ones(4))[0] == 1
+
+
+def test_cell_value(values: np.ndarray, grid: RasterGrid):
+    reads = []
+    raster = cached_raster(values, grid, TileCache(), reads)
+
+    assert raster.cell_value(0, 0) == 0
+    assert raster.cell_value(5, 9) == 59
+    assert raster.cell_value(9, 9) == 99
+    assert math.isnan(raster.cell_value(7, 7))
+    assert math.isnan(raster.cell_value(-1, 0))
+    assert math.isnan(raster.cell_value(0, 10))
+
+    assert reads == [(0, 0, 4, 4), (4, 8, 4, 2), (8, 8, 2, 2), (4, 4, 4, 4)]
+
+
+def test_bilinear_value(values: np.ndarray, grid: RasterGrid):
+    raster = cached_raster(values, grid, TileCache(), [])
+
+    # cell centers
+    assert raster.bilinear_value(1.5, 8.5) == pytest.approx(11)
+    assert raster.bilinear_value(3.5, 5.5) == pytest.approx(43)
+
+    # across tile boundaries
+    assert raster.bilinear_value(4, 6) == pytest.approx((33 + 34 + 43 + 44) / 4)
+    assert raster.bilinear_value(3.75, 6.25) == pytest.approx(33 + 0.25 + 0.25 * 10)
+
+    # no data and outside of raster
+    assert raster.bilinear_value(7.5, 2.5) is None
+    assert raster.bilinear_value(0.2, 5) is None
+
+
+def test_bilinear_values(values: np.ndarray, grid: RasterGrid):
+    reads = []
+    raster = cached_raster(values, grid, TileCache(), reads)
+
+    rng = np.random.default_rng(42)
+    xs = rng.uniform(-1, 11, 500)
+    ys = rng.uniform(-1, 11, 500)
+
+    expected = [raster.bilinear_value(x, y) for x, y in zip(xs.tolist(), ys.tolist())]
+    expected = [np.nan if value is None else value for value in expected]
+
+    reads.clear()
+
+    assert raster.bilinear_values(xs, ys).tolist() == pytest.approx(expected, nan_ok=True, rel=0, abs=0)
+    assert reads == []
+
+    assert raster.bilinear_values(np.array([]), np.array([])).shape == (0,)
+
+
+def test_raster_sampler_abstract(grid: RasterGrid):
+    class IncompleteSampler(RasterSampler):
+        def cell_value(self, row: int, col: int) -> float:
+            return 0.0
+
+    with pytest.raises(TypeError):
+        IncompleteSampler("raster", grid)
@@ -1,3 +1,5 @@
+import numpy as np
+import pytest
 from qgis.core import QgsFeature, QgsLineString, QgsPoint, QgsVectorLayer
 
 from los_tools.classes.sampling_distance_matrix import SamplingDistanceMatrix
@@ -83,6 +85,32 @@ def test_build_line(table_angle_distance_size: QgsVectorLayer):
     )
 
 
+def test_distance_template(table_angle_distance_size: QgsVectorLayer):
+    distance_sampling_matrix = SamplingDistanceMatrix(table_angle_distance_size)
+
+    template = distance_sampling_matrix.distance_template()
+
+    assert template[0] == 0
+    assert template[-1] == 2000
+    assert template[1] == 0.5
+    assert np.all(np.diff(template) > 0)
+    assert distance_sampling_matrix.distance_template() is template
+
+    line = distance_sampling_matrix.build_line(QgsPoint(10, 20), QgsPoint(20, 30))
+
+    assert line.numPoints() == template.shape[0]
+    assert line.length() == pytest.approx(2000)
+
+    xs, ys = distance_sampling_matrix.build_line_arrays(QgsPoint(10, 20), QgsPoint(20, 30))
+
+    assert xs.tolist() == [point.x() for point in line.points()]
+    assert ys.tolist() == [point.y() for point in line.points()]
+
+    distance_sampling_matrix.data[-1][SamplingDistanceMatrix.INDEX_DISTANCE] = 2500
+
+    assert distance_sampling_matrix.distance_template()[-1] == 2500
+
+
 def test_values_minus_one(table_angle_distance_size: QgsVectorLayer):
     fields = table_angle_distance_size.fields()
 
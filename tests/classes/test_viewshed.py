@@ -0,0 +1,162 @@
+import numpy as np
+import pytest
+
+from los_tools.classes.los_arrays import compute_los_batch_arrays
+from los_tools.classes.raster_tiles import RasterGrid
+from los_tools.classes.viewshed import (
+    RadialViewshed,
+    TiledAccumulator,
+    perimeter_offsets,
+    visibility_from_angle_differences,
+    window_offset,
+)
+
+
+def sample(xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+    values = 50 * np.sin(xs / 37.0) + 30 * np.cos(ys / 23.0)
+    values[(xs > 140) & (ys < -20)] = np.nan
+    return values
+
+
+def test_perimeter_offsets():
+    rows, cols = perimeter_offsets(2)
+
+    assert rows.shape[0] == 16
+    assert len(set(zip(rows.tolist(), cols.tolist()))) == 16
+    assert np.all(np.maximum(np.abs(rows), np.abs(cols)) == 2)
+
+
+@pytest.mark.parametrize("curvature_corrections", [True, False])
+def test_radial_viewshed_same_as_los(curvature_corrections: bool):
+    observer_z = float(sample(np.array([3.3]), np.array([-1.7]))[0])
+
+    viewshed = RadialViewshed(
+        3.3,
+        -1.7,
+        observer_z + 2,
+        120,
+        5,
+        target_offset=1.5,
+        use_curvature_corrections=curvature_corrections,
+    )
+
+    angle_differences = viewshed.compute(sample)
+
+    size = viewshed.grid.width
+    h = viewshed.half_size
+
+    assert angle_differences.shape == (size, size)
+    assert angle_differences[h, h] == 180
+    assert np.isnan(angle_differences[0, 0])
+
+    inside = viewshed.cell_distances() <= 120
+    expected = np.full(size * size, -np.inf)
+    fractions = np.arange(1, h + 1) / h
+
+    # every sample of the ray evaluated as target of local LoS
+    for ray in range(0, viewshed.number_of_rays, 7):
+        rows = viewshed.rays_rows[ray] * fractions
+        cols = viewshed.rays_cols[ray] * fractions
+        xs = 3.3 + cols * 5
+        ys = -1.7 - rows * 5
+        zs = sample(xs, ys)
+
+        for k in np.flatnonzero(~np.isnan(zs) & (np.hypot(rows, cols) * 5 <= 120 + 2.5)).tolist():
+            keep = np.flatnonzero(~np.isnan(zs[: k + 1]))
+            coords = np.column_stack(
+                [np.r_[3.3, xs[keep]], np.r_[-1.7, ys[keep]], np.r_[observer_z, zs[keep]]],
+            )
+
+            los = compute_los_batch_arrays(
+                coords,
+                np.array([0, coords.shape[0]]),
+                observer_offsets=2,
+                target_offsets=1.5,
+                use_curvature_corrections=curvature_corrections,
+            )
+
+            cell = int((h + np.rint(rows[k])) * size + h + np.rint(cols[k]))
+            difference = los.vertical_angle[-1] - max(los.previous_max_angle[-1], -90)
+            expected[cell] = max(expected[cell], difference)
+
+            # visible cells are visible from at least one ray
+            if los.visible[-1] and inside.ravel()[cell]:
+                assert angle_differences.ravel()[cell] > 0
+
+    computed = np.isfinite(expected) & ~np.isnan(angle_differences.ravel())
+
+    assert np.all(angle_differences.ravel()[computed] >= expected[computed] - 1e-9)
+
+
+def test_radial_viewshed_covers_all_cells():
+    viewshed = RadialViewshed(0, 0, 100, 100, 3)
+    angle_differences = viewshed.compute(sample)
+
+    inside = viewshed.cell_distances() <= 100
+
+    assert np.all(~np.isnan(angle_differences[inside]))
+    assert np.all(np.isnan(angle_differences[~inside]))
+
+
+def test_radial_viewshed_clipped():
+    full = RadialViewshed(10, -5, 100, 60, 4)
+    full_angle_differences = full.compute(sample)
+
+    clipped = RadialViewshed(10, -5, 100, 60, 4, clip_extent=(-7, -200, 35, 13))
+    angle_differences = clipped.compute(sample)
+
+    row, col = window_offset(clipped.grid, full.grid)
+
+    assert (row, col) == (clipped.row_start, clipped.col_start)
+    assert angle_differences.shape == (clipped.row_end - clipped.row_start, clipped.col_end - clipped.col_start)
+    assert angle_differences.shape < full_angle_differences.shape
+    np.testing.assert_array_equal(
+        angle_differences,
+        full_angle_differences[clipped.row_start : clipped.row_end, clipped.col_start : clipped.col_end],
+    )
+
+    blocks = [values for _, values in clipped.angle_differences_blocks(block_size=4)]
+    np.testing.assert_array_equal(np.vstack(blocks), angle_differences)
+
+
+def test_visibility_from_angle_differences():
+    visibility = visibility_from_angle_differences(np.array([[1.5, -0.5], [np.nan, 0]]), 255)
+
+    assert visibility.dtype == np.uint8
+    assert visibility.tolist() == [[1, 0], [255, 0]]
+
+
+def test_window_offset():
+    grid = RasterGrid(x_min=0, y_max=100, x_res=2, y_res=2, width=50, height=50)
+
+    assert window_offset(RasterGrid(x_min=10.9, y_max=80.2, x_res=2, y_res=2, width=3, height=3), grid) == (10, 5)
+    assert window_offset(RasterGrid(x_min=-4.2, y_max=103, x_res=2, y_res=2, width=3, height=3), grid) == (-2, -2)
+
+
+def test_tiled_accumulator():
+    accumulator = TiledAccumulator(7, 5, np.uint16, tile_size=3)
+    expected = np.zeros((5, 7), dtype=np.uint16)
+
+    rng = np.random.default_rng(3)
+
+    for _ in range(20):
+        values = rng.integers(0, 2, size=rng.integers(1, 6, size=2)).astype(np.uint8)
+        row, col = rng.integers(-4, 7, size=2).tolist()
+
+        accumulator.add(values, row, col)
+
+        padded = np.zeros((5 + 16, 7 + 16), dtype=np.uint16)
+        padded[row + 8 : row + 8 + values.shape[0], col + 8 : col + 8 + values.shape[1]] += values
+        expected += padded[8:13, 8:15]
+
+    accumulator.add(np.ones((5, 7), dtype=np.uint8), 0, 0)
+
+    result = np.zeros((5, 7), dtype=np.uint16)
+
+    for row, col, values in accumulator.tiles():
+        assert values.dtype == np.uint16
+        result[row : row + values.shape[0], col : col + values.shape[1]] = values
+
+    assert accumulator.tiles_x == 3
+    assert accumulator.tiles_y == 2
+    assert result.tolist() == (expected + 1).tolist()
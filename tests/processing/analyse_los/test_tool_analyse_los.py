@@ -26,6 +26,8 @@ def test_parameters() -> None:
 
     assert_parameter(alg.parameterDefinition("RefractionCoefficient"), parameter_type="number", default_value=0.13)
 
+    assert_parameter(alg.parameterDefinition("Workers"), parameter_type="number", default_value=1)
+
 
 def test_alg_settings() -> None:
     alg = AnalyseLosAlgorithm()
@@ -102,3 +104,22 @@ def test_run_alg(los_fixture_name: str, fields: typing.List[str], request) -> No
         fields,
         output_layer,
     )
+
+
+def test_run_alg_workers(los_global: QgsVectorLayer) -> None:
+    alg = AnalyseLosAlgorithm()
+    alg.initAlgorithm()
+
+    output_path = result_filename("los_global_analysed.gpkg")
+    output_path_workers = result_filename("los_global_analysed_workers.gpkg")
+
+    assert_run(alg, {"LoSLayer": los_global, "OutputLayer": output_path})
+    assert_run(alg, {"LoSLayer": los_global, "Workers": 3, "OutputLayer": output_path_workers})
+
+    output_layer = QgsVectorLayer(output_path)
+    output_layer_workers = QgsVectorLayer(output_path_workers)
+
+    assert output_layer_workers.featureCount() == output_layer.featureCount()
+
+    for feature, feature_workers in zip(output_layer.getFeatures(), output_layer_workers.getFeatures()):
+        assert feature_workers.attributes()[1:] == feature.attributes()[1:]
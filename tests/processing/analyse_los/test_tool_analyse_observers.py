@@ -0,0 +1,112 @@
+from qgis.core import Qgis, QgsRasterLayer, QgsVectorLayer
+
+from los_tools.constants.field_names import FieldNames
+from los_tools.constants.names_constants import NamesConstants
+from los_tools.processing.analyse_los.tool_analyse_observers import AnalyseObserversAlgorithm
+from tests.custom_assertions import (
+    assert_algorithm,
+    assert_field_names_exist,
+    assert_layer,
+    assert_parameter,
+    assert_run,
+)
+from tests.utils import result_filename
+
+OBSERVERS_ID = "id_point"
+OBSERVERS_OFFSET = "observ_offset"
+
+
+def test_parameters() -> None:
+    alg = AnalyseObserversAlgorithm()
+    alg.initAlgorithm()
+
+    assert_parameter(alg.parameterDefinition("DemRasters"), parameter_type="multilayer")
+    assert_parameter(alg.parameterDefinition("LineSettingsTable"), parameter_type="vector")
+    assert_parameter(alg.parameterDefinition("ObserverPoints"), parameter_type="source")
+    assert_parameter(
+        alg.parameterDefinition("ObserverIdField"), parameter_type="field", parent_parameter="ObserverPoints"
+    )
+    assert_parameter(
+        alg.parameterDefinition("ObserverOffset"), parameter_type="field", parent_parameter="ObserverPoints"
+    )
+    assert_parameter(alg.parameterDefinition("AngleStart"), parameter_type="number", default_value=0)
+    assert_parameter(alg.parameterDefinition("AngleEnd"), parameter_type="number", default_value=359.999)
+    assert_parameter(alg.parameterDefinition("AngleStep"), parameter_type="number", default_value=1)
+    assert_parameter(alg.parameterDefinition("CurvatureCorrections"), parameter_type="boolean", default_value=True)
+    assert_parameter(alg.parameterDefinition("RefractionCoefficient"), parameter_type="number", default_value=0.13)
+    assert_parameter(alg.parameterDefinition("HorizonLineType"), parameter_type="enum", default_value=1)
+    assert_parameter(alg.parameterDefinition("OutputTable"), parameter_type="sink")
+    assert_parameter(alg.parameterDefinition("OutputHorizons"), parameter_type="sink")
+    assert_parameter(alg.parameterDefinition("OutputHorizonLines"), parameter_type="sink")
+
+
+def test_alg_settings() -> None:
+    alg = AnalyseObserversAlgorithm()
+    alg.initAlgorithm()
+
+    assert_algorithm(alg)
+
+
+def test_run_alg(
+    raster_small: QgsRasterLayer,
+    layer_size_distance: QgsVectorLayer,
+    layer_points: QgsVectorLayer,
+) -> None:
+    alg = AnalyseObserversAlgorithm()
+    alg.initAlgorithm()
+
+    output_table = result_filename("observers_analysis.gpkg")
+    output_horizons = result_filename("observers_horizons.gpkg")
+    output_horizon_lines = result_filename("observers_horizon_lines.gpkg")
+
+    params = {
+        "DemRasters": [raster_small],
+        "LineSettingsTable": layer_size_distance,
+        "ObserverPoints": layer_points,
+        "ObserverIdField": OBSERVERS_ID,
+        "ObserverOffset": OBSERVERS_OFFSET,
+        "AngleStart": 0,
+        "AngleEnd": 359,
+        "AngleStep": 10,
+        "OutputTable": output_table,
+        "OutputHorizons": output_horizons,
+        "OutputHorizonLines": output_horizon_lines,
+    }
+
+    assert_run(alg, params)
+
+    table = QgsVectorLayer(output_table)
+
+    assert_field_names_exist(
+        [
+            FieldNames.LOS_TYPE,
+            FieldNames.ID_OBSERVER,
+            FieldNames.ID_TARGET,
+            FieldNames.AZIMUTH,
+            FieldNames.MAXIMAL_VERTICAL_ANGLE,
+            FieldNames.DISTANCE_GH,
+            FieldNames.DISTANCE_LH,
+            FieldNames.VERTICAL_ANGLE_LH,
+        ],
+        table,
+    )
+
+    assert table.featureCount() == layer_points.featureCount() * 36
+    assert table.uniqueValues(table.fields().lookupField(FieldNames.LOS_TYPE)) == {NamesConstants.LOS_NO_TARGET}
+
+    horizons = QgsVectorLayer(output_horizons)
+
+    assert_layer(horizons, geom_type=Qgis.WkbType.PointZ, crs=layer_points.sourceCrs())
+    assert_field_names_exist([FieldNames.HORIZON_TYPE, FieldNames.ID_OBSERVER, FieldNames.AZIMUTH], horizons)
+
+    # every LoS has global horizon
+    request_global = f"{FieldNames.HORIZON_TYPE} = '{NamesConstants.HORIZON_GLOBAL}'"
+    assert len(list(horizons.getFeatures(request_global))) == table.featureCount()
+
+    horizon_lines = QgsVectorLayer(output_horizon_lines)
+
+    assert_layer(horizon_lines, geom_type=Qgis.WkbType.LineStringZM, crs=layer_points.sourceCrs())
+    assert horizon_lines.featureCount() == layer_points.featureCount()
+
+    for feature in horizon_lines.getFeatures():
+        assert feature.geometry().constGet().numPoints() == 36
@@ -36,6 +36,7 @@ def test_parameters() -> None:
     assert_parameter(alg.parameterDefinition("TargetIdField"), parameter_type="field", parent_parameter="TargetPoints")
     assert_parameter(alg.parameterDefinition("TargetOffset"), parameter_type="field", parent_parameter="TargetPoints")
     assert_parameter(alg.parameterDefinition("LineDensity"), parameter_type="distance", default_value=1)
+    assert_parameter(alg.parameterDefinition("MaximumDistance"), parameter_type="distance", default_value=0)
     assert_parameter(alg.parameterDefinition("OutputLayer"), parameter_type="sink")
 
 
@@ -170,3 +171,39 @@ def test_run_alg(raster_small: QgsRasterLayer, layer_points: QgsVectorLayer, lay
             assert target_feature.geometry().asPoint() in vertices
 
             assert dsm_extent.contains(target_feature.geometry().boundingBox())
+
+
+def test_run_alg_maximum_distance(
+    raster_small: QgsRasterLayer, layer_points: QgsVectorLayer, layer_point: QgsVectorLayer
+) -> None:
+    alg = CreateGlobalLosAlgorithm()
+    alg.initAlgorithm()
+
+    output_path = result_filename("los_global_maximum_distance.gpkg")
+
+    target_geometry = next(layer_point.getFeatures()).geometry()
+
+    distances = sorted(
+        observer_feature.geometry().distance(target_geometry) for observer_feature in layer_points.getFeatures()
+    )
+
+    maximum_distance = distances[len(distances) // 2]
+
+    params = {
+        "DemRasters": [raster_small],
+        "ObserverPoints": layer_points,
+        "ObserverIdField": OBSERVERS_ID,
+        "ObserverOffset": OBSERVERS_OFFSET,
+        "TargetPoints": layer_point,
+        "TargetIdField": TARGETS_ID,
+        "TargetOffset": TARGETS_OFFSET,
+        "LineDensity": 1,
+        "MaximumDistance": maximum_distance,
+        "OutputLayer": output_path,
+    }
+
+    assert_run(alg, parameters=params)
+
+    los_layer = QgsVectorLayer(output_path)
+
+    assert los_layer.featureCount() == len([distance for distance in distances if distance <= maximum_distance])
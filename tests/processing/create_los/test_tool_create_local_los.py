@@ -1,6 +1,8 @@
 import pytest
 from qgis.core import Qgis, QgsFeatureRequest, QgsRasterLayer, QgsVectorLayer
 
+from los_tools.classes.classes_los import LoSLocal
+from los_tools.classes.los_profiles import LoSProfiles
 from los_tools.constants.field_names import FieldNames
 from los_tools.processing.create_los.tool_create_local_los import CreateLocalLosAlgorithm
 from tests.custom_assertions import (
@@ -35,7 +37,9 @@ def test_parameters() -> None:
     assert_parameter(alg.parameterDefinition("TargetIdField"), parameter_type="field", parent_parameter="TargetPoints")
     assert_parameter(alg.parameterDefinition("TargetOffset"), parameter_type="field", parent_parameter="TargetPoints")
     assert_parameter(alg.parameterDefinition("LineDensity"), parameter_type="distance", default_value=1)
+    assert_parameter(alg.parameterDefinition("MaximumDistance"), parameter_type="distance", default_value=0)
     assert_parameter(alg.parameterDefinition("OutputLayer"), parameter_type="sink")
+    assert_parameter(alg.parameterDefinition("OutputProfiles"), parameter_type="fileDestination")
 
 
 def test_alg_settings() -> None:
@@ -170,3 +174,82 @@ def test_run_alg(raster_small: QgsRasterLayer, layer_points: QgsVectorLayer, lay
 
             assert vertices[0] == observer_feature.geometry().asPoint()
             assert vertices[-1] == target_feature.geometry().asPoint()
+
+
+def test_run_alg_profiles(
+    raster_small: QgsRasterLayer, layer_points: QgsVectorLayer, layer_point: QgsVectorLayer
+) -> None:
+    alg = CreateLocalLosAlgorithm()
+    alg.initAlgorithm()
+
+    output_path = result_filename("los_local_profiles.gpkg")
+    output_profiles_path = result_filename("los_local_profiles.npz")
+
+    params = {
+        "DemRasters": [raster_small],
+        "ObserverPoints": layer_points,
+        "ObserverIdField": OBSERVERS_ID,
+        "ObserverOffset": OBSERVERS_OFFSET,
+        "TargetPoints": layer_point,
+        "TargetIdField": TARGETS_ID,
+        "TargetOffset": TARGETS_OFFSET,
+        "LineDensity": 1,
+        "OutputLayer": output_path,
+        "OutputProfiles": output_profiles_path,
+    }
+
+    assert_run(alg, parameters=params)
+
+    los_layer = QgsVectorLayer(output_path)
+    profiles = LoSProfiles(output_profiles_path)
+
+    assert len(profiles) == los_layer.featureCount()
+    # vertices of local LoS are rebuilt from observer, target and line density, so no distances are stored
+    assert profiles.arrays["templates_distances"].shape == (0,)
+
+    for los_feature, profile in zip(los_layer.getFeatures(), profiles):
+        assert profile.id_observer == los_feature.attribute(FieldNames.ID_OBSERVER)
+        assert profile.id_target == los_feature.attribute(FieldNames.ID_TARGET)
+
+        los = LoSLocal.from_feature(los_feature)
+        los_profile = LoSLocal.from_profile(profile)
+
+        assert len(los_profile.points) == len(los.points)
+        assert los_profile.is_target_visible() == los.is_target_visible()
+        assert los_profile.get_view_angle() == pytest.approx(los.get_view_angle())
+
+
+def test_run_alg_maximum_distance(
+    raster_small: QgsRasterLayer, layer_points: QgsVectorLayer, layer_point: QgsVectorLayer
+) -> None:
+    alg = CreateLocalLosAlgorithm()
+    alg.initAlgorithm()
+
+    output_path = result_filename("los_local_maximum_distance.gpkg")
+
+    target_geometry = next(layer_point.getFeatures()).geometry()
+
+    distances = sorted(
+        observer_feature.geometry().distance(target_geometry) for observer_feature in layer_points.getFeatures()
+    )
+
+    maximum_distance = distances[len(distances) // 2]
+
+    params = {
+        "DemRasters": [raster_small],
+        "ObserverPoints": layer_points,
+        "ObserverIdField": OBSERVERS_ID,
+        "ObserverOffset": OBSERVERS_OFFSET,
+        "TargetPoints": layer_point,
+        "TargetIdField": TARGETS_ID,
+        "TargetOffset": TARGETS_OFFSET,
+        "LineDensity": 1,
+        "MaximumDistance": maximum_distance,
+        "OutputLayer": output_path,
+    }
+
+    assert_run(alg, parameters=params)
+
+    los_layer = QgsVectorLayer(output_path)
+
+    assert los_layer.featureCount() == len([distance for distance in distances if distance <= maximum_distance])
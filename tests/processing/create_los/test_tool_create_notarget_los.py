@@ -1,6 +1,8 @@
 import pytest
 from qgis.core import Qgis, QgsRasterLayer, QgsVectorLayer
 
+from los_tools.classes.classes_los import LoSWithoutTarget
+from los_tools.classes.los_profiles import LoSProfiles
 from los_tools.constants.field_names import FieldNames
 from los_tools.processing.create_los.tool_create_notarget_los import CreateNoTargetLosAlgorithm
 from tests.custom_assertions import (
@@ -37,7 +39,9 @@ def test_parameters() -> None:
     assert_parameter(
         alg.parameterDefinition("TargetDefinitionIdField"), parameter_type="field", parent_parameter="TargetPoints"
     )
+    assert_parameter(alg.parameterDefinition("Workers"), parameter_type="number", default_value=1)
     assert_parameter(alg.parameterDefinition("OutputLayer"), parameter_type="sink")
+    assert_parameter(alg.parameterDefinition("OutputProfiles"), parameter_type="fileDestination")
 
 
 def test_alg_settings() -> None:
@@ -143,3 +147,82 @@ def test_run_alg(
     )
 
     assert layer_points_in_direction.featureCount() == los_layer.featureCount()
+
+
+def test_run_alg_profiles(
+    raster_small: QgsRasterLayer,
+    layer_size_distance: QgsVectorLayer,
+    layer_points: QgsVectorLayer,
+    layer_points_in_direction: QgsVectorLayer,
+) -> None:
+    alg = CreateNoTargetLosAlgorithm()
+    alg.initAlgorithm()
+
+    output_path = result_filename("los_no_target_profiles.gpkg")
+    output_profiles_path = result_filename("los_no_target_profiles.npz")
+
+    params = {
+        "DemRasters": [raster_small],
+        "LineSettingsTable": layer_size_distance,
+        "ObserverPoints": layer_points,
+        "ObserverIdField": OBSERVERS_ID,
+        "ObserverOffset": OBSERVERS_OFFSET,
+        "TargetPoints": layer_points_in_direction,
+        "TargetIdField": TARGETS_ID,
+        "TargetDefinitionIdField": ORIGINAL_POINT_ID,
+        "OutputLayer": output_path,
+        "OutputProfiles": output_profiles_path,
+    }
+
+    assert_run(alg, params)
+
+    los_layer = QgsVectorLayer(output_path)
+    profiles = LoSProfiles(output_profiles_path)
+
+    assert len(profiles) == los_layer.featureCount()
+    assert profiles.arrays["templates_offsets"].shape[0] == 2
+
+    for los_feature, profile in zip(los_layer.getFeatures(), profiles):
+        assert profile.id_target == los_feature.attribute(FieldNames.ID_TARGET)
+
+        los = LoSWithoutTarget.from_feature(los_feature)
+        los_profile = LoSWithoutTarget.from_profile(profile)
+
+        assert len(los_profile.points) == len(los.points)
+        assert list(los_profile.visible) == list(los.visible)
+
+
+def test_run_alg_workers(
+    raster_small: QgsRasterLayer,
+    layer_size_distance: QgsVectorLayer,
+    layer_points: QgsVectorLayer,
+    layer_points_in_direction: QgsVectorLayer,
+) -> None:
+    alg = CreateNoTargetLosAlgorithm()
+    alg.initAlgorithm()
+
+    params = {
+        "DemRasters": [raster_small],
+        "LineSettingsTable": layer_size_distance,
+        "ObserverPoints": layer_points,
+        "ObserverIdField": OBSERVERS_ID,
+        "ObserverOffset": OBSERVERS_OFFSET,
+        "TargetPoints": layer_points_in_direction,
+        "TargetIdField": TARGETS_ID,
+        "TargetDefinitionIdField": ORIGINAL_POINT_ID,
+    }
+
+    output_path_single = result_filename("los_no_target_single_worker.gpkg")
+    output_path_workers = result_filename("los_no_target_workers.gpkg")
+
+    assert_run(alg, {**params, "Workers": 1, "OutputLayer": output_path_single})
+    assert_run(alg, {**params, "Workers": 3, "OutputLayer": output_path_workers})
+
+    los_layer_single = QgsVectorLayer(output_path_single)
+    los_layer_workers = QgsVectorLayer(output_path_workers)
+
+    assert los_layer_single.featureCount() == los_layer_workers.featureCount()
+
+    for feature_single, feature_workers in zip(los_layer_single.getFeatures(), los_layer_workers.getFeatures()):
+        assert feature_single.attribute(FieldNames.ID_TARGET) == feature_workers.attribute(FieldNames.ID_TARGET)
+        assert feature_single.geometry().equals(feature_workers.geometry())
@@ -0,0 +1,79 @@
+from qgis.core import Qgis, QgsRasterLayer, QgsVectorLayer
+
+from los_tools.constants.field_names import FieldNames
+from los_tools.processing.horizons.tool_extract_horizon_lines_from_dem import ExtractHorizonLinesFromDemAlgorithm
+from tests.custom_assertions import (
+    assert_algorithm,
+    assert_field_names_exist,
+    assert_layer,
+    assert_parameter,
+    assert_run,
+)
+from tests.utils import result_filename
+
+OBSERVERS_ID = "id_point"
+OBSERVERS_OFFSET = "observ_offset"
+
+
+def test_parameters() -> None:
+    alg = ExtractHorizonLinesFromDemAlgorithm()
+    alg.initAlgorithm()
+
+    assert_parameter(alg.parameterDefinition("DemRasters"), parameter_type="multilayer")
+    assert_parameter(alg.parameterDefinition("ObserverPoints"), parameter_type="source")
+    assert_parameter(
+        alg.parameterDefinition("ObserverIdField"), parameter_type="field", parent_parameter="ObserverPoints"
+    )
+    assert_parameter(
+        alg.parameterDefinition("ObserverOffset"), parameter_type="field", parent_parameter="ObserverPoints"
+    )
+    assert_parameter(alg.parameterDefinition("AngleStart"), parameter_type="number", default_value=0)
+    assert_parameter(alg.parameterDefinition("AngleEnd"), parameter_type="number", default_value=359.999)
+    assert_parameter(alg.parameterDefinition("AngleStep"), parameter_type="number", default_value=1)
+    assert_parameter(alg.parameterDefinition("MaximumDistance"), parameter_type="number", default_value=0)
+    assert_parameter(alg.parameterDefinition("SamplingDistance"), parameter_type="number", default_value=0)
+    assert_parameter(alg.parameterDefinition("HorizonType"), parameter_type="enum", default_value=1)
+    assert_parameter(alg.parameterDefinition("CurvatureCorrections"), parameter_type="boolean", default_value=True)
+    assert_parameter(alg.parameterDefinition("RefractionCoefficient"), parameter_type="number", default_value=0.13)
+    assert_parameter(alg.parameterDefinition("OutputLayer"), parameter_type="sink")
+
+
+def test_alg_settings() -> None:
+    alg = ExtractHorizonLinesFromDemAlgorithm()
+    alg.initAlgorithm()
+
+    assert_algorithm(alg)
+
+
+def test_run_alg(raster_small: QgsRasterLayer, layer_points: QgsVectorLayer) -> None:
+    for horizon_type in [0, 1]:
+        alg = ExtractHorizonLinesFromDemAlgorithm()
+        alg.initAlgorithm()
+
+        output_path = result_filename(f"horizon_lines_from_dem_{horizon_type}.gpkg")
+
+        params = {
+            "DemRasters": [raster_small],
+            "ObserverPoints": layer_points,
+            "ObserverIdField": OBSERVERS_ID,
+            "ObserverOffset": OBSERVERS_OFFSET,
+            "AngleStep": 0.5,
+            "MaximumDistance": 100,
+            "HorizonType": horizon_type,
+            "OutputLayer": output_path,
+        }
+
+        assert_run(alg, params)
+
+        horizon_lines = QgsVectorLayer(output_path)
+
+        assert_layer(horizon_lines, geom_type=Qgis.WkbType.LineStringZM, crs=layer_points.sourceCrs())
+        assert_field_names_exist(
+            [FieldNames.HORIZON_TYPE, FieldNames.ID_OBSERVER, FieldNames.OBSERVER_X, FieldNames.OBSERVER_Y],
+            horizon_lines,
+        )
+
+        assert horizon_lines.featureCount() == layer_points.featureCount()
+
+        for feature in horizon_lines.getFeatures():
+            assert feature.geometry().constGet().numPoints() == 720
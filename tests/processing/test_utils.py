@@ -0,0 +1,198 @@
+import numpy as np
+import pytest
+from qgis.core import (
+    QgsFeatureRequest,
+    QgsField,
+    QgsFields,
+    QgsGeometry,
+    QgsPointXY,
+    QgsProcessingException,
+    QgsVectorLayer,
+)
+from qgis.PyQt.QtCore import QMetaType
+
+from los_tools.classes.los_arrays import LOS_POINT_DTYPE
+from los_tools.classes.los_batch import LoSBatch
+from los_tools.classes.los_parse_cache import LoSParseCache
+from los_tools.constants.field_names import FieldNames
+from los_tools.constants.names_constants import NamesConstants
+from los_tools.processing.utils import BatchedFeatureSink, FeatureTemplate, LayerReader, los_layer_key
+
+
+@pytest.fixture
+def fields() -> QgsFields:
+    fields = QgsFields()
+    fields.append(QgsField("id", QMetaType.Type.Int))
+    fields.append(QgsField("name", QMetaType.Type.QString))
+    fields.append(QgsField("value", QMetaType.Type.Double))
+    return fields
+
+
+def test_feature_template(fields: QgsFields) -> None:
+    template = FeatureTemplate(fields)
+
+    feature = template.feature([1, "a", 2.5], QgsGeometry.fromPointXY(QgsPointXY(1, 2)))
+
+    assert feature.attributes() == [1, "a", 2.5]
+    assert feature.geometry().asPoint() == QgsPointXY(1, 2)
+
+    template = FeatureTemplate(fields, ["value", "id"])
+
+    feature = template.feature([2.5, 1])
+
+    assert feature.attributes() == [1, None, 2.5]
+    assert feature.attribute("value") == 2.5
+    assert not feature.hasGeometry()
+
+    with pytest.raises(QgsProcessingException, match="Fields `missing` do not exist."):
+        FeatureTemplate(fields, ["id", "missing"])
+
+
+def test_batched_feature_sink(fields: QgsFields) -> None:
+    layer = QgsVectorLayer("Point?crs=epsg:5514", "points", "memory")
+    layer.dataProvider().addAttributes(fields.toList())
+    layer.updateFields()
+
+    template = FeatureTemplate(fields)
+    writer = BatchedFeatureSink(layer.dataProvider(), batch_size=3)
+
+    for i in range(7):
+        writer.add_feature(template.feature([i, str(i), i / 2], QgsGeometry.fromPointXY(QgsPointXY(i, i))))
+
+    assert layer.featureCount() == 6
+
+    writer.flush()
+
+    assert layer.featureCount() == 7
+    assert sorted(feature.attribute("id") for feature in layer.getFeatures()) == list(range(7))
+
+    writer.flush()
+
+    assert layer.featureCount() == 7
+
+
+def test_los_layer_key(los_local: QgsVectorLayer) -> None:
+    key = los_layer_key(los_local)
+
+    assert key is not None
+    assert key[0] == los_local.id()
+    assert los_layer_key(los_local) == key
+
+    assert los_layer_key(QgsVectorLayer("LineStringZ?crs=epsg:5514", "los", "memory")) is None
+    assert los_layer_key(None) is None
+
+    los_local.startEditing()
+    los_local.deleteFeature(next(los_local.getFeatures()).id())
+
+    assert los_layer_key(los_local) is None
+
+    los_local.rollBack()
+
+
+def test_layer_reader(los_local: QgsVectorLayer) -> None:
+    reader = LayerReader.los(los_local)
+
+    assert reader.type == NamesConstants.LOS_LOCAL
+
+    features = list(reader.features(reader.request([FieldNames.ID_OBSERVER], geometry=False)))
+
+    assert len(features) == los_local.featureCount()
+    assert features[0].attribute(FieldNames.ID_OBSERVER) is not None
+    assert features[0].attribute(FieldNames.LOS_TYPE) == NamesConstants.LOS_LOCAL
+    assert not features[0].hasGeometry()
+
+    assert len(list(LayerReader(los_local).features())) == los_local.featureCount()
+
+    los_local.startEditing()
+    feature = next(los_local.getFeatures())
+    los_local.changeAttributeValue(
+        feature.id(), los_local.fields().lookupField(FieldNames.LOS_TYPE), NamesConstants.LOS_GLOBAL
+    )
+
+    with pytest.raises(QgsProcessingException, match="More than one type of LoS present in layer"):
+        list(reader.features())
+
+    los_local.rollBack()
+
+    empty_layer = QgsVectorLayer("LineStringZ?crs=epsg:5514&field=los_type:string", "los", "memory")
+
+    assert LayerReader.los(empty_layer).type is None
+
+
+class RecordingSource:
+    """Layer wrapper that records requests of read features."""
+
+    def __init__(self, layer: QgsVectorLayer):
+        self.layer = layer
+        self.requests = []
+
+    def fields(self):
+        return self.layer.fields()
+
+    def featureCount(self):
+        return self.layer.featureCount()
+
+    def getFeatures(self, request: QgsFeatureRequest):
+        self.requests.append(QgsFeatureRequest(request))
+        return self.layer.getFeatures(request)
+
+
+def test_features_by_observer(los_no_target: QgsVectorLayer) -> None:
+    reader = LayerReader.los(los_no_target)
+
+    groups = list(reader.features_by_observer([FieldNames.OBSERVER_X]))
+
+    ids = [id_observer for id_observer, _ in groups]
+
+    assert ids == sorted(set(ids))
+    assert sum(len(features) for _, features in groups) == los_no_target.featureCount()
+
+    for id_observer, features in groups:
+        azimuths = [feature.attribute(FieldNames.AZIMUTH) for feature in features]
+
+        assert azimuths == sorted(azimuths)
+        assert all(feature.attribute(FieldNames.ID_OBSERVER) == id_observer for feature in features)
+        assert features[0].attribute(FieldNames.OBSERVER_X) is not None
+
+
+def test_estimated_los_size(los_local: QgsVectorLayer) -> None:
+    vertices = sum(feature.geometry().constGet().nCoordinates() for feature in los_local.getFeatures())
+
+    reader = LayerReader.los(los_local)
+
+    assert reader.estimated_los_size(sample_size=los_local.featureCount()) == vertices * LOS_POINT_DTYPE.itemsize
+
+
+def test_los_batches_warm_cache(los_local: QgsVectorLayer) -> None:
+    source = RecordingSource(los_local)
+    reader = LayerReader.los(source)
+    parse_cache = LoSParseCache()
+
+    def read():
+        return list(
+            reader.los_batches([FieldNames.ID_OBSERVER], parse_cache=parse_cache, layer_key="los", chunk_size=3)
+        )
+
+    cold = read()
+
+    assert all(feature.hasGeometry() for features, _ in cold for feature in features)
+    assert parse_cache.count(LoSBatch.parse_cache_group("los", True, 0.13)) == los_local.featureCount()
+
+    source.requests.clear()
+
+    warm = read()
+
+    # all LoS are cached, so no geometry is fetched again
+    assert source.requests
+    assert all(request.flags() & QgsFeatureRequest.Flag.NoGeometry for request in source.requests)
+
+    assert len(warm) == len(cold)
+
+    for (cold_features, cold_batch), (warm_features, warm_batch) in zip(cold, warm):
+        assert [feature.id() for feature in warm_features] == [feature.id() for feature in cold_features]
+        assert [feature.attribute(FieldNames.ID_OBSERVER) for feature in warm_features] == [
+            feature.attribute(FieldNames.ID_OBSERVER) for feature in cold_features
+        ]
+
+        for name in ["offsets", "distance", "vertical_angle", "visible", "horizon", "target_indices"]:
+            np.testing.assert_array_equal(getattr(warm_batch, name), getattr(cold_batch, name))
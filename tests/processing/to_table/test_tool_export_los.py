@@ -23,6 +23,7 @@ def test_parameters() -> None:
     assert_parameter(alg.parameterDefinition("CurvatureCorrections"), parameter_type="boolean", default_value=True)
     assert_parameter(alg.parameterDefinition("RefractionCoefficient"), parameter_type="number", default_value=0.13)
     assert_parameter(alg.parameterDefinition("OutputFile"), parameter_type="sink")
+    assert_parameter(alg.parameterDefinition("OutputColumnarFile"), parameter_type="fileDestination")
 
 
 def test_alg_settings() -> None:
@@ -104,3 +105,43 @@ def test_run_alg(los_fixture_name: str, fields: typing.List[str], request) -> No
     assert export_layer.wkbType() == Qgis.WkbType.NoGeometry
 
     assert_field_names_exist(fields, export_layer)
+
+
+@pytest.mark.parametrize(
+    "los_fixture_name,fields",
+    [
+        ("los_no_target", result_fields),
+        ("los_global", result_fields + [FieldNames.ID_TARGET, FieldNames.TARGET_OFFSET, FieldNames.TARGET_X]),
+    ],
+)
+def test_run_alg_columnar(los_fixture_name: str, fields: typing.List[str], request) -> None:
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    los: QgsVectorLayer = request.getfixturevalue(los_fixture_name)
+
+    alg = ExportLoSAlgorithm()
+    alg.initAlgorithm()
+
+    output_path = result_filename("exported_columnar.gpkg")
+    output_columnar_path = result_filename("exported.parquet")
+
+    params = {
+        "LoSLayer": los,
+        "OutputFile": output_path,
+        "OutputColumnarFile": output_columnar_path,
+    }
+
+    assert_run(alg, parameters=params)
+
+    export_layer = QgsVectorLayer(output_path)
+    table = pq.read_table(output_columnar_path)
+
+    assert set(fields).issubset(table.column_names)
+    assert table.num_rows == export_layer.featureCount()
+
+    assert table.column(FieldNames.CSV_OBSERVER_DISTANCE).to_pylist() == [
+        feature.attribute(FieldNames.CSV_OBSERVER_DISTANCE) for feature in export_layer.getFeatures()
+    ]
+    assert table.column(FieldNames.CSV_VISIBLE).to_pylist() == [
+        feature.attribute(FieldNames.CSV_VISIBLE) for feature in export_layer.getFeatures()
+    ]
@@ -3,14 +3,20 @@ import math
 import numpy as np
 import pytest
 from osgeo import gdal, osr
-from qgis.core import QgsGeometry, QgsLineString, QgsPoint, QgsPointXY, QgsRasterLayer
+from qgis.core import QgsGeometry, QgsLineString, QgsPoint, QgsPointXY, QgsRasterLayer, QgsRectangle, QgsVertexId
 
 from los_tools.processing.tools.util_functions import (
     bilinear_interpolated_value,
     calculate_distance,
+    chunked,
+    extend_line_end,
+    farthest_distance_in_extent,
+    finest_cell_size,
     get_diagonal_size,
     line_geometry_to_coords,
     segmentize_line,
+    segmentize_line_coordinates,
+    segmentize_lines_coordinates,
     segmentize_los_line,
     wkt_to_array_points,
 )
@@ -104,6 +110,19 @@ def test_get_diagonal_size(raster_small: QgsRasterLayer):
     math.sqrt(math.pow(extent.width(), 2) + math.pow(extent.height(), 2)) == get_diagonal_size(raster_dp)
 
 
+def test_farthest_distance_in_extent():
+    extent = QgsRectangle(0, 0, 10, 20)
+
+    assert farthest_distance_in_extent(QgsPointXY(2, 5), extent) == pytest.approx(math.hypot(8, 15))
+    assert farthest_distance_in_extent(QgsPointXY(-3, 24), extent) == pytest.approx(math.hypot(13, 24))
+
+
+def test_finest_cell_size(raster_small: QgsRasterLayer):
+    cell_size = raster_small.extent().width() / raster_small.width()
+
+    assert finest_cell_size([raster_small]) == pytest.approx(cell_size)
+
+
 def test_calculate_distance():
     assert math.sqrt(2) == calculate_distance(0, 0, 1, 1)
     assert 5 == calculate_distance(0, 0, 0, 5)
@@ -124,6 +143,72 @@ def test_segmentize_line():
     assert line_seg.points()[-1] == QgsPoint(2, 2)
 
 
+def reference_segmentize_line(line: QgsGeometry, segment_length: float) -> QgsLineString:
+    """Line segmentized by QGIS geometry operations, as `segmentize_line` did before it was vectorized."""
+    ideal_length_parts = math.ceil(line.length() / segment_length)
+    ideal_length_addition = ideal_length_parts * segment_length - line.length()
+
+    line_extented = QgsLineString([x for x in line.vertices()])
+    line_extented.extend(0, ideal_length_addition * 0.9)
+
+    line_geom = QgsGeometry(line_extented).densifyByDistance(distance=np.nextafter(float(segment_length), np.inf))
+
+    line_res = QgsLineString([x for x in line_geom.vertices()])
+
+    line_res.moveVertex(
+        QgsVertexId(0, 0, line_geom.constGet().vertexCount() - 1),
+        line.vertexAt(line.constGet().vertexCount() - 1),
+    )
+
+    return line_res
+
+
+@pytest.mark.parametrize(
+    "vertices",
+    [
+        # local LoS
+        [[[0, 0], [3.3, 4.1]], [[-5, 2], [2.5, 7.25]], [[100, 100], [100.2, 100.3]], [[1, 1], [1, 1]]],
+        # global LoS, observer, target and end of line behind the target
+        [
+            [[0, 0], [3.3, 4.1], [10, 10]],
+            [[-5, 2], [-5, 7], [2.5, 7.25]],
+            [[100, 100], [100.2, 100.3], [100.4, 100.3]],
+            [[1, 1], [1, 1], [1, 1]],
+        ],
+    ],
+)
+def test_segmentize_lines_coordinates(vertices: list):
+    vertices = np.array(vertices, dtype=float)
+
+    coords, offsets = segmentize_lines_coordinates(vertices, 0.5)
+
+    assert offsets.shape == (vertices.shape[0] + 1,)
+    assert offsets[-1] == coords.shape[0]
+
+    for i, line_vertices in enumerate(vertices):
+        line = reference_segmentize_line(QgsGeometry.fromPolyline([QgsPoint(x, y) for x, y in line_vertices]), 0.5)
+
+        line_coords = coords[offsets[i] : offsets[i + 1]]
+
+        assert line_coords.tolist() == [[p.x(), p.y()] for p in line.points()]
+        assert line_coords.tolist() == segmentize_line_coordinates(line_vertices, 0.5).tolist()
+        assert line_coords[-1].tolist() == line_vertices[-1].tolist()
+
+    coords_z = segmentize_line_coordinates(np.array([[0, 0, 10], [2, 0, 20]]), 0.5)
+
+    assert coords_z[:, 0].tolist() == pytest.approx([0, 0.5, 1, 1.5, 2])
+    assert coords_z[:, 2].tolist() == pytest.approx([10, 12.5, 15, 17.5, 20])
+
+
+def test_extend_line_end():
+    line = QgsLineString([QgsPoint(1, 1), QgsPoint(4, 5)])
+    line.extend(0, 7.5)
+
+    extended = extend_line_end(np.array([[1.0, 1.0]]), np.array([[4.0, 5.0]]), np.array([7.5]))
+
+    assert extended.tolist() == [[line.endPoint().x(), line.endPoint().y()]]
+
+
 def test_segmentize_los_line():
     line = QgsGeometry.fromPolyline([QgsPoint(0, 0), QgsPoint(1, 0), QgsPoint(1, 1), QgsPoint(2, 2)])
 
@@ -179,3 +264,8 @@ def test_geom_to_wkt():
 
         for j in range(len(points[i])):
             assert isinstance(points[i][j], float)
+
+
+def test_chunked():
+    assert list(chunked(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(chunked([], 3)) == []
@@ -0,0 +1,71 @@
+import numpy as np
+from qgis.core import QgsRasterLayer, QgsVectorLayer
+
+from los_tools.processing.viewshed.tool_cumulative_viewshed import CumulativeViewshedAlgorithm
+from tests.custom_assertions import assert_algorithm, assert_parameter, assert_run
+from tests.utils import result_filename
+
+OBSERVERS_OFFSET = "observ_offset"
+
+
+def test_parameters() -> None:
+    alg = CumulativeViewshedAlgorithm()
+    alg.initAlgorithm()
+
+    assert_parameter(alg.parameterDefinition("DemRasters"), parameter_type="multilayer")
+    assert_parameter(alg.parameterDefinition("ObserverPoints"), parameter_type="source")
+    assert_parameter(
+        alg.parameterDefinition("ObserverOffset"), parameter_type="field", parent_parameter="ObserverPoints"
+    )
+    assert_parameter(alg.parameterDefinition("TargetOffset"), parameter_type="number", default_value=0)
+    assert_parameter(alg.parameterDefinition("MaximumDistance"), parameter_type="number", default_value=0)
+    assert_parameter(alg.parameterDefinition("CellSize"), parameter_type="number", default_value=0)
+    assert_parameter(alg.parameterDefinition("CurvatureCorrections"), parameter_type="boolean", default_value=True)
+    assert_parameter(alg.parameterDefinition("RefractionCoefficient"), parameter_type="number", default_value=0.13)
+    assert_parameter(alg.parameterDefinition("Workers"), parameter_type="number", default_value=1)
+    assert_parameter(alg.parameterDefinition("OutputRaster"), parameter_type="rasterDestination")
+
+
+def test_alg_settings() -> None:
+    alg = CumulativeViewshedAlgorithm()
+    alg.initAlgorithm()
+
+    assert_algorithm(alg)
+
+
+def raster_values(path: str) -> np.ndarray:
+    raster = QgsRasterLayer(path)
+    block = raster.dataProvider().block(1, raster.extent(), raster.width(), raster.height())
+    return block.as_numpy()
+
+
+def test_run_alg(raster_small: QgsRasterLayer, layer_points: QgsVectorLayer) -> None:
+    results = []
+
+    for workers in [1, 3]:
+        alg = CumulativeViewshedAlgorithm()
+        alg.initAlgorithm()
+
+        output_path = result_filename(f"cumulative_viewshed_{workers}.tif")
+
+        params = {
+            "DemRasters": [raster_small],
+            "ObserverPoints": layer_points,
+            "ObserverOffset": OBSERVERS_OFFSET,
+            "MaximumDistance": 50,
+            "Workers": workers,
+            "OutputRaster": output_path,
+        }
+
+        assert_run(alg, params)
+
+        raster = QgsRasterLayer(output_path)
+
+        assert raster.isValid()
+        assert raster.crs() == raster_small.crs()
+
+        results.append(raster_values(output_path))
+
+    assert results[0].max() <= layer_points.featureCount()
+    assert 0 < results[0].max()
+    assert np.array_equal(results[0], results[1])
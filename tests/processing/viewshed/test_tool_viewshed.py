@@ -0,0 +1,80 @@
+from qgis.core import QgsPointXY, QgsRasterLayer, QgsVectorLayer
+
+from los_tools.processing.viewshed.tool_viewshed import ViewshedAlgorithm
+from tests.custom_assertions import assert_algorithm, assert_parameter, assert_run
+from tests.utils import result_filename
+
+
+def test_parameters() -> None:
+    alg = ViewshedAlgorithm()
+    alg.initAlgorithm()
+
+    assert_parameter(alg.parameterDefinition("DemRasters"), parameter_type="multilayer")
+    assert_parameter(alg.parameterDefinition("ObserverPoint"), parameter_type="point")
+    assert_parameter(alg.parameterDefinition("ObserverOffset"), parameter_type="number", default_value=1.6)
+    assert_parameter(alg.parameterDefinition("TargetOffset"), parameter_type="number", default_value=0)
+    assert_parameter(alg.parameterDefinition("MaximumDistance"), parameter_type="number", default_value=0)
+    assert_parameter(alg.parameterDefinition("CellSize"), parameter_type="number", default_value=0)
+    assert_parameter(alg.parameterDefinition("CurvatureCorrections"), parameter_type="boolean", default_value=True)
+    assert_parameter(alg.parameterDefinition("RefractionCoefficient"), parameter_type="number", default_value=0.13)
+    assert_parameter(alg.parameterDefinition("OutputViewshed"), parameter_type="rasterDestination")
+    assert_parameter(alg.parameterDefinition("OutputAngleDifference"), parameter_type="rasterDestination")
+
+
+def test_alg_settings() -> None:
+    alg = ViewshedAlgorithm()
+    alg.initAlgorithm()
+
+    assert_algorithm(alg)
+
+
+def test_run_alg(raster_small: QgsRasterLayer, layer_points: QgsVectorLayer) -> None:
+    alg = ViewshedAlgorithm()
+    alg.initAlgorithm()
+
+    observer = next(layer_points.getFeatures()).geometry().asPoint()
+
+    output_viewshed = result_filename("viewshed.tif")
+    output_angle_difference = result_filename("viewshed_angle_difference.tif")
+
+    params = {
+        "DemRasters": [raster_small],
+        "ObserverPoint": f"{observer.x()},{observer.y()} [{layer_points.crs().authid()}]",
+        "ObserverOffset": 1.6,
+        "MaximumDistance": 100,
+        "OutputViewshed": output_viewshed,
+        "OutputAngleDifference": output_angle_difference,
+    }
+
+    assert_run(alg, params)
+
+    viewshed = QgsRasterLayer(output_viewshed)
+    angle_difference = QgsRasterLayer(output_angle_difference)
+
+    assert viewshed.isValid()
+    assert angle_difference.isValid()
+    assert viewshed.width() == angle_difference.width()
+    assert viewshed.width() == viewshed.height()
+    assert viewshed.crs() == raster_small.crs()
+    assert viewshed.extent().center().distance(observer) < 0.001
+
+    # observer sees its own position, corners are farther than the maximal distance
+    assert viewshed.dataProvider().sample(observer, 1)[0] == 1
+    assert viewshed.dataProvider().sample(QgsPointXY(observer.x() + 99, observer.y() + 99), 1)[0] == 255
+
+    values = viewshed.dataProvider().block(1, viewshed.extent(), viewshed.width(), viewshed.height())
+
+    for row in range(0, viewshed.height(), 5):
+        for col in range(0, viewshed.width(), 5):
+            difference = angle_difference.dataProvider().sample(
+                QgsPointXY(
+                    viewshed.extent().xMinimum() + (col + 0.5) * viewshed.rasterUnitsPerPixelX(),
+                    viewshed.extent().yMaximum() - (row + 0.5) * viewshed.rasterUnitsPerPixelY(),
+                ),
+                1,
+            )[0]
+
+            if values.isNoData(row, col):
+                continue
+
+            assert values.value(row, col) == (1 if difference > 0 else 0)